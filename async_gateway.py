@@ -0,0 +1,295 @@
+"""
+Async (ASGI) onboarding gateway. Serves the same routes and payloads as
+excel_to_api.py (/onboard-Applicant, /bank-data) and
+process_and_send_request.py (/receive-partial-application,
+/receive-kyc-details), but waits on the target servers without holding a
+worker thread, so one worker keeps many slow forwards in flight.
+
+    python async_gateway.py --port 5004
+    python serve.py async_gateway --workers 2
+
+Workbook lookups and payload assembly are CPU-bound and run on a small
+thread pool; forwards go through one pooled httpx client per worker.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+from async_http_client import AsyncOutboundClient
+from health import is_draining
+from idempotency import DeliveryLedger, IdempotencyConflict, IDEMPOTENCY_HEADER, replay_headers
+from instrumentation import instrument_fastapi_app, span
+from onboarding import (load_onboard_payload, load_bank_details, load_kyc_details, forward_result,
+                        delivery_response, target_json, kyc_response)
+from payload_schemas import BANK_DETAILS_SCHEMA
+from partial_applications import add_session_part, application_response, assemble_application, partial_response
+from serialization import JSON_MIMETYPE, dumps, encode, loads
+from session_store import create_store, SESSION_TTL
+from structured_logging import configure_logging
+from workbook_cache import get_workbook_cache
+
+
+WORKBOOK_PATH = 'sample_excel_api.xlsx'
+
+ONBOARD_URL = os.environ.get('ONBOARD_URL', 'http://localhost:5002/onboard')
+BANK_URL = os.environ.get('BANK_URL', 'http://localhost:5003')
+TARGET_URL = os.environ.get(
+    'TARGET_URL',
+    'https://3228-2401-4900-8838-9963-bdb9-6092-94a4-defb.ngrok-free.app'
+)
+
+# Threads for workbook lookups and payload assembly (pandas releases the GIL only in part)
+WORKBOOK_THREADS = int(os.environ.get('GATEWAY_WORKBOOK_THREADS', 4))
+
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Onboarding Gateway")
+instrument_fastapi_app(app, 'async_gateway')
+
+# Same stores as process_and_send_request; SESSION_BACKEND=sqlite shares them with it
+payload_store = create_store('payload')
+application_ids = create_store('application_ids', ttl=SESSION_TTL * 48)
+kyc_transactions = create_store('kyc_transactions', ttl=SESSION_TTL * 48)
+
+# Recent successful forwards per target, under the same names as the Flask services
+onboard_deliveries = DeliveryLedger('onboard')
+bank_deliveries = DeliveryLedger('bank')
+kyc_deliveries = DeliveryLedger('kyc')
+
+workbook_pool = ThreadPoolExecutor(max_workers=WORKBOOK_THREADS, thread_name_prefix='workbook')
+
+
+@app.on_event("startup")
+async def open_outbound_client():
+    # Created inside the event loop that will use it
+    app.state.outbound = AsyncOutboundClient()
+
+
+@app.on_event("shutdown")
+async def close_outbound_client():
+    await app.state.outbound.aclose()
+
+
+def json_response(content, status_code=200, headers=None):
+    # Encoded payloads are spliced in as-is
+    return Response(dumps(content), status_code=status_code, headers=headers, media_type=JSON_MIMETYPE)
+
+
+async def run_blocking(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(workbook_pool, func, *args)
+
+
+async def forward(url, payload, target):
+    """
+    POST a payload downstream and return the parsed JSON reply. Raises
+    httpx.HTTPError on network errors and, as requests' raise_for_status
+    does in the Flask services, on 4xx and 5xx statuses.
+    """
+    with span('forward', target=target):
+        response = await app.state.outbound.post(url, json=payload)
+    if response.status_code >= 400:
+        response.raise_for_status()
+    return target_json(response.content)
+
+
+@app.get("/healthz")
+async def healthz():
+    return json_response({'status': 'alive'})
+
+
+@app.get("/readyz")
+async def readyz():
+    if is_draining():
+        return json_response({'status': 'draining'}, 503)
+    try:
+        await run_blocking(get_workbook_cache(WORKBOOK_PATH).snapshot)
+    except Exception as e:
+        return json_response({'status': 'not ready', 'reason': str(e)}, 503)
+    return json_response({'status': 'ready'})
+
+
+async def deliver_once(ledger, request, url, payload, target):
+    """
+    Forward an encoded payload unless this delivery already succeeded.
+    Returns ({'statusCode': ...} or {'error': ...}, replayed).
+    """
+    async def send():
+        try:
+            with span('forward', target=target):
+                response = await app.state.outbound.post(url, json=payload)
+        except httpx.HTTPError as e:
+            logger.warning(f"Network error when sending {target} data: {e}")
+            return {'error': str(e)}, False
+        return forward_result(response.status_code)
+
+    return await ledger.deliver_async(request.headers.get(IDEMPOTENCY_HEADER), payload.data, send, run_blocking)
+
+
+def delivered_response(data, delivery, replayed, target):
+    body, status_code = delivery_response(data, delivery, target)
+    return json_response(body, status_code, replay_headers(replayed) if status_code == 200 else None)
+
+
+async def load_from_workbook(load, applicant_id):
+    # A loader's result, or (error message, status code)
+    if not os.path.exists(WORKBOOK_PATH):
+        return 'File not found', 404
+    return await run_blocking(load, WORKBOOK_PATH, applicant_id)
+
+
+@app.get("/onboard-Applicant/{applicant_id}")
+async def get_all_data_by_id(applicant_id: str, request: Request):
+    all_data = await load_from_workbook(load_onboard_payload, applicant_id)
+    if isinstance(all_data, tuple):
+        message, status_code = all_data
+        return json_response({'error': message}, status_code)
+    try:
+        delivery, replayed = await deliver_once(onboard_deliveries, request, ONBOARD_URL, all_data, 'onboard')
+    except IdempotencyConflict as e:
+        return json_response({'error': str(e)}, 422)
+    return delivered_response(all_data, delivery, replayed, 'onboard')
+
+
+@app.get("/bank-data/{applicant_id}")
+async def get_bank_data_by_id(applicant_id: str, request: Request):
+    bank_data = await load_from_workbook(load_bank_details, applicant_id)
+    if isinstance(bank_data, tuple):
+        message, status_code = bank_data
+        return json_response({'error': message}, status_code)
+    bank_payload = encode({'applicant_id': applicant_id, 'bank_details': bank_data})
+    try:
+        delivery, replayed = await deliver_once(bank_deliveries, request, BANK_URL + '/bank-details',
+                                                bank_payload, 'bank')
+    except IdempotencyConflict as e:
+        return json_response({'error': str(e)}, 422)
+    return delivered_response(bank_data, delivery, replayed, 'bank')
+
+
+@app.post("/onboard-Applicant/{applicant_id}/all")
+async def onboard_everywhere(applicant_id: str):
+    """
+    Assemble an applicant's onboarding payload, bank data and KYC details and
+    forward all three concurrently. One target failing does not stop the
+    others; the reply has each forward's outcome (206 unless all succeeded).
+    """
+    loaded = await asyncio.gather(load_from_workbook(load_onboard_payload, applicant_id),
+                                  load_from_workbook(load_bank_details, applicant_id),
+                                  load_from_workbook(load_kyc_details, applicant_id))
+    for result in loaded:
+        if isinstance(result, tuple):
+            message, status_code = result
+            return json_response({'error': message}, status_code)
+    onboard, bank_data, kyc_details = loaded
+
+    targets = ['onboard', 'bank', 'kyc']
+    results = await asyncio.gather(
+        forward(ONBOARD_URL, onboard, 'onboard'),
+        forward(BANK_URL + '/bank-details', {'applicant_id': applicant_id, 'bank_details': bank_data}, 'bank'),
+        forward(TARGET_URL + '/onboard-kyc', kyc_details, 'kyc'),
+        return_exceptions=True
+    )
+    forwards = {}
+    for target, result in zip(targets, results):
+        if isinstance(result, httpx.HTTPStatusError):
+            forwards[target] = {'status': 'failed', 'statusCode': result.response.status_code}
+        elif isinstance(result, Exception):
+            forwards[target] = {'status': 'failed', 'error': str(result) or type(result).__name__}
+        else:
+            forwards[target] = {'status': 'delivered', 'targetResponse': result}
+    if forwards['kyc']['status'] == 'delivered':
+        transaction_id = forwards['kyc']['targetResponse'].get('TransactionId')
+        if transaction_id:
+            await run_blocking(kyc_transactions.set, applicant_id, transaction_id)
+
+    delivered = all(outcome['status'] == 'delivered' for outcome in forwards.values())
+    return json_response({
+        'applicantId': applicant_id,
+        'data': {'onboard': onboard, 'bank': bank_data, 'kyc': kyc_details},
+        'forwards': forwards
+    }, 200 if delivered else 206)
+
+
+@app.post("/receive-partial-application")
+async def receive_partial_application(request: Request):
+    try:
+        payload = loads(await request.body())
+        session_id = request.query_params.get('session_id', 'default_session')
+
+        part, session_parts, completed_parts = await run_blocking(add_session_part, payload_store, session_id, payload)
+        logger.info("Received partial payload", extra={'session_id': session_id, 'part': part, 'payload': payload})
+        if completed_parts is None:
+            body, status_code = partial_response(session_parts)
+            return json_response(body, status_code)
+
+        with span('assemble', route='partial-application'):
+            processed_payload = assemble_application(completed_parts)
+
+        # Keep the parts so the client can retry when the forward fails
+        try:
+            target_response = await forward(TARGET_URL + '/receive-partial-application',
+                                            processed_payload, 'partial-application')
+        except Exception as e:
+            await run_blocking(payload_store.set, session_id, completed_parts)
+            logger.error(f"Error forwarding request: {e}")
+            raise
+        logger.info("Target server accepted application", extra={'payload': target_response})
+
+        await run_blocking(application_ids.set, session_id, target_response.get('ApplicantId'))
+        return json_response(application_response(session_id, processed_payload, target_response))
+
+    except Exception as e:
+        logger.error(f"Error processing request: {e}")
+        return json_response({"status": "error", "message": str(e)}, 400)
+
+
+@app.post("/receive-kyc-details")
+async def receive_kyc_details(request: Request):
+    try:
+        payload = loads(await request.body())
+        missing = BANK_DETAILS_SCHEMA.missing(payload)
+        if missing:
+            return json_response({"status": "error", "message": f"Missing required field: {missing[0]}"}, 400)
+
+        # Sorted keys, so the same details in any order are recognised as a retry
+        kyc_payload = encode(payload)
+
+        async def send():
+            return await forward(TARGET_URL + '/onboard-kyc', kyc_payload, 'kyc'), True
+
+        try:
+            response_data, replayed = await kyc_deliveries.deliver_async(
+                request.headers.get(IDEMPOTENCY_HEADER), kyc_payload.data, send, run_blocking)
+        except IdempotencyConflict as e:
+            return json_response({"status": "error", "message": str(e)}, 422)
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to forward KYC request: {e}")
+            return json_response({"status": "error", "message": f"Failed to forward KYC request: {str(e)}"}, 500)
+
+        body = kyc_response(response_data)
+        transaction_id, applicant_id = body["TransactionId"], body["ApplicantId"]
+        if transaction_id and applicant_id:
+            await run_blocking(kyc_transactions.set, applicant_id, transaction_id)
+            logger.info("Stored KYC transaction", extra={'transaction_id': transaction_id, 'applicant_id': applicant_id})
+        return json_response(body, 200, replay_headers(replayed))
+
+    except Exception as e:
+        logger.error(f"Error in /receive-kyc-details: {e}")
+        return json_response({"status": "error", "message": str(e)}, 400)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the onboarding gateway")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5004)
+    args = parser.parse_args()
+    # JSON lines written off the request thread, PII masked
+    configure_logging()
+    uvicorn.run(app, host=args.host, port=args.port, log_config=None)
@@ -0,0 +1,88 @@
+"""
+Pooled async outbound client for the ASGI gateway, with the same timeouts,
+retry rules and per-host circuit breakers as http_client.OutboundClient.
+"""
+import asyncio
+import random
+from urllib.parse import urlsplit
+
+import httpx
+
+from http_client import (CONNECT_TIMEOUT, READ_TIMEOUT, POOL_HOSTS, POOL_MAXSIZE, MAX_RETRIES,
+                         BACKOFF_BASE, BACKOFF_MAX, ALWAYS_RETRY_STATUSES, CircuitBreaker)
+from instrumentation import OUTBOUND_REQUESTS
+from serialization import Encoded, dumps
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """
+    Raised instead of calling a target whose circuit breaker is open
+    """
+
+
+class AsyncOutboundClient:
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_retries=MAX_RETRIES, max_connections=POOL_HOSTS * POOL_MAXSIZE,
+                 max_keepalive=POOL_MAXSIZE):
+        self.max_retries = max_retries
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        )
+        self._breakers = {}
+
+    def _breaker(self, host):
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers.setdefault(host, CircuitBreaker())
+        return breaker
+
+    def _backoff(self, attempt):
+        # Full jitter, as in OutboundClient
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+    async def post(self, url, json=None, headers=None):
+        """
+        POST a JSON payload and return the final httpx.Response. A POST is only
+        retried when it never reached the target or was refused with 429/503.
+        """
+        body = json.data if isinstance(json, Encoded) else dumps(json)
+        headers = {'Content-Type': 'application/json', **(headers or {})}
+        host = urlsplit(url).netloc
+        breaker = self._breaker(host)
+
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                OUTBOUND_REQUESTS.inc(host=host, outcome='circuit_open')
+                raise CircuitOpenError(f"Circuit open for {host}")
+            try:
+                response = await self.client.post(url, content=body, headers=headers)
+            except httpx.HTTPError as e:
+                breaker.record_failure()
+                OUTBOUND_REQUESTS.inc(host=host, outcome=type(e).__name__)
+                if isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)) and attempt < self.max_retries:
+                    attempt += 1
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                raise
+            except BaseException:
+                # Other errors and cancellation still settle a half-open probe
+                breaker.record_failure()
+                raise
+
+            OUTBOUND_REQUESTS.inc(host=host, outcome=str(response.status_code))
+            retry_status = response.status_code in ALWAYS_RETRY_STATUSES
+            if response.status_code >= 500 or retry_status:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if retry_status and attempt < self.max_retries:
+                attempt += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            return response
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,132 @@
+"""
+Assemble and forward onboarding payloads for many applicants at once.
+
+    python batch_onboarding.py all --parallelism 8
+    python batch_onboarding.py <applicant id> <applicant id> ... [--no-forward]
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import http_client
+from normalization import normalize_frame
+from onboarding import ONBOARD_SHEETS
+from payload_schemas import ONBOARD_SCHEMA
+from workbook_cache import APPLICANT_ID_COLUMN, get_workbook_cache
+
+
+DEFAULT_PARALLELISM = int(os.environ.get('BATCH_PARALLELISM', 8))
+MAX_PARALLELISM = int(os.environ.get('BATCH_MAX_PARALLELISM', 64))
+
+
+def _first_rows(snapshot, sheet_name, applicant_ids):
+    # Like get_all_data_by_id, only an applicant's first row in each sheet is used
+    df = snapshot.sheet(sheet_name)
+    columns = [APPLICANT_ID_COLUMN] + [column for column in ONBOARD_SCHEMA.columns
+                                       if column in df.columns and column != APPLICANT_ID_COLUMN]
+    if applicant_ids is None:
+        rows = df[columns].dropna(subset=[APPLICANT_ID_COLUMN])
+        return rows.drop_duplicates(APPLICANT_ID_COLUMN, keep='first')
+    positions = [snapshot.index.positions(sheet_name, applicant_id) for applicant_id in applicant_ids]
+    return df[columns].iloc[[rows[0] for rows in positions if len(rows)]]
+
+
+def assemble_payloads(snapshot, applicant_ids=None):
+    """
+    Join Company_Data, Applicant_Data and Directors_Data on 'Applicant id' in
+    one merge and build the onboarding payloads. applicant_ids=None means
+    every applicant in Company_Data. Returns (payloads, missing) where
+    missing maps applicant id to the not-found message.
+    """
+    if applicant_ids is not None:
+        applicant_ids = list(dict.fromkeys(applicant_ids))
+
+    frames = [_first_rows(snapshot, sheet_name, applicant_ids) for sheet_name, _ in ONBOARD_SHEETS]
+    merged = frames[0]
+    for frame in frames[1:]:
+        merged = merged.merge(frame, on=APPLICANT_ID_COLUMN, how='inner', validate='one_to_one')
+
+    payloads = normalize_frame(merged, ONBOARD_SCHEMA)
+    found = {payload["ApplicantId"] for payload in payloads}
+
+    missing = {}
+    candidates = applicant_ids if applicant_ids is not None else frames[0][APPLICANT_ID_COLUMN].tolist()
+    for applicant_id in candidates:
+        if applicant_id in found:
+            continue
+        for sheet_name, message in ONBOARD_SHEETS:
+            if not len(snapshot.index.positions(sheet_name, applicant_id)):
+                missing[applicant_id] = message
+                break
+
+    if applicant_ids is not None:
+        order = {applicant_id: position for position, applicant_id in enumerate(applicant_ids)}
+        payloads.sort(key=lambda payload: order[payload["ApplicantId"]])
+    return payloads, missing
+
+
+def _forward_one(url, payload):
+    outcome = {"applicantId": payload["ApplicantId"]}
+    try:
+        response = http_client.post(url, json=payload, headers={'Content-Type': 'application/json'})
+        outcome["statusCode"] = response.status_code
+        if response.status_code == 200:
+            outcome["status"] = "forwarded"
+        else:
+            outcome["status"] = "forward_failed"
+            outcome["error"] = f"Target responded with status {response.status_code}"
+    except requests.exceptions.RequestException as e:
+        outcome["status"] = "forward_failed"
+        outcome["error"] = str(e)
+    return outcome
+
+
+def onboard_batch(file_path, url, applicant_ids=None, parallelism=DEFAULT_PARALLELISM, forward=True):
+    """
+    Assemble payloads for the given applicants (None for all) and forward them
+    concurrently. Returns a summary with one outcome per applicant.
+    """
+    parallelism = max(1, min(int(parallelism), MAX_PARALLELISM))
+    snapshot = get_workbook_cache(file_path).snapshot()
+    payloads, missing = assemble_payloads(snapshot, applicant_ids)
+
+    if forward:
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            results = list(executor.map(lambda payload: _forward_one(url, payload), payloads))
+    else:
+        results = [{"applicantId": payload["ApplicantId"], "status": "assembled", "data": payload}
+                   for payload in payloads]
+    results.extend({"applicantId": applicant_id, "status": "not_found", "error": message}
+                   for applicant_id, message in missing.items())
+
+    succeeded = sum(1 for result in results if result["status"] in ("forwarded", "assembled"))
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Assemble and forward onboarding payloads in bulk")
+    parser.add_argument('applicant_ids', nargs='+', help="applicant ids, or 'all'")
+    parser.add_argument('--file', default='sample_excel_api.xlsx')
+    parser.add_argument('--url', default=None, help="target URL (defaults to excel_to_api.Onboarded_URL_Server)")
+    parser.add_argument('--parallelism', type=int, default=DEFAULT_PARALLELISM)
+    parser.add_argument('--no-forward', action='store_true', help="only assemble the payloads")
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        from excel_to_api import Onboarded_URL_Server
+        url = Onboarded_URL_Server
+    ids = None if args.applicant_ids == ['all'] else args.applicant_ids
+    summary = onboard_batch(args.file, url, ids, args.parallelism, forward=not args.no_forward)
+    for result in summary["results"]:
+        print(json.dumps(result))
+    print(f"{summary['succeeded']}/{summary['total']} succeeded", file=sys.stderr)
+    sys.exit(0 if summary["failed"] == 0 else 1)
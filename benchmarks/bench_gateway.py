@@ -0,0 +1,87 @@
+"""
+Compare the Flask excel_to_api service with the async gateway on
+/onboard-Applicant/<id> while the onboarding target answers slowly, across
+client concurrency levels. Both run under serve.py with the same number of
+workers, against a synthetic workbook and the stub downstream. Each result
+has the number of forwards the stub received (downstreamPosts), which
+should match the requests: fewer means requests were answered without
+reaching the slow target, and the comparison doesn't hold. The client, the
+stub and both services share the host, so with few CPUs (reported as
+`cpus`) the run measures CPU per request rather than waiting on the target.
+
+    python -m benchmarks.bench_gateway --latency-ms 50 --concurrency 8 32 128 --workers 2
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.load_test import _wait_ready, run_load
+from benchmarks.stub_downstream import start_stub
+from benchmarks.synthetic import _applicant_ids, write_workbook
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = ['excel_to_api', 'async_gateway']
+
+
+def _serve(service, port, workers, threads, workdir, stub_url):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''),
+               ONBOARD_URL=stub_url + '/onboard', BANK_URL=stub_url, TARGET_URL=stub_url,
+               # Every request is forwarded, instead of replayed from the delivery ledger
+               IDEMPOTENCY_BY_CONTENT='0', LOG_LEVEL='WARNING')
+    return subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'serve.py'), service, '--workers', str(workers),
+         '--threads', str(threads), '--host', '127.0.0.1', '--port', str(port)],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flask vs async gateway under a slow downstream")
+    parser.add_argument('--applicants', type=int, default=1000)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8, help="gthread threads per Flask worker")
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=5101)
+    parser.add_argument('--stub-port', type=int, default=5900)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-gateway-')
+    write_workbook(os.path.join(workdir, 'sample_excel_api.xlsx'), args.applicants)
+    # Every applicant in turn, as suite.py's EndToEnd.paths does
+    paths = [f"/onboard-Applicant/{applicant_id}" for applicant_id in _applicant_ids(args.applicants, 0)]
+    stub = start_stub(args.stub_port, args.latency_ms)
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    try:
+        for service in SERVERS:
+            server = _serve(service, args.port, args.workers, args.threads, workdir, stub_url)
+            try:
+                if not _wait_ready(args.port, timeout=120):
+                    print(json.dumps({"server": service, "error": "service never became ready"}))
+                    continue
+                # Warm the snapshot and connection pools before measuring
+                run_load(args.port, paths, 4, 1)
+                for concurrency in args.concurrency:
+                    posts = stub.posts
+                    result = run_load(args.port, paths, concurrency, args.duration)
+                    print(json.dumps(dict(server=service, workers=args.workers, concurrency=concurrency,
+                                          latencyMs=args.latency_ms, cpus=os.cpu_count(),
+                                          downstreamPosts=stub.posts - posts, **result)))
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=60)
+    finally:
+        stub.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Memory and lookup speed of the compact KYC store against a dict per record.
+
+    python -m benchmarks.bench_kyc_store --records 1000000
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from kyc_store import KYCRecordStore
+
+
+DOCUMENT_TYPES = ['Aadhar', 'PAN', 'Passport', 'Voter ID']
+FIRST_NAMES = ['John', 'Jane', 'Bob', 'Alice', 'Mike', 'Emma', 'David', 'Sophia', 'Olivia', 'Ava']
+LAST_NAMES = ['Doe', 'Smith', 'Johnson', 'Brown', 'Davis', 'Taylor', 'Lee', 'Patel', 'Singh', 'Kumar']
+
+
+def synthetic_rows(n, seed=0):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield (
+            f"CUST{i:09d}",
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            f"{rng.randrange(10 ** 11, 10 ** 12):012d}",
+            rng.choice(DOCUMENT_TYPES)
+        )
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, seconds
+
+
+def _lookups_per_second(get, customer_ids):
+    start = time.perf_counter()
+    for customer_id in customer_ids:
+        get(customer_id)
+    return len(customer_ids) / (time.perf_counter() - start)
+
+
+def run(n):
+    store, store_bytes, store_seconds = _measure(lambda: KYCRecordStore.from_rows(synthetic_rows(n)))
+    dicts, dict_bytes, dict_seconds = _measure(lambda: {
+        customer_id: {'name': name, 'Aadhar_Number': aadhaar, 'document_type': document_type}
+        for customer_id, name, aadhaar, document_type in synthetic_rows(n)
+    })
+    probe = random.Random(1).sample(range(n), min(n, 100000))
+    customer_ids = [f"CUST{i:09d}" for i in probe]
+    per_million = 1000000 / n
+    return {
+        "records": n,
+        "storeMBPerMillion": round(store_bytes * per_million / 2 ** 20, 1),
+        "dictMBPerMillion": round(dict_bytes * per_million / 2 ** 20, 1),
+        "storeBuildSeconds": round(store_seconds, 2),
+        "dictBuildSeconds": round(dict_seconds, 2),
+        "storeLookupsPerSecond": round(_lookups_per_second(store.get, customer_ids)),
+        "dictLookupsPerSecond": round(_lookups_per_second(dicts.get, customer_ids))
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the compact KYC record store")
+    parser.add_argument('--records', type=int, default=1000000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.records)))
@@ -0,0 +1,85 @@
+"""
+Compare ways of parsing the workbook on a large synthetic file: one
+read_excel per sheet (the old read_excel_sheet path), every sheet in one
+read_excel call, and workbook_loader in one process and in parallel.
+
+    python -m benchmarks.bench_loader --applicants 120000 --extra-columns 6
+    python -m benchmarks.bench_loader --workbook /tmp/big.xlsx --processes 4
+
+The workbook's size is printed first; raise --applicants until it reaches
+the size under test (e.g. 50 MB). The extra columns stand in for the notes
+and audit columns real workbooks carry that no payload reads.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from payload_schemas import SHEET_COLUMNS
+from workbook_loader import load_workbook, memory_report
+from benchmarks.synthetic import make_sheets
+
+
+def write_wide_workbook(path, applicants, extra_columns, seed=0):
+    with pd.ExcelWriter(path) as writer:
+        for sheet_name, df in make_sheets(applicants, seed).items():
+            for number in range(extra_columns):
+                df[f"Notes {number}"] = 'Reviewed by operations team, ref ' + df['Applicant id'].str[:12]
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+def _time(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def _result(case, sheets, seconds, timings=None):
+    return {
+        "case": case,
+        "seconds": round(seconds, 3),
+        "columns": sum(len(df.columns) for df in sheets.values()),
+        "rows": sum(len(df) for df in sheets.values()),
+        "memoryBytes": sum(memory_report(sheets).values()),
+        "sheetSeconds": {name: round(value, 3) for name, value in (timings or {}).items()}
+    }
+
+
+def run(path, processes):
+    sheet_names = list(SHEET_COLUMNS)
+    results = []
+
+    # Before the snapshot cache: every request re-opened the file for each sheet
+    sheets, seconds = _time(lambda: {name: pd.read_excel(path, sheet_name=name) for name in sheet_names})
+    results.append(_result('read_excel_per_sheet', sheets, seconds))
+
+    # Before workbook_loader: the snapshot parsed every sheet and column in one call
+    sheets, seconds = _time(lambda: pd.read_excel(path, sheet_name=None))
+    results.append(_result('read_excel_all_sheets', sheets, seconds))
+
+    (sheets, timings), seconds = _time(lambda: load_workbook(path, processes=1))
+    results.append(_result('loader_pruned', sheets, seconds, timings))
+
+    (sheets, timings), seconds = _time(lambda: load_workbook(path, processes=processes))
+    results.append(_result(f'loader_pruned_parallel_{processes}', sheets, seconds, timings))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark workbook parsing strategies")
+    parser.add_argument('--workbook', help="existing workbook to parse instead of a synthetic one")
+    parser.add_argument('--applicants', type=int, default=120000)
+    parser.add_argument('--extra-columns', type=int, default=6)
+    parser.add_argument('--processes', type=int, default=min(len(SHEET_COLUMNS), os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    path = args.workbook
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix='bench-loader-'), 'workbook.xlsx')
+        write_wide_workbook(path, args.applicants, args.extra_columns)
+    print(json.dumps({"workbook": path, "megabytes": round(os.path.getsize(path) / 2 ** 20, 1)}))
+    for result in run(path, args.processes):
+        print(json.dumps(result))
@@ -0,0 +1,100 @@
+"""
+Request-thread cost of the old pretty-printed payload logging vs the
+queue-backed JSON-lines logging in structured_logging.py.
+
+    python -m benchmarks.bench_logging --requests 20000
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+from structured_logging import AsyncQueueHandler, JsonLineFormatter, PayloadSampler
+
+
+# One partial application as process_and_send_request.py receives it
+PAYLOAD = {
+    "sessionId": "3f0c2a8e-6b7d-4e1a-9c55-0d7f3b2a1e90",
+    "applicantFirstName": "Asha",
+    "applicantLastName": "Verma",
+    "applicantEmail": "asha.verma@example.com",
+    "applicantPhone": "9876543210",
+    "applicantDesignation": "Director",
+    "applicantAadhaar": "123456789012",
+    "companyName": "Verma Textiles Pvt Ltd",
+    "companyCIN": "U17110MH2015PTC123456",
+    "companyGSTIN": "27ABCDE1234F1Z5",
+    "companyPAN": "ABCDE1234F",
+    "companyAddress": "12 Mill Road, Mumbai",
+    "directorAadhaar": "210987654321",
+    "directorPAN": "PQRSX6789K",
+    "directorTotalLoanCount": 2,
+    "directorCurrentLoanOutstanding": 1250000,
+    "isDirectorDueMissedLast6Months": "No"
+}
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def _per_request_seconds(log_one, requests):
+    start = time.perf_counter()
+    for number in range(requests):
+        log_one(number)
+    return (time.perf_counter() - start) / requests
+
+
+def run(requests, sample_rate):
+    with tempfile.TemporaryDirectory() as directory:
+        # Before: two synchronous records per request, the second an indented dump
+        old_handler = logging.FileHandler(os.path.join(directory, 'old.log'))
+        old_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        old = _logger('bench.old', old_handler)
+
+        def log_old(number):
+            old.info(f"Received partial payload for session {number}:")
+            old.info(json.dumps(PAYLOAD, indent=2))
+
+        # After: one record queued for the listener thread to mask, encode and write
+        new_output = logging.FileHandler(os.path.join(directory, 'new.log'))
+        new_output.setFormatter(JsonLineFormatter())
+        new_handler = AsyncQueueHandler([new_output], maxsize=requests + 1)
+        new_handler.addFilter(PayloadSampler(sample_rate))
+        new = _logger('bench.new', new_handler)
+
+        def log_new(number):
+            new.info("Received partial payload", extra={'session_id': number, 'part': 'applicant', 'payload': PAYLOAD})
+
+        old_seconds = _per_request_seconds(log_old, requests)
+        new_seconds = _per_request_seconds(log_new, requests)
+        drain_start = time.perf_counter()
+        new_handler.stop()
+        drain_seconds = time.perf_counter() - drain_start
+        old_handler.close()
+        new_output.close()
+
+    return {
+        "requests": requests,
+        "sampleRate": sample_rate,
+        "oldMicrosPerRequest": round(old_seconds * 1e6, 2),
+        "newMicrosPerRequest": round(new_seconds * 1e6, 2),
+        # Request-thread time given back per second of traffic at 1k RPS
+        "savedMsPerSecondAt1kRps": round((old_seconds - new_seconds) * 1000 * 1000, 2),
+        "listenerDrainSeconds": round(drain_seconds, 3),
+        "dropped": new_handler.dropped
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark synchronous vs queued payload logging")
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--sample-rate', type=float, default=0.01)
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, args.sample_rate)))
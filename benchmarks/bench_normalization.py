@@ -0,0 +1,55 @@
+"""
+Compare the per-row normalize_* functions with the column-wise engine.
+
+    python -m benchmarks.bench_normalization --rows 100000
+"""
+import argparse
+import json
+import time
+
+from normalization import normalize_frame
+from payload_schemas import COMPANY_SCHEMA, APPLICANT_SCHEMA, DIRECTORS_SCHEMA, BANK_SCHEMA
+from benchmarks import handwritten
+from benchmarks.synthetic import make_sheets
+
+
+CASES = [
+    ('Company_Data', handwritten.normalize_company_data, COMPANY_SCHEMA),
+    ('Applicant_Data', handwritten.normalize_applicant_data, APPLICANT_SCHEMA),
+    ('Directors_Data', handwritten.normalize_directors_data, DIRECTORS_SCHEMA),
+    ('Bank_Data', handwritten.normalize_bank_data, BANK_SCHEMA)
+]
+
+
+def _time(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def run(rows):
+    sheets = make_sheets(rows)
+    results = []
+    for sheet_name, row_func, schema in CASES:
+        df = sheets[sheet_name]
+        per_row, per_row_seconds = _time(lambda: [row_func(row) for index, row in df.iterrows()])
+        columnar, columnar_seconds = _time(lambda: normalize_frame(df, schema))
+        # The new engine must produce exactly the same JSON as the old one
+        identical = json.dumps(per_row) == json.dumps(columnar)
+        results.append({
+            "sheet": sheet_name,
+            "rows": rows,
+            "iterrowsSeconds": round(per_row_seconds, 4),
+            "columnarSeconds": round(columnar_seconds, 4),
+            "speedup": round(per_row_seconds / columnar_seconds, 1) if columnar_seconds else None,
+            "identical": identical
+        })
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark per-row vs column-wise normalization")
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+    for result in run(args.rows):
+        print(json.dumps(result))
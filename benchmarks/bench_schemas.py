@@ -0,0 +1,87 @@
+"""
+Compare the compiled payload_schemas converters and validators with the
+hand-written functions they replaced, one record at a time.
+
+    python -m benchmarks.bench_schemas --records 20000
+"""
+import argparse
+import json
+import time
+
+from payload_schemas import ONBOARD_SCHEMA, BANK_DETAILS_SCHEMA, APPLICATION_FLAGS_SCHEMA
+from workbook_cache import APPLICANT_ID_COLUMN
+from benchmarks import handwritten
+from benchmarks.synthetic import make_sheets
+
+
+def _time(func, items):
+    start = time.perf_counter()
+    results = [func(item) for item in items]
+    return results, time.perf_counter() - start
+
+
+def _result(case, records, before, after):
+    (old, old_seconds), (new, new_seconds) = before, after
+    return {
+        "case": case,
+        "records": records,
+        "handwrittenMicros": round(old_seconds / records * 1e6, 3),
+        "compiledMicros": round(new_seconds / records * 1e6, 3),
+        "speedup": round(old_seconds / new_seconds, 2) if new_seconds else None,
+        "identical": json.dumps(old) == json.dumps(new)
+    }
+
+
+def _rows(df):
+    # The services look applicants up with .iloc[0], so they convert pandas rows
+    return [row for _, row in df.iterrows()]
+
+
+def run(records):
+    sheets = make_sheets(records)
+    company, applicant, directors, bank = (_rows(sheets[name]) for name in
+                                           ('Company_Data', 'Applicant_Data', 'Directors_Data', 'Bank_Data'))
+    triples = list(zip(company, applicant, directors))
+    results = []
+
+    # get_all_data_by_id: three sheet rows -> onboarding payload
+    results.append(_result(
+        'onboard_payload', records,
+        _time(lambda rows: handwritten.build_onboard_payload(rows[0][APPLICANT_ID_COLUMN], *rows), triples),
+        _time(lambda rows: ONBOARD_SCHEMA.convert({**rows[0].to_dict(), **rows[1].to_dict(), **rows[2].to_dict()}),
+              triples)
+    ))
+
+    # get_and_post_bank_data: one Bank_Data row -> bank details payload
+    results.append(_result(
+        'bank_details', records,
+        _time(handwritten.normalize_bank_details, bank),
+        _time(lambda row: BANK_DETAILS_SCHEMA.convert(row.to_dict()), bank)
+    ))
+
+    # process_and_send_request: Yes/No flags of a merged application
+    applications = [{**payload, 'isDirectorDueMissedLast6Months': 'Yes' if payload['isDirectorDueMissedLast6Months'] else 'No'}
+                    for payload in (ONBOARD_SCHEMA.convert({**c.to_dict(), **a.to_dict(), **d.to_dict()})
+                                    for c, a, d in triples)]
+    results.append(_result(
+        'application_flags', records,
+        _time(handwritten.convert_yes_no_to_boolean, applications),
+        _time(APPLICATION_FLAGS_SCHEMA.coerce, applications)
+    ))
+
+    # process_and_send_request: required fields of /receive-kyc-details
+    details = [BANK_DETAILS_SCHEMA.convert(row.to_dict()) for row in bank]
+    results.append(_result(
+        'kyc_required_fields', records,
+        _time(handwritten.find_missing_kyc_field, details),
+        _time(lambda payload: (BANK_DETAILS_SCHEMA.missing(payload) or [None])[0], details)
+    ))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark hand-written vs compiled payload converters")
+    parser.add_argument('--records', type=int, default=20000)
+    args = parser.parse_args()
+    for result in run(args.records):
+        print(json.dumps(result))
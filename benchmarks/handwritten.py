@@ -0,0 +1,147 @@
+"""
+The hand-written converters the services used before payload_schemas.py,
+kept as the baseline for the benchmarks.
+"""
+
+
+# excel_to_api.py: sheet endpoints
+def normalize_company_data(row):
+    return {
+        "Applicant ID": row['Applicant id'],
+        "Company Name": row['Company Name'],
+        "CIN": row['CIN'],
+        "GSTIN": row['GSTIN'],
+        "Company PAN": row['Company PAN'],
+        "Company Phone": int(row['Company Phone']),
+        "Company Email": row['Company Email'],
+        "Company Address": row['Company Address'],
+        "Company MSME": row['Company MSME']
+    }
+
+# Normalize bank data
+def normalize_bank_data(row):
+    return {
+        "Applicant id": row['Applicant id'],
+        "Name": row['Name'],
+        "Account No.": row['Account No.'],
+        "Bank Name": row['Bank Name'],
+        "IFSC Code": row['IFSC Code'],
+        "Branch Name": row['Branch Name']
+    }
+    
+# Normalize applicant data
+def normalize_applicant_data(row):
+    return {
+        "Applicant id": row['Applicant id'],
+        "First Name": row['First Name'],
+        "Last Name": row['Last Name'],
+        "Email": row['Email'],
+        "Phone": row['Phone'],
+        "Designation": row['Designation'],
+        "Aadhar": row['Aadhar']
+    }
+
+# Normalize directors data
+def normalize_directors_data(row):
+    return {
+        "Applicant ID": row['Applicant id'],
+        "Director First Name": row['Director First Name'],
+        "Director Last Name": row['Director Last Name'],
+        "Director Email": row['Director Email'],
+        "Director Phone": row['Director Phone'],
+        "Director Designation": row['Director Designation'],
+        "Director PAN": row['Director PAN'],
+        "Director Aadhaar": row['Director Aadhaar'],
+        "Total Current No. of Loans": int(row['Total Current No. of Loans']),
+        "Total Current No. of ODs": int(row['Total Current No. of ODs']),
+        "Total Current Loan Outstanding": int(row['Total Current Loan Outstanding']),
+        "Current Total EMI": int(row['Current Total EMI']),
+        "Any Dues Missed in Last 6 Months": row['Any Dues Missed in Last 6 Months'] == 'Yes',
+        "Any Dues Missed in Last 12 Months": row['Any Dues Missed in Last 12 Months'] == 'Yes',
+        "Any Dues Missed in Last 18 Months": row['Any Dues Missed in Last 18 Months'] == 'Yes'
+    }
+
+
+# excel_to_api.py: the all_data dict of get_all_data_by_id
+def build_onboard_payload(applicant_id, company_data, applicant_data, directors_data):
+    return {
+        "ApplicantId": applicant_id,
+        "companyName": str(company_data['Company Name']),
+        "companyCIN": str(company_data['CIN']),
+        "companyGSTIN": str(company_data['GSTIN']),
+        "companyPAN": str(company_data['Company PAN']),
+        "companyPhone": str(company_data['Company Phone']),
+        "companyEmail": str(company_data['Company Email']),
+        "companyAddress": str(company_data['Company Address']),
+        "companyMSME": str(company_data['Company MSME']),
+        "applicantFirstName": str(applicant_data['First Name']),
+        "applicantLastName": str(applicant_data['Last Name']),
+        "applicantEmail": str(applicant_data['Email']),
+        "applicantPhone": str(applicant_data['Phone']),
+        "applicantDesignation": str(applicant_data['Designation']),
+        "applicantAadhaar": str(applicant_data['Aadhar']),
+        "directorFirstName": str(directors_data['Director First Name']),
+        "directorLastName": str(directors_data['Director Last Name']),
+        "directorEmail": str(directors_data['Director Email']),
+        "directorPhone": str(directors_data['Director Phone']),
+        "directorDesignation": str(directors_data['Director Designation']),
+        "directorAadhaar": str(directors_data['Director Aadhaar']),
+        "directorPAN": str(directors_data['Director PAN']),
+        "directorTotalLoanCount": int(directors_data['Total Current No. of Loans']),
+        "directorTotalODCount": int(directors_data['Total Current No. of ODs']),
+        "directorCurrentLoanOutstanding": int(directors_data['Total Current Loan Outstanding']),
+        "directorCurrentLoanEMI": int(directors_data['Current Total EMI']),
+        "isDirectorDueMissedLast6Months": directors_data['Any Dues Missed in Last 6 Months'] == 'Yes',
+        "isDirectorDueMissedLast12Months": directors_data['Any Dues Missed in Last 12 Months'] == 'Yes',
+        "isDirectorDueMissedLast18Months": directors_data['Any Dues Missed in Last 18 Months'] == 'Yes'
+    }
+
+
+# get_and_post_bank_data.py: normalize bank data
+def normalize_bank_details(row):
+    return {
+        "ApplicantId": row['Applicant id'],
+        "applicantFullName": row['Name'],
+        "applicantBankAccountNumber": int(row['Account No.']),
+        "applicantBankName": row['Bank Name'],
+        "applicantBankIFSCCode": row['IFSC Code'],
+        "applicantBankBranchName": row['Branch Name']
+    }
+
+
+# process_and_send_request.py
+def convert_yes_no_to_boolean(payload):
+    """
+    Convert 'Yes'/'No' strings to boolean True/False for specific fields
+    """
+    boolean_fields = [
+        'isDirectorDueMissedLast12Months',
+        'isDirectorDueMissedLast18Months',
+        'isDirectorDueMissedLast6Months'
+    ]
+    
+    processed_payload = payload.copy()
+    
+    for field in boolean_fields:
+        if field in processed_payload:
+            if processed_payload[field] == "Yes":
+                processed_payload[field] = True
+            elif processed_payload[field] == "No":
+                processed_payload[field] = False
+    
+    return processed_payload
+
+
+def find_missing_kyc_field(payload):
+    required_fields = [
+        'applicantBankBranchName', 
+        'applicantFullName', 
+        'applicantBankAccountNumber', 
+        'applicantBankName', 
+        'applicantBankIFSCCode', 
+        'ApplicantId'
+    ]
+    for field in required_fields:
+        if field not in payload:
+            return field
+    return None
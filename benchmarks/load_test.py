@@ -0,0 +1,109 @@
+"""
+Measure how a service's throughput scales with the number of gunicorn workers.
+
+    python -m benchmarks.load_test excel_to_api --workers 1 2 4 --path /company-data
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from itertools import cycle, islice
+
+
+def _wait_ready(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/readyz')
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def _hammer(port, paths, deadline, latencies, errors):
+    # One keep-alive connection per client thread
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    for path in paths:
+        if time.monotonic() >= deadline:
+            break
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+            latencies.append(time.perf_counter() - start)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+
+
+def run_load(port, path, concurrency, duration):
+    """
+    Send GETs from `concurrency` client threads for `duration` seconds. `path`
+    is one path or a list of paths, which each thread cycles through from its
+    own starting point.
+    """
+    paths = [path] if isinstance(path, str) else list(path)
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=_hammer, args=(port, islice(cycle(paths), number, None), deadline,
+                                                      latencies, errors))
+               for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 2) if latencies else None
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / duration, 1),
+        "p50Ms": pick(0.50),
+        "p99Ms": pick(0.99)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput vs worker count for serve.py")
+    parser.add_argument('service')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--path', default='/company-data?limit=100')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=5101)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for workers in args.workers:
+        server = subprocess.Popen(
+            [sys.executable, 'serve.py', args.service, '--workers', str(workers),
+             '--threads', str(args.threads), '--host', '127.0.0.1', '--port', str(args.port)],
+            cwd=root
+        )
+        try:
+            if not _wait_ready(args.port, timeout=120):
+                print(json.dumps({"workers": workers, "error": "service never became ready"}))
+                continue
+            result = run_load(args.port, args.path, args.concurrency, args.duration)
+            print(json.dumps(dict(workers=workers, threads=args.threads, **result)))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,395 @@
+"""
+Replay JSONL request logs against the services and report latency,
+throughput and errors per endpoint.
+
+    python -m benchmarks.replay generate-workbook /tmp/wb.xlsx --applicants 10000
+    python -m benchmarks.replay generate-jsonl /tmp/requests.jsonl --applicants 10000
+    python -m benchmarks.replay run /tmp/requests.jsonl --launch --workbook /tmp/wb.xlsx --rps 200 --duration 30
+
+Each JSONL line is one request:
+
+    {"service": "excel_to_api", "endpoint": "GET /onboard-Applicant/<id>",
+     "method": "GET", "path": "/onboard-Applicant/<id>", "headers": {}, "body": null}
+
+With --launch, every service is started locally with its downstream URLs
+pointed at a stub server (benchmarks.stub_downstream), so no network is needed.
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.stub_downstream import start_stub
+from benchmarks.synthetic import make_sheets, write_workbook
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Upper bounds (ms) of the latency histogram buckets
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf')]
+
+# How --launch starts each service, and the env vars that point it at the stub
+SERVICES = {
+    'excel_to_api': {
+        'command': "import excel_to_api as m; m.app.run(host='127.0.0.1', port={port}, threaded=True)",
+        'env': {'ONBOARD_URL': '{stub}/onboard', 'BANK_URL': '{stub}'}
+    },
+    'get_and_post_bank_data': {
+        'command': "import get_and_post_bank_data as m; m.app.run(host='127.0.0.1', port={port}, threaded=True)",
+        'env': {'BANK_ONBOARD_URL': '{stub}/onboard-Applicant/{{}}'}
+    },
+    'process_and_send_request': {
+        'command': "import process_and_send_request as m; m.app.run(host='127.0.0.1', port={port}, threaded=True)",
+        'env': {'TARGET_URL': '{stub}'}
+    },
+    'kyc': {
+        'command': "import uvicorn, kyc; uvicorn.run(kyc.app, host='127.0.0.1', port={port}, log_level='warning')",
+        'env': {}
+    }
+}
+
+
+def _record(service, endpoint, method, path, body=None, headers=None):
+    return {"service": service, "endpoint": endpoint, "method": method, "path": path,
+            "headers": headers or {}, "body": body}
+
+
+def synthetic_requests(n, seed=0):
+    """
+    Yield a request mix for n synthetic applicants, matching the ids of
+    benchmarks.synthetic.make_sheets(n, seed)
+    """
+    sheets = make_sheets(n, seed)
+    company = sheets['Company_Data'].to_dict('records')
+    applicant = sheets['Applicant_Data'].to_dict('records')
+    directors = sheets['Directors_Data'].to_dict('records')
+    bank = sheets['Bank_Data'].to_dict('records')
+
+    for i in range(n):
+        applicant_id = company[i]['Applicant id']
+        yield _record('excel_to_api', 'GET /onboard-Applicant/<id>', 'GET', f"/onboard-Applicant/{applicant_id}")
+        yield _record('excel_to_api', 'GET /bank-data/<id>', 'GET', f"/bank-data/{applicant_id}")
+        yield _record('get_and_post_bank_data', 'GET /bank-data/<id>', 'GET', f"/bank-data/{applicant_id}")
+
+        session = f"/receive-partial-application?session_id=s{i}"
+        endpoint = 'POST /receive-partial-application'
+        yield _record('process_and_send_request', endpoint, 'POST', session, {
+            "ApplicantId": applicant_id,
+            "applicantFirstName": applicant[i]['First Name'],
+            "applicantLastName": applicant[i]['Last Name'],
+            "applicantEmail": applicant[i]['Email'],
+            "applicantPhone": str(applicant[i]['Phone']),
+            "applicantDesignation": applicant[i]['Designation'],
+            "applicantAadhaar": str(applicant[i]['Aadhar'])
+        })
+        yield _record('process_and_send_request', endpoint, 'POST', session, {
+            "companyName": company[i]['Company Name'],
+            "companyCIN": company[i]['CIN'],
+            "companyGSTIN": company[i]['GSTIN'],
+            "companyPAN": company[i]['Company PAN'],
+            "companyPhone": str(company[i]['Company Phone']),
+            "companyEmail": company[i]['Company Email'],
+            "companyAddress": company[i]['Company Address'],
+            "companyMSME": company[i]['Company MSME']
+        })
+        yield _record('process_and_send_request', endpoint, 'POST', session, {
+            "directorFirstName": directors[i]['Director First Name'],
+            "directorLastName": directors[i]['Director Last Name'],
+            "directorEmail": directors[i]['Director Email'],
+            "directorPhone": str(directors[i]['Director Phone']),
+            "directorDesignation": directors[i]['Director Designation'],
+            "directorAadhaar": str(directors[i]['Director Aadhaar']),
+            "directorPAN": directors[i]['Director PAN'],
+            "directorTotalLoanCount": int(directors[i]['Total Current No. of Loans']),
+            "directorTotalODCount": int(directors[i]['Total Current No. of ODs']),
+            "directorCurrentLoanOutstanding": int(directors[i]['Total Current Loan Outstanding']),
+            "directorCurrentLoanEMI": int(directors[i]['Current Total EMI']),
+            "isDirectorDueMissedLast6Months": directors[i]['Any Dues Missed in Last 6 Months'],
+            "isDirectorDueMissedLast12Months": directors[i]['Any Dues Missed in Last 12 Months'],
+            "isDirectorDueMissedLast18Months": directors[i]['Any Dues Missed in Last 18 Months']
+        })
+        yield _record('process_and_send_request', 'POST /receive-kyc-details', 'POST', '/receive-kyc-details', {
+            "ApplicantId": applicant_id,
+            "applicantFullName": bank[i]['Name'],
+            "applicantBankAccountNumber": int(bank[i]['Account No.']),
+            "applicantBankName": bank[i]['Bank Name'],
+            "applicantBankIFSCCode": bank[i]['IFSC Code'],
+            "applicantBankBranchName": bank[i]['Branch Name']
+        })
+        yield _record('kyc', 'POST /verify-kyc', 'POST', '/verify-kyc', {
+            "customer_id": applicant_id,
+            "name": bank[i]['Name'],
+            "Aadhar_Number": str(applicant[i]['Aadhar']),
+            "document_type": "Aadhar"
+        })
+
+
+def read_jsonl(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Stats:
+    """
+    Thread-safe latency and outcome collector, keyed by endpoint
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._outcomes = {}
+
+    def record(self, endpoint, seconds, outcome):
+        with self._lock:
+            self._latencies.setdefault(endpoint, []).append(seconds * 1000)
+            outcomes = self._outcomes.setdefault(endpoint, {})
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        with self._lock:
+            for endpoint, latencies in sorted(self._latencies.items()):
+                latencies.sort()
+                pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 2)
+                histogram, start = {}, 0
+                for bound in HISTOGRAM_BUCKETS_MS:
+                    end = start
+                    while end < len(latencies) and latencies[end] <= bound:
+                        end += 1
+                    histogram[f"<={bound}ms" if bound != float('inf') else ">5000ms"] = end - start
+                    start = end
+                outcomes = self._outcomes[endpoint]
+                errors = {key: count for key, count in outcomes.items() if not key.startswith(('2', '3'))}
+                endpoints[endpoint] = {
+                    "requests": len(latencies),
+                    "throughputRps": round(len(latencies) / elapsed, 1) if elapsed else None,
+                    "p50Ms": pick(0.50),
+                    "p95Ms": pick(0.95),
+                    "p99Ms": pick(0.99),
+                    "maxMs": round(latencies[-1], 2),
+                    "histogram": histogram,
+                    "statuses": outcomes,
+                    "errors": errors
+                }
+        total = sum(endpoint["requests"] for endpoint in endpoints.values())
+        return {
+            "elapsedSeconds": round(elapsed, 2),
+            "requests": total,
+            "throughputRps": round(total / elapsed, 1) if elapsed else None,
+            "endpoints": endpoints
+        }
+
+
+_sessions = threading.local()
+
+
+def _send(targets, record, stats):
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+    endpoint = f"{record['service']} {record.get('endpoint') or record['method'] + ' ' + record['path'].split('?')[0]}"
+    base = targets.get(record['service'])
+    if base is None:
+        stats.record(endpoint, 0.0, 'no_target')
+        return
+    start = time.perf_counter()
+    try:
+        response = session.request(record['method'], base + record['path'], json=record.get('body'),
+                                   headers=record.get('headers') or None, timeout=60)
+        outcome = str(response.status_code)
+    except requests.exceptions.RequestException as e:
+        outcome = type(e).__name__
+    stats.record(endpoint, time.perf_counter() - start, outcome)
+
+
+def replay(records, targets, rps=None, concurrency=16, duration=None):
+    """
+    Send records at a fixed rate (rps) or as fast as `concurrency` clients allow.
+    Stops when the records run out or after `duration` seconds.
+    """
+    stats = Stats()
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+    records = iter(records)
+
+    if rps:
+        # Open loop: requests are dispatched on schedule; the semaphore keeps
+        # an overloaded target from growing an unbounded backlog
+        slots = threading.BoundedSemaphore(concurrency * 4)
+
+        def run(record):
+            try:
+                _send(targets, record, stats)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for number, record in enumerate(records):
+                due = start + number / rps
+                now = time.perf_counter()
+                if deadline and max(now, due) >= deadline:
+                    break
+                if due > now:
+                    time.sleep(due - now)
+                slots.acquire()
+                executor.submit(run, record)
+    else:
+        lock = threading.Lock()
+
+        def client():
+            while not deadline or time.perf_counter() < deadline:
+                with lock:
+                    record = next(records, None)
+                if record is None:
+                    return
+                _send(targets, record, stats)
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return stats.report(time.perf_counter() - start)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def launch_services(services, workbook, stub_url):
+    """
+    Start services locally against the stub, in a scratch directory holding
+    the workbook as sample_excel_api.xlsx. Returns (targets, processes, workdir).
+    """
+    workdir = tempfile.mkdtemp(prefix='replay-')
+    targets, processes = {}, []
+    try:
+        shutil.copy(workbook or os.path.join(ROOT, 'sample_excel_api.xlsx'),
+                    os.path.join(workdir, 'sample_excel_api.xlsx'))
+        for name in services:
+            port = _free_port()
+            env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+            env.update({key: value.format(stub=stub_url) for key, value in SERVICES[name]['env'].items()})
+            command = SERVICES[name]['command'].format(port=port)
+            processes.append(subprocess.Popen([sys.executable, '-c', command], cwd=workdir, env=env,
+                                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            if not _wait_for_port(port):
+                raise RuntimeError(f"{name} did not start")
+            targets[name] = f"http://127.0.0.1:{port}"
+    except BaseException:
+        # The caller never gets these back, so nothing else would stop them
+        stop_services(processes, workdir)
+        raise
+    return targets, processes, workdir
+
+
+def stop_services(processes, workdir):
+    """
+    Stop services started by launch_services and remove their scratch directory
+    """
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    if workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay JSONL request logs against the services")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    workbook_parser = commands.add_parser('generate-workbook', help="write a synthetic workbook")
+    workbook_parser.add_argument('path')
+    workbook_parser.add_argument('--applicants', type=int, default=1000)
+    workbook_parser.add_argument('--seed', type=int, default=0)
+
+    jsonl_parser = commands.add_parser('generate-jsonl', help="write a synthetic request log")
+    jsonl_parser.add_argument('path')
+    jsonl_parser.add_argument('--applicants', type=int, default=1000)
+    jsonl_parser.add_argument('--seed', type=int, default=0)
+
+    run_parser = commands.add_parser('run', help="replay a request log")
+    run_parser.add_argument('path')
+    run_parser.add_argument('--target', action='append', default=[], metavar='SERVICE=URL')
+    run_parser.add_argument('--launch', action='store_true', help="start the services and a stub downstream")
+    run_parser.add_argument('--workbook', help="workbook served by launched services")
+    run_parser.add_argument('--stub-latency-ms', type=float, default=0.0)
+    run_parser.add_argument('--stub-error-rate', type=float, default=0.0)
+    run_parser.add_argument('--rps', type=float, default=None)
+    run_parser.add_argument('--concurrency', type=int, default=16)
+    run_parser.add_argument('--duration', type=float, default=None)
+    run_parser.add_argument('--loop', action='store_true', help="cycle through the log until --duration")
+    run_parser.add_argument('--output', help="also write the report to this file")
+    args = parser.parse_args()
+
+    if args.command == 'generate-workbook':
+        write_workbook(args.path, args.applicants, args.seed)
+        return
+    if args.command == 'generate-jsonl':
+        with open(args.path, 'w') as f:
+            for record in synthetic_requests(args.applicants, args.seed):
+                f.write(json.dumps(record) + '\n')
+        return
+
+    if args.loop and not args.duration:
+        parser.error("--loop needs --duration")
+    targets = dict(target.split('=', 1) for target in args.target)
+    processes, workdir, stub = [], None, None
+    try:
+        if args.launch:
+            stub_port = _free_port()
+            stub = start_stub(stub_port, args.stub_latency_ms, args.stub_error_rate)
+            wanted = sorted({record['service'] for record in read_jsonl(args.path)} - set(targets))
+            launched, processes, workdir = launch_services(wanted, args.workbook, f"http://127.0.0.1:{stub_port}")
+            targets.update(launched)
+
+        if args.loop:
+            records = itertools.cycle(list(read_jsonl(args.path)))
+        else:
+            records = read_jsonl(args.path)
+        report = replay(records, targets, args.rps, args.concurrency, args.duration)
+    finally:
+        stop_services(processes, workdir)
+        if stub is not None:
+            stub.shutdown()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Local stand-in for the onboarding, bank and KYC target servers.
+
+    python -m benchmarks.stub_downstream --port 5900 --latency-ms 20
+
+Every POST gets a 200 JSON reply echoing the ApplicantId and carrying a
+TransactionId, which is all the services read from a target's response.
+The server counts the POSTs it received (server.posts), so benchmarks can
+check their requests really reached the downstream.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Bumped when the stub's own cost per request changes, so end-to-end results
+# measured against different stubs are not compared (2: TCP_NODELAY)
+STUB_REVISION = 2
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.posts = 0
+        self._lock = threading.Lock()
+
+    def count_post(self):
+        with self._lock:
+            self.posts += 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Keep-alive replies go out as two writes (headers, then body); with Nagle's
+    # algorithm the body waits for the client's delayed ACK, ~40ms per request
+    disable_nagle_algorithm = True
+    latency = 0.0
+    error_rate = 0.0
+
+    def do_POST(self):
+        self.server.count_post()
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            body = {}
+        if self.latency:
+            time.sleep(self.latency)
+
+        if random.random() < self.error_rate:
+            self._reply(503, {"status": "error", "message": "stub failure"})
+            return
+        applicant_id = None
+        if isinstance(body, dict):
+            applicant_id = body.get('ApplicantId') or body.get('applicant_id')
+        self._reply(200, {
+            "status": "ok",
+            "path": self.path,
+            "ApplicantId": applicant_id or uuid.uuid4().hex,
+            "TransactionId": uuid.uuid4().hex
+        })
+
+    def _reply(self, status_code, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(port, latency_ms=0.0, error_rate=0.0, host='127.0.0.1'):
+    """
+    Start a stub server on a background thread and return it (call shutdown() to stop)
+    """
+    handler = type('ConfiguredStubHandler', (StubHandler,), {
+        'latency': latency_ms / 1000.0,
+        'error_rate': error_rate
+    })
+    server = StubServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a stand-in downstream target server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5900)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    server = start_stub(args.port, args.latency_ms, args.error_rate, args.host)
+    print(f"Stub downstream listening on http://{args.host}:{args.port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,567 @@
+"""
+Benchmarks of the request hot paths, written as JSON, with a regression check
+against an earlier run.
+
+    python -m benchmarks.suite run --sizes 1000 100000 1000000 --output results.json
+    python -m benchmarks.suite run --baseline results.json --output current.json
+    python -m benchmarks.suite compare results.json current.json --max-slowdown 0.1
+
+Micro-benchmarks run on synthetic sheets of each size: parsing the workbook
+(read_excel_sheet's snapshot load, from the xlsx and from the columnar
+cache), the column-wise normalize_* of every sheet, assembling the
+/onboard-Applicant payload for one applicant and for all of them, merging
+partial applications with their Yes/No flags converted, and verify_kyc
+against a store of `size` records. End-to-end benchmarks send requests
+through each service's framework test client (Flask's test_client,
+FastAPI's TestClient) with the downstream targets replaced by
+benchmarks.stub_downstream.
+
+Each result has the best of --repeat timings, the units (rows, payloads or
+requests) per second, and the peak memory allocated by one more run traced
+with tracemalloc. compare, and run --baseline, exit with status 1 when a
+case got slower than --max-slowdown or its peak memory grew by more than
+--max-memory-growth. End-to-end cases are only compared when both runs used
+the same stub downstream (meta.stubRevision); re-baseline when it changes.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import cycle, islice
+
+from benchmarks.bench_kyc_store import synthetic_rows
+from benchmarks.replay import _free_port
+from benchmarks.stub_downstream import STUB_REVISION, start_stub
+from benchmarks.synthetic import make_sheets, write_workbook
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+# Writing and parsing xlsx files is slow; larger sizes skip the parsing cases
+EXCEL_MAX_ROWS = 100000
+# Per-record cases (one applicant, one application, one KYC check) time at most this many records
+RECORD_LIMIT = 10000
+MAX_SLOWDOWN = 0.10
+MAX_MEMORY_GROWTH = 0.20
+# Peak memory growth smaller than this is noise, whatever the ratio
+MEMORY_NOISE_BYTES = 1 << 20
+
+
+class Skip(Exception):
+    """
+    Raised by a case that can't run at this size or in this environment
+    """
+
+
+def measure(func, units, repeat):
+    """
+    Time func() `repeat` times and trace the memory of one more call
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "units": units,
+        "seconds": round(best, 6),
+        "unitsPerSecond": round(units / best, 1) if best else None,
+        "peakMemoryBytes": peak
+    }
+
+
+class SyntheticData:
+    """
+    Sheets, workbooks and KYC stores for each size, built once and shared by the cases
+    """
+
+    def __init__(self, workdir, excel_max_rows=EXCEL_MAX_ROWS, record_limit=RECORD_LIMIT):
+        self.workdir = workdir
+        self.excel_max_rows = excel_max_rows
+        self.record_limit = record_limit
+        self._cache = {}
+
+    def _get(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def release(self, size):
+        # Drop everything built for one size before moving to the next
+        for key in [key for key in self._cache if key[1] == size]:
+            del self._cache[key]
+        gc.collect()
+
+    def sheets(self, size):
+        """
+        Synthetic sheets with the dtypes workbook_loader gives them
+        """
+        from workbook_loader import DEFAULT_DTYPES, compact_frame
+
+        def build():
+            return {name: compact_frame(df, (DEFAULT_DTYPES or {}).get(name))
+                    for name, df in make_sheets(size).items()}
+        return self._get(('sheets', size), build)
+
+    def snapshot(self, size):
+        from workbook_cache import WorkbookSnapshot
+        return self._get(('snapshot', size), lambda: WorkbookSnapshot(None, self.sheets(size), 0, 0))
+
+    def sample_ids(self, size):
+        ids = self.sheets(size)['Company_Data']['Applicant id'].tolist()
+        return ids[::max(1, len(ids) // self.record_limit)][:self.record_limit]
+
+    def workbook(self, size):
+        if size > self.excel_max_rows:
+            raise Skip(f"xlsx cases are limited to {self.excel_max_rows} rows (--excel-max-rows)")
+
+        def build():
+            path = os.path.join(self.workdir, f'workbook_{size}.xlsx')
+            write_workbook(path, size)
+            return path
+        return self._get(('workbook', size), build)
+
+    def application_parts(self, size):
+        return self._get(('parts', size), lambda: application_parts(self.sample_ids(size)))
+
+    def kyc_store(self, size):
+        from kyc_store import KYCRecordStore
+        return self._get(('kyc', size), lambda: KYCRecordStore.from_rows(synthetic_rows(size)))
+
+    def kyc_requests(self, size):
+        def build():
+            rows = list(islice(synthetic_rows(size), 0, size, max(1, size // self.record_limit)))
+            requests = []
+            for number, (customer_id, name, aadhaar, document_type) in enumerate(rows[:self.record_limit]):
+                # Every fourth request doesn't match its record
+                requests.append({'customer_id': customer_id, 'name': name if number % 4 else 'Someone Else',
+                                 'Aadhar_Number': aadhaar, 'document_type': document_type})
+            return requests
+        return self._get(('kyc_requests', size), build)
+
+
+def application_parts(applicant_ids):
+    """
+    The applicant, company and director parts of one application per
+    applicant id, as clients send them to /receive-partial-application
+    """
+    from benchmarks.synthetic import MSME_CLASSES
+    applications = []
+    for number, applicant_id in enumerate(applicant_ids):
+        flag = 'Yes' if number % 5 == 0 else 'No'
+        applications.append({
+            'applicant': {'ApplicantId': applicant_id, 'applicantFirstName': f'Name{number}',
+                          'applicantAadhaar': str(100000000000 + number)},
+            'company': {'companyName': f'Company {number}', 'companyCIN': f'U{number}',
+                        'companyMSME': MSME_CLASSES[number % len(MSME_CLASSES)]},
+            'director': {'directorFirstName': f'Director{number}', 'directorAadhaar': str(200000000000 + number),
+                         'isDirectorDueMissedLast6Months': flag,
+                         'isDirectorDueMissedLast12Months': 'No',
+                         'isDirectorDueMissedLast18Months': flag}
+        })
+    return applications
+
+
+# Micro-benchmarks: (name, case(data, size) -> (func, units))
+
+def read_excel_sheet_xlsx(data, size):
+    from workbook_loader import load_workbook
+    path = data.workbook(size)
+    return lambda: load_workbook(path, processes=1), 4 * size
+
+
+def read_excel_sheet_columnar_cache(data, size):
+    from columnar_cache import load_sheets
+    path = data.workbook(size)
+    cache_dir = os.path.join(data.workdir, 'sheet_cache')
+    sheets, report = load_sheets(path, cache_dir=cache_dir)
+    if report["source"] != "cache":
+        # The first load wrote the cache; this one should read it
+        sheets, report = load_sheets(path, cache_dir=cache_dir)
+    if report["source"] != "cache":
+        raise Skip("the columnar cache could not be written")
+    return lambda: load_sheets(path, cache_dir=cache_dir), 4 * size
+
+
+def _normalize_case(sheet_name):
+    def case(data, size):
+        from normalization import normalize_frame
+        import payload_schemas
+        schema = {
+            'Company_Data': payload_schemas.COMPANY_SCHEMA,
+            'Applicant_Data': payload_schemas.APPLICANT_SCHEMA,
+            'Directors_Data': payload_schemas.DIRECTORS_SCHEMA,
+            'Bank_Data': payload_schemas.BANK_SCHEMA
+        }[sheet_name]
+        df = data.sheets(size)[sheet_name]
+        return lambda: normalize_frame(df, schema), size
+    return case
+
+
+def onboard_payload_per_applicant(data, size):
+    # load_onboard_payload's work: three index lookups, build_onboard_payload and one serialization
+    from onboarding import ONBOARD_SHEETS, build_onboard_payload
+    from serialization import encode
+    snapshot = data.snapshot(size)
+    applicant_ids = data.sample_ids(size)
+
+    def run():
+        for applicant_id in applicant_ids:
+            rows = [snapshot.rows_for(sheet_name, applicant_id).iloc[0] for sheet_name, _ in ONBOARD_SHEETS]
+            encode(build_onboard_payload(applicant_id, *rows))
+    return run, len(applicant_ids)
+
+
+def onboard_payload_batch(data, size):
+    from batch_onboarding import assemble_payloads
+    snapshot = data.snapshot(size)
+    return lambda: assemble_payloads(snapshot), size
+
+
+def partial_application_assembly(data, size):
+    # merge_payloads and the Yes/No to boolean conversion of the completed application
+    from partial_applications import assemble_application
+    applications = data.application_parts(size)
+    return lambda: [assemble_application(parts) for parts in applications], len(applications)
+
+
+def verify_kyc(data, size):
+    try:
+        from kyc import KYCRequest, check_kyc
+    except ImportError as e:
+        raise Skip(f"kyc.py needs {e.name}")
+    store = data.kyc_store(size)
+    requests = [KYCRequest(**request) for request in data.kyc_requests(size)]
+    return lambda: [check_kyc(request, store) for request in requests], len(requests)
+
+
+MICRO_CASES = [
+    ('read_excel_sheet.xlsx', read_excel_sheet_xlsx),
+    ('read_excel_sheet.columnar_cache', read_excel_sheet_columnar_cache),
+    ('normalize.company', _normalize_case('Company_Data')),
+    ('normalize.applicant', _normalize_case('Applicant_Data')),
+    ('normalize.directors', _normalize_case('Directors_Data')),
+    ('normalize.bank', _normalize_case('Bank_Data')),
+    ('onboard_payload.per_applicant', onboard_payload_per_applicant),
+    ('onboard_payload.batch', onboard_payload_batch),
+    ('partial_application.assemble', partial_application_assembly),
+    ('verify_kyc', verify_kyc)
+]
+
+
+# End-to-end benchmarks: (name, case(e2e) -> (func, units)), run in the e2e working directory
+
+class EndToEnd:
+    """
+    A workbook of `applicants` named sample_excel_api.xlsx in a temporary
+    working directory, a stub downstream, and the services' environment
+    pointed at it. Services read their settings on import, so this has to be
+    set up before any of them is imported.
+    """
+
+    def __init__(self, workdir, applicants, requests):
+        self.workdir = workdir
+        self.requests = requests
+        self.applicant_ids = None
+        self._applicants = applicants
+        self._stub = None
+        self._previous_cwd = None
+        # Called on exit, e.g. to close test clients that ran startup handlers
+        self.closers = []
+
+    def __enter__(self):
+        os.makedirs(self.workdir, exist_ok=True)
+        write_workbook(os.path.join(self.workdir, 'sample_excel_api.xlsx'), self._applicants)
+        port = _free_port()
+        self._stub = start_stub(port)
+        stub_url = f"http://127.0.0.1:{port}"
+        os.environ.update({
+            'ONBOARD_URL': stub_url + '/onboard',
+            'BANK_URL': stub_url,
+            'BANK_ONBOARD_URL': stub_url + '/onboard-Applicant/{}',
+            'TARGET_URL': stub_url,
+            # Every request is forwarded, instead of replayed from the delivery ledger
+            'IDEMPOTENCY_BY_CONTENT': '0',
+            'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING')
+        })
+        self._previous_cwd = os.getcwd()
+        os.chdir(self.workdir)
+        from benchmarks.synthetic import _applicant_ids
+        self.applicant_ids = _applicant_ids(self._applicants, 0)
+        return self
+
+    def __exit__(self, *exc_info):
+        for close in self.closers:
+            close()
+        os.chdir(self._previous_cwd)
+        self._stub.shutdown()
+
+    def paths(self, template):
+        return [template.format(applicant_id) for applicant_id in islice(cycle(self.applicant_ids), self.requests)]
+
+
+def _send_all(send, requests):
+    def run():
+        failed = 0
+        for request in requests:
+            if send(request) >= 400:
+                failed += 1
+        if failed:
+            raise RuntimeError(f"{failed} of {len(requests)} requests failed")
+    return run
+
+
+def _flask_gets(module_name, template):
+    def case(e2e):
+        module = __import__(module_name)
+        client = module.app.test_client()
+        return _send_all(lambda path: client.get(path).status_code, e2e.paths(template)), e2e.requests
+    return case
+
+
+def _fastapi_client(app):
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError as e:
+        raise Skip(f"FastAPI's TestClient needs {e.name}")
+    return TestClient(app)
+
+
+def e2e_receive_kyc_details(e2e):
+    import process_and_send_request
+    client = process_and_send_request.app.test_client()
+    details = [{'ApplicantId': applicant_id, 'applicantFullName': f'Name{number} Surname{number}',
+                'applicantBankAccountNumber': 10 ** 11 + number, 'applicantBankName': 'HDFC Bank',
+                'applicantBankIFSCCode': 'HDFC000456', 'applicantBankBranchName': 'Mumbai'}
+               for number, applicant_id in enumerate(islice(cycle(e2e.applicant_ids), e2e.requests))]
+    return _send_all(lambda body: client.post('/receive-kyc-details', json=body).status_code, details), e2e.requests
+
+
+def e2e_receive_partial_application(e2e):
+    import process_and_send_request
+    client = process_and_send_request.app.test_client()
+    applications = application_parts(islice(cycle(e2e.applicant_ids), max(1, e2e.requests // 3)))
+    runs = iter(range(1 << 30))
+
+    def run():
+        # Fresh session ids on every run, so each application completes and is forwarded
+        prefix = f'bench-{next(runs)}-'
+        requests = [(prefix + str(number), part)
+                    for number, parts in enumerate(applications) for part in parts.values()]
+        _send_all(lambda request: client.post('/receive-partial-application', json=request[1],
+                                              query_string={'session_id': request[0]}).status_code, requests)()
+    return run, len(applications)
+
+
+def e2e_verify_kyc(e2e):
+    try:
+        import kyc
+    except ImportError as e:
+        raise Skip(f"kyc.py needs {e.name}")
+    client = _fastapi_client(kyc.app)
+    body = {'customer_id': 'ABC123', 'name': 'John Doe', 'Aadhar_Number': '123456789012', 'document_type': 'Aadhar'}
+    requests = [body] * e2e.requests
+    return _send_all(lambda body: client.post('/verify-kyc', json=body).status_code, requests), e2e.requests
+
+
+def e2e_gateway_onboard(e2e):
+    try:
+        import async_gateway
+    except ImportError as e:
+        raise Skip(f"async_gateway.py needs {e.name}")
+    client = _fastapi_client(async_gateway.app)
+    # Entering the client runs the startup handlers that open the outbound client
+    client.__enter__()
+    e2e.closers.append(lambda: client.__exit__(None, None, None))
+    paths = e2e.paths('/onboard-Applicant/{}')
+    return _send_all(lambda path: client.get(path).status_code, paths), e2e.requests
+
+
+E2E_CASES = [
+    ('e2e.excel_to_api.onboard_applicant', _flask_gets('excel_to_api', '/onboard-Applicant/{}')),
+    ('e2e.excel_to_api.bank_data', _flask_gets('excel_to_api', '/bank-data/{}')),
+    ('e2e.get_and_post_bank_data.bank_data', _flask_gets('get_and_post_bank_data', '/bank-data/{}')),
+    ('e2e.process_and_send_request.receive_kyc_details', e2e_receive_kyc_details),
+    ('e2e.process_and_send_request.receive_partial_application', e2e_receive_partial_application),
+    ('e2e.kyc.verify_kyc', e2e_verify_kyc),
+    ('e2e.async_gateway.onboard_applicant', e2e_gateway_onboard)
+]
+
+
+def _run_case(name, size, case, repeat):
+    try:
+        func, units = case()
+        return dict(name=name, size=size, **measure(func, units, repeat))
+    except Skip as e:
+        return {"name": name, "size": size, "skipped": str(e)}
+    except Exception as e:
+        return {"name": name, "size": size, "error": f"{type(e).__name__}: {e}"}
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def run_suite(sizes=DEFAULT_SIZES, repeat=3, only=None, e2e_applicants=1000, e2e_requests=300,
+              excel_max_rows=EXCEL_MAX_ROWS, record_limit=RECORD_LIMIT, progress=None):
+    """
+    Run the cases whose names contain one of the `only` substrings (all of
+    them when None) and return the report: {"meta": ..., "results": [...]}.
+    e2e_requests=0 skips the end-to-end cases. progress(result) is called
+    after each case.
+    """
+    selected = lambda name: not only or any(pattern in name for pattern in only)
+    results = []
+
+    def record(result):
+        results.append(result)
+        if progress is not None:
+            progress(result)
+
+    workdir = tempfile.mkdtemp(prefix='bench-suite-')
+    try:
+        # The services read their settings on import, so the end-to-end cases run first
+        cases = [(name, case) for name, case in E2E_CASES if selected(name)]
+        if e2e_requests and cases:
+            with EndToEnd(os.path.join(workdir, 'e2e'), e2e_applicants, e2e_requests) as e2e:
+                for name, case in cases:
+                    record(_run_case(name, e2e_applicants, lambda: case(e2e), repeat))
+
+        data = SyntheticData(workdir, excel_max_rows, record_limit)
+        for size in sizes:
+            for name, case in MICRO_CASES:
+                if selected(name):
+                    record(_run_case(name, size, lambda: case(data, size), repeat))
+            data.release(size)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    meta = {
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "gitCommit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeat": repeat,
+        "sizes": sizes,
+        "e2eApplicants": e2e_applicants,
+        "e2eRequests": e2e_requests,
+        "stubRevision": STUB_REVISION
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(baseline, current, max_slowdown=MAX_SLOWDOWN, max_memory_growth=MAX_MEMORY_GROWTH):
+    """
+    Return the regressions of one report against another: cases (matched by
+    name and size) whose throughput dropped by more than max_slowdown, whose
+    peak memory grew by more than max_memory_growth, or that now fail.
+    End-to-end cases measured against another stub revision are skipped.
+    """
+    same_stub = baseline.get("meta", {}).get("stubRevision") == current.get("meta", {}).get("stubRevision")
+    previous = {(result["name"], result["size"]): result
+                for result in baseline["results"] if "error" not in result and "skipped" not in result
+                and (same_stub or not result["name"].startswith("e2e."))}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get((result["name"], result["size"]))
+        if before is None or "skipped" in result:
+            continue
+        regression = {"name": result["name"], "size": result["size"]}
+        if "error" in result:
+            regressions.append(dict(regression, metric="error", current=result["error"]))
+            continue
+
+        # No throughput when a run was too fast to time (unitsPerSecond is None)
+        if result.get("unitsPerSecond") and before.get("unitsPerSecond"):
+            change = result["unitsPerSecond"] / before["unitsPerSecond"] - 1
+            if change < -max_slowdown:
+                regressions.append(dict(regression, metric="unitsPerSecond", baseline=before["unitsPerSecond"],
+                                        current=result["unitsPerSecond"], change=round(change, 3)))
+
+        growth = result["peakMemoryBytes"] - before["peakMemoryBytes"]
+        if growth > MEMORY_NOISE_BYTES and growth > max_memory_growth * before["peakMemoryBytes"]:
+            regressions.append(dict(regression, metric="peakMemoryBytes", baseline=before["peakMemoryBytes"],
+                                    current=result["peakMemoryBytes"],
+                                    change=round(growth / before["peakMemoryBytes"], 3) if before["peakMemoryBytes"] else None))
+    return regressions
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the request hot paths and check for regressions")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run the suite and write its JSON report")
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="rows per sheet")
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--only', nargs='+', help="run only cases whose name contains one of these")
+    run_parser.add_argument('--excel-max-rows', type=int, default=EXCEL_MAX_ROWS)
+    run_parser.add_argument('--record-limit', type=int, default=RECORD_LIMIT)
+    run_parser.add_argument('--e2e-applicants', type=int, default=1000)
+    run_parser.add_argument('--e2e-requests', type=int, default=300, help="requests per end-to-end case (0 skips them)")
+    run_parser.add_argument('--output', help="write the report here instead of stdout")
+    run_parser.add_argument('--baseline', help="an earlier report to check this run against")
+
+    compare_parser = commands.add_parser('compare', help="check a report against a baseline report")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+
+    for command in (run_parser, compare_parser):
+        command.add_argument('--max-slowdown', type=float, default=MAX_SLOWDOWN,
+                             help="flag cases whose throughput dropped by more than this fraction")
+        command.add_argument('--max-memory-growth', type=float, default=MAX_MEMORY_GROWTH,
+                             help="flag cases whose peak memory grew by more than this fraction")
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        report, baseline = _load(args.current), _load(args.baseline)
+    else:
+        report = run_suite(args.sizes, args.repeat, args.only, args.e2e_applicants, args.e2e_requests,
+                           args.excel_max_rows, args.record_limit,
+                           progress=lambda result: print(json.dumps(result), file=sys.stderr, flush=True))
+        baseline = _load(args.baseline) if args.baseline else None
+
+    if baseline is not None:
+        report["regressions"] = compare(baseline, report, args.max_slowdown, args.max_memory_growth)
+        report["baselineMeta"] = baseline.get("meta")
+
+    if args.command == 'compare':
+        print(json.dumps({key: report[key] for key in ("regressions", "baselineMeta")}, indent=2))
+    elif args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        if baseline is not None:
+            print(json.dumps({"regressions": report["regressions"]}, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+    sys.exit(1 if report.get("regressions") else 0)
+
+
+if __name__ == '__main__':
+    main()
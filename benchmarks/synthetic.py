@@ -0,0 +1,117 @@
+"""
+Synthetic workbooks shaped like sample_excel_api.xlsx, for benchmarks
+"""
+import argparse
+import uuid
+
+import numpy as np
+import pandas as pd
+
+
+DESIGNATIONS = ['CEO', 'CFO', 'Manager', 'Executive', 'Director', 'Officer', 'Assistant', 'Analyst']
+MSME_CLASSES = ['Micro', 'Small', 'Medium']
+BANKS = [
+    ('State Bank of India', 'SBIN000123'),
+    ('HDFC Bank', 'HDFC000456'),
+    ('ICICI Bank', 'ICIC000789'),
+    ('Axis Bank', 'UTIB000012'),
+    ('Punjab National Bank', 'PUNB000345'),
+    ('Bank of Baroda', 'BARB000678'),
+    ('Canara Bank', 'CNRB000901')
+]
+CITIES = ['Mumbai', 'Bengaluru', 'New Delhi', 'Chennai', 'Hyderabad', 'Pune', 'Kolkata']
+
+
+def _applicant_ids(n, seed):
+    rng = np.random.default_rng(seed)
+    raw = rng.integers(0, 2 ** 63, size=(n, 2), dtype=np.int64)
+    return [uuid.UUID(int=(int(hi) << 64) | int(lo)).hex for hi, lo in raw]
+
+
+def _labels(prefix, n):
+    return pd.Series(np.arange(n)).map(lambda i: f"{prefix}{i}")
+
+
+def make_sheets(n, seed=0):
+    """
+    Build the four sheets for n applicants as DataFrames
+    """
+    rng = np.random.default_rng(seed)
+    ids = _applicant_ids(n, seed)
+    numbers = np.arange(n, dtype=np.int64)
+    names = _labels('Name', n)
+    surnames = _labels('Surname', n)
+    emails = _labels('user', n) + '@example.com'
+    pick = lambda values: np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+    yes_no = lambda: np.where(rng.random(n) < 0.2, 'Yes', 'No')
+    bank_choice = rng.integers(0, len(BANKS), n)
+
+    company = pd.DataFrame({
+        'Applicant id': ids,
+        'Company Name': _labels('Company ', n),
+        'CIN': _labels('U', n),
+        'GSTIN': _labels('GST', n),
+        'Company PAN': _labels('PAN', n),
+        'Company Phone': 9000000000 + numbers,
+        'Company Email': 'info' + emails,
+        'Company Address': pick([f"{city}, India" for city in CITIES]),
+        'Company MSME': pick(MSME_CLASSES)
+    })
+    applicant = pd.DataFrame({
+        'Applicant id': ids,
+        'First Name': names,
+        'Last Name': surnames,
+        'Email': emails,
+        'Phone': 8000000000 + numbers,
+        'Designation': pick(DESIGNATIONS),
+        'Aadhar': 100000000000 + numbers
+    })
+    directors = pd.DataFrame({
+        'Applicant id': ids,
+        'Director First Name': names,
+        'Director Last Name': surnames,
+        'Director Email': 'dir' + emails,
+        'Director Phone': 7000000000 + numbers,
+        'Director Designation': pick(DESIGNATIONS),
+        'Director PAN': _labels('DPAN', n),
+        'Director Aadhaar': 200000000000 + numbers,
+        'Total Current No. of Loans': rng.integers(0, 5, n),
+        'Total Current No. of ODs': rng.integers(0, 3, n),
+        'Total Current Loan Outstanding': rng.integers(0, 5000000, n),
+        'Current Total EMI': rng.integers(0, 100000, n),
+        'Any Dues Missed in Last 6 Months': yes_no(),
+        'Any Dues Missed in Last 12 Months': yes_no(),
+        'Any Dues Missed in Last 18 Months': yes_no()
+    })
+    bank = pd.DataFrame({
+        'Applicant id': ids,
+        'Name': names + ' ' + surnames,
+        'Account No.': 30000000000 + numbers,
+        'Bank Name': [BANKS[i][0] for i in bank_choice],
+        'IFSC Code': [BANKS[i][1] for i in bank_choice],
+        'Branch Name': pick([f"{city} " for city in CITIES])
+    })
+    return {
+        'Applicant_Data': applicant,
+        'Company_Data': company,
+        'Directors_Data': directors,
+        'Bank_Data': bank
+    }
+
+
+def write_workbook(path, n, seed=0):
+    """
+    Write a synthetic workbook of n applicants to path
+    """
+    with pd.ExcelWriter(path) as writer:
+        for sheet_name, df in make_sheets(n, seed).items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write a synthetic applicant workbook")
+    parser.add_argument('path')
+    parser.add_argument('--applicants', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_workbook(args.path, args.applicants, args.seed)
@@ -0,0 +1,155 @@
+"""
+Row-level change detection between two workbook snapshots.
+
+Every applicant gets a content hash per sheet, built from pandas' vectorised
+row hashes of all of its rows. Diffing two snapshots compares those hashes
+by 'Applicant id', so an edit to one applicant reports that applicant only.
+Each diff is published on a Changefeed of added, modified and removed
+applicants that consumers can poll or subscribe to.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+
+# Changesets kept for /changes?since=
+CHANGEFEED_HISTORY = int(os.environ.get('CHANGEFEED_HISTORY', 100))
+
+
+def sheet_hashes(snapshot, sheet_name):
+    """
+    Map each applicant id in a sheet to a hash of its rows (in order),
+    computed once per snapshot
+    """
+    hashes = snapshot.content_hashes.get(sheet_name)
+    if hashes is None:
+        df = snapshot.sheet(sheet_name)
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        # The column names are part of the content, so a renamed column changes every applicant
+        header = hash(tuple(df.columns))
+        hashes = {applicant_id: hash((header, row_hashes[positions].tobytes()))
+                  for applicant_id, positions in snapshot.index.groups(sheet_name).items()}
+        snapshot.content_hashes[sheet_name] = hashes
+    return hashes
+
+
+class Changeset:
+    """
+    Applicants that differ between two snapshots, overall and per sheet
+    """
+
+    def __init__(self, sheets, added, modified, removed, old_version=None, new_version=None):
+        self.sheets = sheets
+        self.added = added
+        self.modified = modified
+        self.removed = removed
+        # Signatures of the two snapshots compared
+        self.old_version = old_version
+        self.new_version = new_version
+
+    def __bool__(self):
+        return bool(self.added or self.modified or self.removed)
+
+    def changed_in(self, *sheet_names):
+        """
+        Applicants still in the workbook whose rows were added, changed or
+        removed in any of these sheets
+        """
+        changed = set()
+        for sheet_name in sheet_names:
+            sheet = self.sheets.get(sheet_name)
+            if sheet is not None:
+                changed |= sheet['added'] | sheet['modified'] | sheet['removed']
+        return changed - self.removed
+
+    def to_dict(self):
+        return {
+            "added": sorted(self.added, key=str),
+            "modified": sorted(self.modified, key=str),
+            "removed": sorted(self.removed, key=str),
+            "sheets": {
+                sheet_name: {kind: sorted(ids, key=str) for kind, ids in sheet.items()}
+                for sheet_name, sheet in self.sheets.items()
+            }
+        }
+
+
+def diff_snapshots(old, new):
+    """
+    Compare two snapshots by 'Applicant id' and content hash, sheet by sheet
+    """
+    sheets = {}
+    old_ids, new_ids, touched = set(), set(), set()
+    for sheet_name in sorted(set(old.index.sheet_names()) | set(new.index.sheet_names())):
+        before = sheet_hashes(old, sheet_name) if sheet_name in old.sheets else {}
+        after = sheet_hashes(new, sheet_name) if sheet_name in new.sheets else {}
+        old_ids.update(before)
+        new_ids.update(after)
+        added = after.keys() - before.keys()
+        removed = before.keys() - after.keys()
+        modified = {applicant_id for applicant_id in after.keys() & before.keys()
+                    if after[applicant_id] != before[applicant_id]}
+        if added or removed or modified:
+            sheets[sheet_name] = {"added": added, "modified": modified, "removed": removed}
+            touched |= added | removed | modified
+    return Changeset(
+        sheets,
+        added=new_ids - old_ids,
+        modified=touched & old_ids & new_ids,
+        removed=old_ids - new_ids,
+        old_version=old.signature,
+        new_version=new.signature
+    )
+
+
+class Changefeed:
+    """
+    Numbered history of changesets with optional subscribers, which are
+    called as callback(snapshot, changeset) on the thread that published it.
+    Subscribers also see empty changesets (a reload that changed nothing),
+    which are not recorded as events.
+    """
+
+    def __init__(self, history=CHANGEFEED_HISTORY):
+        self._events = deque(maxlen=history)
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self.sequence = 0
+        self.subscriber_errors = 0
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def publish(self, snapshot, changeset):
+        event = None
+        with self._lock:
+            if changeset:
+                self.sequence += 1
+                event = {
+                    "sequence": self.sequence,
+                    "publishedAt": time.time(),
+                    "signature": list(snapshot.signature),
+                    **changeset.to_dict()
+                }
+                self._events.append(event)
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(snapshot, changeset)
+            except Exception:
+                # A failing consumer must not stop the others or the reload
+                self.subscriber_errors += 1
+        return event
+
+    def since(self, sequence):
+        """
+        Return (events after `sequence`, whether older events were already dropped)
+        """
+        with self._lock:
+            events = [event for event in self._events if event["sequence"] > sequence]
+            oldest = self._events[0]["sequence"] if self._events else self.sequence + 1
+        return events, sequence + 1 < oldest and sequence < self.sequence
@@ -0,0 +1,190 @@
+"""
+Per-sheet columnar cache of the workbook, keyed by the xlsx file's hash and
+the columns and dtypes loaded from it (see workbook_loader.py).
+
+    python columnar_cache.py sample_excel_api.xlsx [--format feather]
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import time
+
+from workbook_loader import DEFAULT_COLUMNS, DEFAULT_DTYPES, compact_frame, load_workbook, profile_digest
+
+
+CACHE_DIR = os.environ.get('SHEET_CACHE_DIR', '.sheet_cache')
+
+# Memory-map feather files instead of copying them into the heap
+MEMORY_MAP = os.environ.get('SHEET_CACHE_MMAP', '0') == '1'
+
+MANIFEST_NAME = 'manifest.json'
+
+# Hex digits of the digest in a cache directory's name (<workbook stem>-<digest>)
+DIGEST_CHARS = 16
+
+try:
+    import pyarrow.feather as feather
+    import pyarrow.parquet as parquet
+except ImportError:
+    feather = None
+    parquet = None
+
+FORMATS = ('feather', 'parquet', 'pickle')
+DEFAULT_FORMAT = 'feather' if feather is not None else 'pickle'
+
+
+def file_digest(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_path_for(file_path, digest, cache_dir=CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(cache_dir, f"{stem}-{digest[:DIGEST_CHARS]}")
+
+
+def _write_sheet(df, path_base, fmt):
+    if fmt == 'feather':
+        path = path_base + '.feather'
+        # Uncompressed so the file can be memory-mapped on read
+        df.reset_index(drop=True).to_feather(path, compression='uncompressed')
+    elif fmt == 'parquet':
+        path = path_base + '.parquet'
+        df.to_parquet(path, index=False)
+    else:
+        path = path_base + '.pkl'
+        with open(path, 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return os.path.basename(path)
+
+
+def _read_sheet(path, fmt, memory_map=MEMORY_MAP):
+    if fmt == 'feather':
+        return feather.read_table(path, memory_map=memory_map).to_pandas()
+    if fmt == 'parquet':
+        return parquet.read_table(path, memory_map=memory_map).to_pandas()
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def write_cache(file_path, sheets, digest, fmt=DEFAULT_FORMAT, cache_dir=CACHE_DIR):
+    """
+    Write every sheet to the cache directory for this digest. The directory is
+    built under a temporary name and renamed into place, so concurrent readers
+    never see a half-written cache.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown cache format: {fmt}")
+    if fmt != 'pickle' and feather is None:
+        raise ImportError("pyarrow is required for the feather and parquet formats")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    target = cache_path_for(file_path, digest, cache_dir)
+    staging = tempfile.mkdtemp(dir=cache_dir, prefix='.staging-')
+    manifest = {"source": os.path.basename(file_path), "digest": digest, "sheets": []}
+    try:
+        for position, (sheet_name, df) in enumerate(sheets.items()):
+            path_base = os.path.join(staging, f"sheet{position}")
+            try:
+                file_name = _write_sheet(df, path_base, fmt)
+                sheet_format = fmt
+            except Exception:
+                # Columns with mixed Python types can't go to Arrow; pickle always works
+                file_name = _write_sheet(df, path_base, 'pickle')
+                sheet_format = 'pickle'
+            manifest["sheets"].append({"name": sheet_name, "file": file_name, "format": sheet_format})
+        with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(staging, target)
+    except OSError:
+        # Another process published the same digest first
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.exists(os.path.join(target, MANIFEST_NAME)):
+            raise
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    _prune_stale(file_path, target, cache_dir)
+    return target
+
+
+def _prune_stale(file_path, keep, cache_dir):
+    # Only this workbook's caches: "a-<digest>" must not match workbook "a-b"'s
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    pattern = re.compile(re.escape(stem) + f"-[0-9a-f]{{{DIGEST_CHARS}}}")
+    for entry in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, entry)
+        if pattern.fullmatch(entry) and path != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def read_cache(cache_path, memory_map=MEMORY_MAP):
+    """
+    Read every sheet of a cache directory, in workbook order
+    """
+    with open(os.path.join(cache_path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    return {
+        sheet["name"]: _read_sheet(os.path.join(cache_path, sheet["file"]), sheet["format"], memory_map)
+        for sheet in manifest["sheets"]
+    }
+
+
+def cache_digest(file_path, columns=DEFAULT_COLUMNS, dtypes=DEFAULT_DTYPES):
+    """
+    Cache key: the file's hash, plus the load profile when sheets are pruned or compacted
+    """
+    digest = file_digest(file_path)
+    if columns is None and dtypes is None:
+        return digest
+    return hashlib.sha256(f"{digest}:{profile_digest(columns, dtypes)}".encode()).hexdigest()
+
+
+def load_sheets(file_path, cache_dir=CACHE_DIR, fmt=DEFAULT_FORMAT, memory_map=MEMORY_MAP,
+                columns=DEFAULT_COLUMNS, dtypes=DEFAULT_DTYPES):
+    """
+    Return (sheets, load report): the workbook's sheets from the columnar cache
+    when it matches the file's hash, and from the xlsx (refreshing the cache)
+    otherwise. The report says where they came from and how long each sheet
+    took to parse.
+    """
+    start = time.perf_counter()
+    digest = cache_digest(file_path, columns, dtypes)
+    cache_path = cache_path_for(file_path, digest, cache_dir)
+    if os.path.exists(os.path.join(cache_path, MANIFEST_NAME)):
+        try:
+            # Arrow strings come back from feather as objects; compacting again restores them
+            sheets = {name: compact_frame(df, (dtypes or {}).get(name))
+                      for name, df in read_cache(cache_path, memory_map).items()}
+            return sheets, {"source": "cache", "seconds": time.perf_counter() - start}
+        except Exception:
+            # A damaged cache is rebuilt from the xlsx below
+            shutil.rmtree(cache_path, ignore_errors=True)
+
+    sheets, timings = load_workbook(file_path, columns=columns, dtypes=dtypes)
+    try:
+        write_cache(file_path, sheets, digest, fmt, cache_dir)
+    except OSError:
+        # A read-only cache directory shouldn't stop us from serving the data
+        pass
+    return sheets, {"source": "xlsx", "seconds": time.perf_counter() - start, "sheetSeconds": timings}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert a workbook to the per-sheet columnar cache")
+    parser.add_argument('file_path')
+    parser.add_argument('--format', choices=FORMATS, default=DEFAULT_FORMAT)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    sheets, _ = load_workbook(args.file_path)
+    target = write_cache(args.file_path, sheets, cache_digest(args.file_path), args.format, args.cache_dir)
+    print(f"Wrote {len(sheets)} sheets to {target}")
@@ -1,85 +1,145 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 import pandas as pd
 import os
 import requests
+import http_client
 import threading
 import time
+from workbook_cache import get_workbook_cache
+from health import register_health_routes
+from normalization import normalize_frame
+from payload_schemas import COMPANY_SCHEMA, BANK_SCHEMA, APPLICANT_SCHEMA, DIRECTORS_SCHEMA
+from sheet_responses import sheet_response
+from onboarding import (read_applicant_rows, build_onboard_payload, load_onboard_payload, load_bank_details,
+                        forward_result, delivery_response)
+from batch_onboarding import onboard_batch, assemble_payloads, DEFAULT_PARALLELISM, ONBOARD_SHEETS
+from forwarding_queue import get_forwarding_queue, wants_async, QueueFullError
+from instrumentation import instrument_flask_app, span
+from serialization import encode, install_json_provider
+from session_store import claim, create_store
+from response_cache import ResponseCache
+from idempotency import DeliveryLedger, IdempotencyConflict, IDEMPOTENCY_HEADER, replay_headers
 
 
 app = Flask(__name__)
+instrument_flask_app(app, 'excel_to_api')
+install_json_provider(app)
 
 #--This is the backend dummy server for retrieving onboarding details
-Onboarded_URL_Server = 'http://localhost:5002/onboard'
+Onboarded_URL_Server = os.environ.get('ONBOARD_URL', 'http://localhost:5002/onboard')
 
 #--This is the backend dummy server for retrieving bank-details
-Bank_URL_SERVER = 'http://localhost:5003'
+Bank_URL_SERVER = os.environ.get('BANK_URL', 'http://localhost:5003')
 
 # Define allowed Excel file extensions
 ALLOWED_EXTENSIONS = {'.xlsx', '.xls'}
 
+# Sheets are served from an in-memory snapshot that reloads when the file changes
 def read_excel_sheet(file_path, sheet_name):
     try:
-        df = pd.read_excel(file_path, sheet_name=sheet_name)
+        with span('read_sheet', sheet=sheet_name):
+            df = get_workbook_cache(file_path).snapshot().sheet(sheet_name)
         return df
     except Exception as e:
         return str(e)
 
+# Queue a downstream forward and answer 202 without waiting for it
+def accept_for_delivery(url, payload, data):
+    try:
+        delivery_id = get_forwarding_queue().submit(url, payload)
+    except QueueFullError as e:
+        return jsonify({'data': data, 'error': str(e)}), 503, {'Retry-After': '1'}
+    return jsonify({
+        'data': data,
+        'deliveryId': delivery_id,
+        'statusUrl': f'/deliveries/{delivery_id}'
+    }), 202
+
+# Ready once the workbook snapshot is in memory (loads it on the first probe)
+def workbook_ready():
+    try:
+        get_workbook_cache('sample_excel_api.xlsx').snapshot()
+    except Exception as e:
+        return str(e)
+
+register_health_routes(app, workbook_ready)
+
 # Normalize company data
 def normalize_company_data(row):
-    return {
-        "Applicant ID": row['Applicant id'],
-        "Company Name": row['Company Name'],
-        "CIN": row['CIN'],
-        "GSTIN": row['GSTIN'],
-        "Company PAN": row['Company PAN'],
-        "Company Phone": int(row['Company Phone']),
-        "Company Email": row['Company Email'],
-        "Company Address": row['Company Address'],
-        "Company MSME": row['Company MSME']
-    }
+    return COMPANY_SCHEMA.convert(row)
 
 # Normalize bank data
 def normalize_bank_data(row):
-    return {
-        "Applicant id": row['Applicant id'],
-        "Name": row['Name'],
-        "Account No.": row['Account No.'],
-        "Bank Name": row['Bank Name'],
-        "IFSC Code": row['IFSC Code'],
-        "Branch Name": row['Branch Name']
-    }
-    
+    return BANK_SCHEMA.convert(row)
+
 # Normalize applicant data
 def normalize_applicant_data(row):
-    return {
-        "Applicant id": row['Applicant id'],
-        "First Name": row['First Name'],
-        "Last Name": row['Last Name'],
-        "Email": row['Email'],
-        "Phone": row['Phone'],
-        "Designation": row['Designation'],
-        "Aadhar": row['Aadhar']
-    }
+    return APPLICANT_SCHEMA.convert(row)
 
 # Normalize directors data
 def normalize_directors_data(row):
-    return {
-        "Applicant ID": row['Applicant id'],
-        "Director First Name": row['Director First Name'],
-        "Director Last Name": row['Director Last Name'],
-        "Director Email": row['Director Email'],
-        "Director Phone": row['Director Phone'],
-        "Director Designation": row['Director Designation'],
-        "Director PAN": row['Director PAN'],
-        "Director Aadhaar": row['Director Aadhaar'],
-        "Total Current No. of Loans": int(row['Total Current No. of Loans']),
-        "Total Current No. of ODs": int(row['Total Current No. of ODs']),
-        "Total Current Loan Outstanding": int(row['Total Current Loan Outstanding']),
-        "Current Total EMI": int(row['Current Total EMI']),
-        "Any Dues Missed in Last 6 Months": row['Any Dues Missed in Last 6 Months'] == 'Yes',
-        "Any Dues Missed in Last 12 Months": row['Any Dues Missed in Last 12 Months'] == 'Yes',
-        "Any Dues Missed in Last 18 Months": row['Any Dues Missed in Last 18 Months'] == 'Yes'
-    }
+    return DIRECTORS_SCHEMA.convert(row)
+
+# Version of the workbook snapshot that cached payloads are checked against
+def workbook_version(file_path):
+    try:
+        return get_workbook_cache(file_path).snapshot().signature
+    except Exception:
+        return None
+
+# Assembled payloads per applicant, kept while the workbook version (or the applicant's rows) don't change
+onboard_payloads = ResponseCache('onboard')
+bank_payloads = ResponseCache('bank')
+
+def refresh_payload_caches(snapshot, changeset):
+    onboard_stale = changeset.changed_in(*[sheet_name for sheet_name, _ in ONBOARD_SHEETS])
+    bank_stale = changeset.changed_in('Bank_Data')
+    onboard_payloads.carry_over(changeset.old_version, changeset.new_version,
+                                lambda applicant_id: applicant_id in onboard_stale or applicant_id in changeset.removed)
+    bank_payloads.carry_over(changeset.old_version, changeset.new_version,
+                             lambda applicant_id: applicant_id in bank_stale or applicant_id in changeset.removed)
+
+get_workbook_cache('sample_excel_api.xlsx').changes.subscribe(refresh_payload_caches)
+
+# Recent successful forwards, so client retries are answered without POSTing again
+onboard_deliveries = DeliveryLedger('onboard')
+bank_deliveries = DeliveryLedger('bank')
+
+# Re-forward only the applicants a workbook edit touched (opt in with REFORWARD_ON_CHANGE=1)
+REFORWARD_ON_CHANGE = os.environ.get('REFORWARD_ON_CHANGE', '0') == '1'
+
+# Seconds a claim is kept; it must outlast the longest gap between two workers
+# reloading the same edit, so by default claims never expire (the size cap
+# drops the oldest versions)
+REFORWARD_CLAIM_TTL = float(os.environ.get('REFORWARD_CLAIM_TTL', 'inf'))
+
+# Which process forwards each workbook version. Every worker sees the same edit,
+# so the claims always live in SQLite (SESSION_DB), whatever SESSION_BACKEND says;
+# a per-process store would let each worker claim, and re-forward, every change
+reforward_claims = (create_store('reforward_claims', ttl=REFORWARD_CLAIM_TTL, backend='sqlite')
+                    if REFORWARD_ON_CHANGE else None)
+
+def reforward_changes(snapshot, changeset):
+    if not changeset:
+        return
+    version = '{}-{}'.format(*snapshot.signature)
+    if not claim(reforward_claims, version):
+        return
+    forwarding_queue = get_forwarding_queue()
+    onboard_ids = changeset.changed_in(*[sheet_name for sheet_name, _ in ONBOARD_SHEETS])
+    if onboard_ids:
+        payloads, _ = assemble_payloads(snapshot, sorted(onboard_ids, key=str))
+        for payload in payloads:
+            forwarding_queue.submit(Onboarded_URL_Server, payload)
+    for applicant_id in sorted(changeset.changed_in('Bank_Data'), key=str):
+        bank_data = normalize_frame(snapshot.rows_for('Bank_Data', applicant_id), BANK_SCHEMA)
+        forwarding_queue.submit(Bank_URL_SERVER + '/bank-details', {
+            'applicant_id': applicant_id,
+            'bank_details': bank_data
+        })
+
+if REFORWARD_ON_CHANGE:
+    get_workbook_cache('sample_excel_api.xlsx').changes.subscribe(reforward_changes)
 
 # API endpoint for company data
 @app.route('/company-data', methods=['GET'])
@@ -89,8 +149,7 @@ def get_company_data():
         return jsonify({'error': 'File not found'}), 404
     try:
         df = read_excel_sheet(file_path, 'Company_Data')
-        data = [normalize_company_data(row) for index, row in df.iterrows()]
-        return jsonify(data), 200
+        return sheet_response(df, COMPANY_SCHEMA, request)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -101,94 +160,84 @@ def get_all_data_by_id(applicant_id):
     if not os.path.exists(file_path):
         return jsonify({'error': 'File not found'}), 404
 
-    # Read company data
-    company_response = read_excel_sheet(file_path, 'Company_Data')
-    if "error" in company_response:
-        return jsonify(company_response), 500
-    company_df = company_response[company_response['Applicant id'] == applicant_id]
-    if company_df.empty:
-        return jsonify({'error': 'Company data not found'}), 404
-    company_data = company_df.iloc[0]
-
-    # Read applicant data
-    applicant_response = read_excel_sheet(file_path, 'Applicant_Data')
-    if "error" in applicant_response:
-        return jsonify(applicant_response), 500
-    applicant_df = applicant_response[applicant_response['Applicant id'] == applicant_id]
-    if applicant_df.empty:
-        return jsonify({'error': 'Applicant data not found'}), 404
-    applicant_data = applicant_df.iloc[0]
-
-    # Read directors data
-    directors_response = read_excel_sheet(file_path, 'Directors_Data')
-    if "error" in directors_response:
-        return jsonify(directors_response), 500
-    directors_df = directors_response[directors_response['Applicant id'] == applicant_id]
-    if directors_df.empty:
-        return jsonify({'error': 'Directors data not found'}), 404
-    directors_data = directors_df.iloc[0]
-
-    # Combine data with explicit type conversion
-    all_data = {
-        "ApplicantId": applicant_id,
-        "companyName": str(company_data['Company Name']),
-        "companyCIN": str(company_data['CIN']),
-        "companyGSTIN": str(company_data['GSTIN']),
-        "companyPAN": str(company_data['Company PAN']),
-        "companyPhone": str(company_data['Company Phone']),
-        "companyEmail": str(company_data['Company Email']),
-        "companyAddress": str(company_data['Company Address']),
-        "companyMSME": str(company_data['Company MSME']),
-        "applicantFirstName": str(applicant_data['First Name']),
-        "applicantLastName": str(applicant_data['Last Name']),
-        "applicantEmail": str(applicant_data['Email']),
-        "applicantPhone": str(applicant_data['Phone']),
-        "applicantDesignation": str(applicant_data['Designation']),
-        "applicantAadhaar": str(applicant_data['Aadhar']),
-        "directorFirstName": str(directors_data['Director First Name']),
-        "directorLastName": str(directors_data['Director Last Name']),
-        "directorEmail": str(directors_data['Director Email']),
-        "directorPhone": str(directors_data['Director Phone']),
-        "directorDesignation": str(directors_data['Director Designation']),
-        "directorAadhaar": str(directors_data['Director Aadhaar']),
-        "directorPAN": str(directors_data['Director PAN']),
-        "directorTotalLoanCount": int(directors_data['Total Current No. of Loans']),
-        "directorTotalODCount": int(directors_data['Total Current No. of ODs']),
-        "directorCurrentLoanOutstanding": int(directors_data['Total Current Loan Outstanding']),
-        "directorCurrentLoanEMI": int(directors_data['Current Total EMI']),
-        "isDirectorDueMissedLast6Months": directors_data['Any Dues Missed in Last 6 Months'] == 'Yes',
-        "isDirectorDueMissedLast12Months": directors_data['Any Dues Missed in Last 12 Months'] == 'Yes',
-        "isDirectorDueMissedLast18Months": directors_data['Any Dues Missed in Last 18 Months'] == 'Yes'
-    }
+    # Reuse the payload assembled for this workbook version, if any
+    version = workbook_version(file_path)
+    entry = onboard_payloads.get(applicant_id, version)
+    if entry is None:
+        all_data = load_onboard_payload(file_path, applicant_id)
+        if isinstance(all_data, tuple):
+            message, status_code = all_data
+            return jsonify({'error': message}), status_code
+        entry = onboard_payloads.put(applicant_id, version, all_data)
+    etag = {'ETag': f'"{entry.etag}"'}
+    if request.if_none_match.contains(entry.etag):
+        return '', 304, etag
+    all_data = entry.payload
+    if wants_async(request):
+        return accept_for_delivery(Onboarded_URL_Server, all_data, all_data)
+    # Send data to another server
+    def send():
+        try:
+            with span('forward', target='onboard'):
+                response = http_client.post(
+                    Onboarded_URL_Server, 
+                    json=all_data,
+                    headers={'Content-Type': 'application/json'}
+                )
+        except requests.exceptions.RequestException as e:
+            # Log network errors
+            print(f"Network error when sending data: {e}")
+            return {'error': str(e)}, False
+        return forward_result(response.status_code)
+
+    # A retry of a delivered payload (same Idempotency-Key, or same content) is not sent again
     try:
-        # Send data to another server
-        response = requests.post(
-            Onboarded_URL_Server, 
-            json=all_data,
-            headers={'Content-Type': 'application/json'}
-        )
-        
-        # Check the response from the target server
-        if response.status_code != 200:
-            # Log the error or handle it as needed
-            print(f"Failed to send data to target server. Status: {response.status_code}")
-            # You might want to return a warning, but still return the original data
-            return jsonify({
-                'data': all_data,
-                'warning': 'Failed to send data to target server'
-            }), 206  # Partial Content status
-    
-    except requests.exceptions.RequestException as e:
-        # Log network errors
-        print(f"Network error when sending data: {e}")
-        return jsonify({
-            'data': all_data,
-            'error': 'Failed to send data to target server'
-        }), 206  # Partial Content status
-    return jsonify(all_data), 200
+        delivery, replayed = onboard_deliveries.deliver(request.headers.get(IDEMPOTENCY_HEADER), all_data.data, send)
+    except IdempotencyConflict as e:
+        return jsonify({'error': str(e)}), 422
+
+    # The data comes back either way; 206 (Partial Content) when the target didn't take it
+    body, status_code = delivery_response(all_data, delivery, 'onboard')
+    if status_code != 200:
+        return jsonify(body), status_code
+    return jsonify(all_data), 200, {**etag, **replay_headers(replayed)}
 
     
 
+# API endpoint to assemble and forward many applicants in one call
+@app.route('/onboard-Applicants', methods=['POST'])
+def onboard_applicants():
+    file_path = 'sample_excel_api.xlsx'
+    if not os.path.exists(file_path):
+        return jsonify({'error': 'File not found'}), 404
+
+    body = request.get_json(silent=True) or {}
+    applicant_ids = body.get('applicantIds')
+    if applicant_ids == 'all':
+        applicant_ids = None
+    elif not isinstance(applicant_ids, list) or not applicant_ids:
+        return jsonify({'error': "applicantIds must be a non-empty list or 'all'"}), 400
+
+    # ?parallelism= or "parallelism" in the body; onboard_batch caps it at MAX_PARALLELISM
+    try:
+        parallelism = int(request.args.get('parallelism', body.get('parallelism', DEFAULT_PARALLELISM)))
+    except (TypeError, ValueError):
+        parallelism = 0
+    if parallelism < 1:
+        return jsonify({'error': 'parallelism must be a positive integer'}), 400
+
+    try:
+        summary = onboard_batch(
+            file_path,
+            Onboarded_URL_Server,
+            applicant_ids,
+            parallelism=parallelism,
+            forward=body.get('forward', True)
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify(summary), 200
+
 # API endpoint for applicant data
 @app.route('/applicant-data', methods=['GET'])
 def get_applicant_data():
@@ -196,22 +245,19 @@ def get_applicant_data():
     if not os.path.exists(file_path):
         return jsonify({'error': 'File not found'}), 404
     response = read_excel_sheet(file_path, 'Applicant_Data')
-    if "error" in response:  # Handle read_excel_sheet errors
-        return jsonify(response), 500
-    data = [normalize_applicant_data(row) for index, row in response.iterrows()]
-    return jsonify(data), 200
+    if isinstance(response, str):  # Handle read_excel_sheet errors
+        return jsonify({'error': response}), 500
+    return sheet_response(response, APPLICANT_SCHEMA, request)
 
 # API endpoint for directors data
-@app.route('/directors-data>', methods=['GET'])
+@app.route('/directors-data', methods=['GET'])
 def get_directors_data():
     file_path = 'sample_excel_api.xlsx'
     if not os.path.exists(file_path):
         return jsonify({'error': 'File not found'}), 404
     try:
         df = read_excel_sheet(file_path, 'Directors_Data')
-        print(df.columns)  # Print column names to verify
-        data = [normalize_directors_data(row) for index, row in df.iterrows()]
-        return jsonify(data), 200
+        return sheet_response(df, DIRECTORS_SCHEMA, request)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
@@ -222,44 +268,100 @@ def get_bank_data_by_id(applicant_id):
         return jsonify({'error': 'File not found'}), 404
     
     try:
-        df = read_excel_sheet(file_path, 'Bank_Data')
-        applicant_df = df[df['Applicant id'] == applicant_id]
-        if applicant_df.empty:
-            return jsonify({'error': 'Applicant bank data not found'}), 404
-        
-        # Normalize bank data
-        bank_data = [normalize_bank_data(row) for index, row in applicant_df.iterrows()]
+        # Reuse the bank details normalized for this workbook version, if any
+        version = workbook_version(file_path)
+        entry = bank_payloads.get(applicant_id, version)
+        if entry is None:
+            # Normalize bank data
+            bank_data = load_bank_details(file_path, applicant_id)
+            if isinstance(bank_data, tuple):
+                message, status_code = bank_data
+                return jsonify({'error': message}), status_code
+            entry = bank_payloads.put(applicant_id, version, bank_data)
+        etag = {'ETag': f'"{entry.etag}"'}
+        if request.if_none_match.contains(entry.etag):
+            return '', 304, etag
+        bank_data = entry.payload
+        bank_payload = {
+            'applicant_id': applicant_id,
+            'bank_details': bank_data
+        }
+        if wants_async(request):
+            return accept_for_delivery(Bank_URL_SERVER + '/bank-details', bank_payload, bank_data)
         
         # Send data to target server
+        def send():
+            try:
+                with span('forward', target='bank'):
+                    response = http_client.post(
+                        Bank_URL_SERVER + '/bank-details', 
+                        json=bank_payload,
+                        headers={'Content-Type': 'application/json'}
+                    )
+            except requests.exceptions.RequestException as e:
+                print(f"Network error when sending bank data: {e}")
+                return {'error': str(e)}, False
+            return forward_result(response.status_code)
+
         try:
-            response = requests.post(
-                Bank_URL_SERVER + '/bank-details', 
-                json={
-                    'applicant_id': applicant_id,
-                    'bank_details': bank_data
-                },
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            if response.status_code != 200:
-                print(f"Failed to send bank data to target server. Status: {response.status_code}")
-                return jsonify({
-                    'data': bank_data,
-                    'warning': 'Failed to send data to target server'
-                }), 206
-        
-        except requests.exceptions.RequestException as e:
-            print(f"Network error when sending bank data: {e}")
-            return jsonify({
-                'data': bank_data,
-                'error': 'Failed to send data to target server'
-            }), 206
+            delivery, replayed = bank_deliveries.deliver(request.headers.get(IDEMPOTENCY_HEADER),
+                                                         encode(bank_payload).data, send)
+        except IdempotencyConflict as e:
+            return jsonify({'error': str(e)}), 422
+
+        body, status_code = delivery_response(bank_data, delivery, 'bank')
+        if status_code != 200:
+            return jsonify(body), status_code
         
-        return jsonify(bank_data), 200
+        return jsonify(bank_data), 200, {**etag, **replay_headers(replayed)}
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# API endpoint reporting the workbook snapshot state
+@app.route('/cache-stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(get_workbook_cache('sample_excel_api.xlsx').stats()), 200
+
+
+# API endpoint for the changefeed of added, modified and removed applicants
+@app.route('/changes', methods=['GET'])
+def get_changes():
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'error': 'since must be an integer'}), 400
+    changes = get_workbook_cache('sample_excel_api.xlsx').changes
+    events, truncated = changes.since(since)
+    return jsonify({
+        'sequence': changes.sequence,
+        'truncated': truncated,
+        'changes': events
+    }), 200
+
+
+# API endpoint reporting hit/miss/eviction counts of the assembled payload caches
+@app.route('/payload-cache-stats', methods=['GET'])
+def get_payload_cache_stats():
+    return jsonify({
+        'onboard': onboard_payloads.stats(),
+        'bank': bank_payloads.stats(),
+        'deliveries': [onboard_deliveries.stats(), bank_deliveries.stats()]
+    }), 200
+
+
+# API endpoint for the status of a queued forward
+@app.route('/deliveries/<string:delivery_id>', methods=['GET'])
+def get_delivery_status(delivery_id):
+    status = get_forwarding_queue().status(delivery_id)
+    if status is None:
+        return jsonify({'error': 'Delivery not found'}), 404
+    return jsonify(status), 200
+
+# API endpoint reporting outbound connection pool, retry and breaker metrics
+@app.route('/outbound-stats', methods=['GET'])
+def get_outbound_stats():
+    return jsonify(http_client.get_client().metrics()), 200
 
 
 if __name__ == '__main__':
@@ -0,0 +1,227 @@
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import requests
+import http_client
+
+
+QUEUE_SIZE = int(os.environ.get('FORWARD_QUEUE_SIZE', 1000))
+WORKERS = int(os.environ.get('FORWARD_WORKERS', 4))
+# Deliveries a worker takes off the queue per wake-up
+BATCH_SIZE = int(os.environ.get('FORWARD_BATCH_SIZE', 20))
+MAX_ATTEMPTS = int(os.environ.get('FORWARD_MAX_ATTEMPTS', 5))
+RETRY_DELAY = float(os.environ.get('FORWARD_RETRY_DELAY', 2))
+# Finished deliveries kept around for /deliveries/<id>
+STATUS_HISTORY = int(os.environ.get('FORWARD_STATUS_HISTORY', 10000))
+
+QUEUED = 'queued'
+IN_FLIGHT = 'in_flight'
+DELIVERED = 'delivered'
+FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the forwarding queue has no room for another delivery
+    """
+
+
+class ForwardingQueue:
+    """
+    Bounded in-process queue of payloads to POST downstream, drained by a
+    pool of worker threads in batches, with per-delivery retry
+    """
+
+    def __init__(self, maxsize=QUEUE_SIZE, workers=WORKERS, batch_size=BATCH_SIZE,
+                 max_attempts=MAX_ATTEMPTS, retry_delay=RETRY_DELAY):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.workers = workers
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._statuses = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pending = 0
+        self._idle = threading.Condition(self._lock)
+
+    def _start(self):
+        # Workers start lazily so importing the app (or forking it) spawns no threads
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"forwarder-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _update(self, delivery_id, **changes):
+        with self._lock:
+            status = self._statuses.get(delivery_id)
+            if status is not None:
+                status.update(changes, updatedAt=time.time())
+
+    def submit(self, url, payload):
+        """
+        Queue a JSON payload for delivery and return its delivery id
+        """
+        self._start()
+        delivery_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._statuses[delivery_id] = {
+                "deliveryId": delivery_id,
+                "target": url,
+                "status": QUEUED,
+                "attempts": 0,
+                "createdAt": now,
+                "updatedAt": now
+            }
+            while len(self._statuses) > STATUS_HISTORY:
+                self._statuses.popitem(last=False)
+            self._pending += 1
+        try:
+            self._queue.put_nowait((delivery_id, url, payload, 0))
+        except queue.Full:
+            with self._lock:
+                self._statuses.pop(delivery_id, None)
+                self._done()
+            raise QueueFullError("Forwarding queue is full")
+        return delivery_id
+
+    def status(self, delivery_id):
+        with self._lock:
+            status = self._statuses.get(delivery_id)
+            return dict(status) if status is not None else None
+
+    def _done(self):
+        # Caller holds self._lock
+        self._pending -= 1
+        if self._pending == 0:
+            self._idle.notify_all()
+
+    def _take_batch(self):
+        # Block for one delivery, then take whatever else is queued, up to batch_size
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Group by target, so each target's deliveries go out back to back
+            # on its pooled keep-alive connection
+            by_target = OrderedDict()
+            for item in self._take_batch():
+                by_target.setdefault(item[1], []).append(item)
+            for items in by_target.values():
+                for delivery_id, url, payload, attempts in items:
+                    try:
+                        self._deliver(delivery_id, url, payload, attempts)
+                    except Exception as e:
+                        # Never let one delivery kill the worker or leave drain() waiting for it
+                        try:
+                            self._update(delivery_id, status=FAILED, error=f"{type(e).__name__}: {e}")
+                        finally:
+                            with self._lock:
+                                self._done()
+
+    def _deliver(self, delivery_id, url, payload, attempts):
+        attempts += 1
+        self._update(delivery_id, status=IN_FLIGHT, attempts=attempts)
+        try:
+            response = http_client.post(url, json=payload, headers={'Content-Type': 'application/json'})
+            if response.status_code == 200:
+                self._update(delivery_id, status=DELIVERED, statusCode=response.status_code, error=None)
+                with self._lock:
+                    self._done()
+                return
+            retryable = response.status_code >= 500
+            error = f"Target responded with status {response.status_code}"
+            self._update(delivery_id, statusCode=response.status_code, error=error)
+        except requests.exceptions.RequestException as e:
+            retryable = True
+            self._update(delivery_id, error=str(e))
+
+        if retryable and attempts < self.max_attempts:
+            self._update(delivery_id, status=QUEUED)
+            timer = threading.Timer(self.retry_delay * attempts, self._requeue,
+                                    args=(delivery_id, url, payload, attempts))
+            timer.daemon = True
+            timer.start()
+            return
+        self._update(delivery_id, status=FAILED)
+        with self._lock:
+            self._done()
+
+    def _requeue(self, delivery_id, url, payload, attempts):
+        try:
+            self._queue.put_nowait((delivery_id, url, payload, attempts))
+        except queue.Full:
+            self._update(delivery_id, status=FAILED, error="Forwarding queue full on retry")
+            with self._lock:
+                self._done()
+
+    def drain(self, timeout=None):
+        """
+        Wait until every submitted delivery has finished; returns False on timeout
+        """
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for status in self._statuses.values():
+                counts[status["status"]] = counts.get(status["status"], 0) + 1
+            return {
+                "queued": self._queue.qsize(),
+                "capacity": self._queue.maxsize,
+                "pending": self._pending,
+                "workers": len(self._threads),
+                "batchSize": self.batch_size,
+                "byStatus": counts
+            }
+
+
+_forwarding_queue = None
+_forwarding_queue_lock = threading.Lock()
+
+
+def get_forwarding_queue():
+    """
+    Return the process-wide forwarding queue
+    """
+    global _forwarding_queue
+    if _forwarding_queue is None:
+        with _forwarding_queue_lock:
+            if _forwarding_queue is None:
+                _forwarding_queue = ForwardingQueue()
+    return _forwarding_queue
+
+
+def drain_forwarding_queue(timeout=None):
+    """
+    Wait for queued deliveries if this process ever used the queue
+    """
+    if _forwarding_queue is None:
+        return True
+    return _forwarding_queue.drain(timeout)
+
+
+def wants_async(request):
+    """
+    Fire-and-forget is selected with ?async=1 or a 'Prefer: respond-async' header
+    """
+    if request.args.get('async', '').lower() in ('1', 'true'):
+        return True
+    return 'respond-async' in request.headers.get('Prefer', '')
@@ -1,31 +1,49 @@
 from flask import Flask, jsonify, request
-import pandas as pd
 import os
 import requests
+import http_client
+from workbook_cache import get_workbook_cache
+from health import register_health_routes
+from payload_schemas import BANK_DETAILS_SCHEMA
+from serialization import encode, install_json_provider
+from instrumentation import instrument_flask_app, span
+from idempotency import DeliveryLedger, IdempotencyConflict, IDEMPOTENCY_HEADER, replay_headers
 
 app = Flask(__name__)
+instrument_flask_app(app, 'get_and_post_bank_data')
+install_json_provider(app)
 
 # Backend server for posting data
-Onboarded_URL_Server = 'https://f93d-2401-4900-9018-253c-4dc5-1ae6-b7c4-7e16.ngrok-free.app/onboard-Applicant/{}'
+Onboarded_URL_Server = os.environ.get(
+    'BANK_ONBOARD_URL',
+    'https://f93d-2401-4900-9018-253c-4dc5-1ae6-b7c4-7e16.ngrok-free.app/onboard-Applicant/{}'
+)
 
-# Function to read Excel file and handle errors
-def read_excel_sheet(file_path, sheet_name):
+# Function to look up one applicant's rows through the applicant index
+def read_applicant_rows(file_path, sheet_name, applicant_id):
     try:
-        df = pd.read_excel(file_path, sheet_name=sheet_name)
-        return df
+        with span('read_sheet', sheet=sheet_name):
+            snapshot = get_workbook_cache(file_path).snapshot()
+        with span('filter', sheet=sheet_name):
+            return snapshot.rows_for(sheet_name, applicant_id)
     except Exception as e:
         return str(e)
 
+# Ready once the workbook snapshot is in memory (loads it on the first probe)
+def workbook_ready():
+    try:
+        get_workbook_cache('sample_excel_api.xlsx').snapshot()
+    except Exception as e:
+        return str(e)
+
+register_health_routes(app, workbook_ready)
+
 # Normalize bank data
 def normalize_bank_data(row):
-    return {
-        "ApplicantId": row['Applicant id'],
-        "applicantFullName": row['Name'],
-        "applicantBankAccountNumber": int(row['Account No.']),
-        "applicantBankName": row['Bank Name'],
-        "applicantBankIFSCCode": row['IFSC Code'],
-        "applicantBankBranchName": row['Branch Name']
-    }
+    return BANK_DETAILS_SCHEMA.convert(row)
+
+# Recent successful posts, so client retries are answered without posting again
+bank_deliveries = DeliveryLedger('bank_onboard')
 
 # API endpoint for retrieving bank data by Applicant ID
 @app.route('/bank-data/<string:applicant_id>', methods=['GET'])
@@ -35,45 +53,62 @@ def get_bank_data_by_id(applicant_id):
         return jsonify({'error': 'File not found'}), 404
 
     try:
-        # Read the "Bank_Data" sheet
-        df = read_excel_sheet(file_path, 'Bank_Data')
-        if isinstance(df, str):  # Check if an error occurred
-            return jsonify({'error': df}), 500
+        # Read the applicant's "Bank_Data" rows
+        applicant_df = read_applicant_rows(file_path, 'Bank_Data', applicant_id)
+        if isinstance(applicant_df, str):  # Check if an error occurred
+            return jsonify({'error': applicant_df}), 500
 
-        # Filter rows by Applicant ID
-        applicant_df = df[df['Applicant id'] == applicant_id]
         if applicant_df.empty:
             return jsonify({'error': 'Applicant bank data not found'}), 404
 
         # Extract and normalize data
-        bank_data = [normalize_bank_data(row) for index, row in applicant_df.iterrows()][0]  # Expecting one result
+        with span('assemble', route='bank'):
+            bank_data = encode(normalize_bank_data(applicant_df.iloc[0].to_dict()))  # Expecting one result
 
         # Post the normalized data to the target server
+        def send():
+            try:
+                target_url = Onboarded_URL_Server.format(applicant_id)
+                with span('forward', target='onboard'):
+                    response = http_client.post(
+                        target_url,
+                        json=bank_data,
+                        headers={'Content-Type': 'application/json'}
+                    )
+            except requests.exceptions.RequestException as e:
+                return {'error': f'Network error when sending data: {e}'}, False
+            return {'statusCode': response.status_code}, response.status_code == 200
+
+        # The target URL carries the applicant id, so it is part of the content key
         try:
-            target_url = Onboarded_URL_Server.format(applicant_id)
-            response = requests.post(
-                target_url,
-                json=bank_data,
-                headers={'Content-Type': 'application/json'}
-            )
-
-            if response.status_code != 200:
-                return jsonify({
-                    'data': bank_data,
-                    'warning': f'Failed to send data to target server. Status code: {response.status_code}'
-                }), 206  # Partial Content
-
-        except requests.exceptions.RequestException as e:
+            delivery, replayed = bank_deliveries.deliver(request.headers.get(IDEMPOTENCY_HEADER),
+                                                         applicant_id.encode() + b'\n' + bank_data.data, send)
+        except IdempotencyConflict as e:
+            return jsonify({'error': str(e)}), 422
+
+        if 'error' in delivery:
             return jsonify({
                 'data': bank_data,
-                'error': f'Network error when sending data: {e}'
+                'error': delivery['error']
             }), 206  # Partial Content
 
-        return jsonify(bank_data), 200
+        if delivery['statusCode'] != 200:
+            return jsonify({
+                'data': bank_data,
+                'warning': f"Failed to send data to target server. Status code: {delivery['statusCode']}"
+            }), 206  # Partial Content
+
+        return jsonify(bank_data), 200, replay_headers(replayed)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+# API endpoint reporting outbound connection pool, retry and breaker metrics
+@app.route('/outbound-stats', methods=['GET'])
+def get_outbound_stats():
+    return jsonify(http_client.get_client().metrics()), 200
+
+
 if __name__ == '__main__':
     app.run(port=5001, debug=True)
@@ -0,0 +1,35 @@
+import threading
+
+from flask import jsonify
+
+
+# Set when the process is shutting down so load balancers stop sending traffic
+_draining = threading.Event()
+
+
+def start_draining():
+    _draining.set()
+
+
+def is_draining():
+    return _draining.is_set()
+
+
+def register_health_routes(app, ready_check=None):
+    """
+    Add /healthz (liveness) and /readyz (readiness) to a Flask app.
+    ready_check returns None when ready, or a reason string when not.
+    """
+
+    @app.route('/healthz', methods=['GET'])
+    def healthz():
+        return jsonify({'status': 'alive'}), 200
+
+    @app.route('/readyz', methods=['GET'])
+    def readyz():
+        if is_draining():
+            return jsonify({'status': 'draining'}), 503
+        reason = ready_check() if ready_check else None
+        if reason:
+            return jsonify({'status': 'not ready', 'reason': reason}), 503
+        return jsonify({'status': 'ready'}), 200
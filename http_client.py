@@ -0,0 +1,247 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from instrumentation import OUTBOUND_REQUESTS
+from serialization import Encoded, dumps
+
+
+# Timeouts (seconds) for every outbound call
+CONNECT_TIMEOUT = float(os.environ.get('OUTBOUND_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.environ.get('OUTBOUND_READ_TIMEOUT', 10))
+
+# Connection pool sizing: number of hosts kept and connections per host
+POOL_HOSTS = int(os.environ.get('OUTBOUND_POOL_HOSTS', 10))
+POOL_MAXSIZE = int(os.environ.get('OUTBOUND_POOL_MAXSIZE', 20))
+
+# Retry with exponential backoff and full jitter
+MAX_RETRIES = int(os.environ.get('OUTBOUND_MAX_RETRIES', 3))
+BACKOFF_BASE = float(os.environ.get('OUTBOUND_BACKOFF_BASE', 0.2))
+BACKOFF_MAX = float(os.environ.get('OUTBOUND_BACKOFF_MAX', 5))
+
+# Circuit breaker: open after this many consecutive failures, probe again after the cooldown
+BREAKER_FAILURES = int(os.environ.get('OUTBOUND_BREAKER_FAILURES', 5))
+BREAKER_COOLDOWN = float(os.environ.get('OUTBOUND_BREAKER_COOLDOWN', 30))
+
+# The target never processed these, so they are safe to retry for any method
+ALWAYS_RETRY_STATUSES = {429, 503}
+# The target may have processed these, so they are only retried for idempotent calls
+IDEMPOTENT_RETRY_STATUSES = {502, 504}
+
+
+def _never_sent(error):
+    """
+    True when the request failed before reaching the target (refused or
+    timed-out connect), which makes it safe to retry even for a POST
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Raised instead of calling a target whose circuit breaker is open
+    """
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at = 0.0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    return False
+                # Let a single probe through; its outcome decides the next state
+                self.state = self.HALF_OPEN
+                self.probe_started_at = time.monotonic()
+                return True
+            if self.state == self.HALF_OPEN:
+                # A probe that never reported back doesn't block the host for good
+                if time.monotonic() - self.probe_started_at < self.cooldown:
+                    return False
+                self.probe_started_at = time.monotonic()
+                return True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class OutboundClient:
+    """
+    Shared HTTP client for forwarding to downstream targets: pooled keep-alive
+    connections, timeouts, retries with backoff and a breaker per target host
+    """
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_retries=MAX_RETRIES, pool_hosts=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self._adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def _breaker(self, host):
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(host, CircuitBreaker())
+        return breaker
+
+    def _count(self, host, name, amount=1):
+        with self._lock:
+            counters = self._counters.setdefault(
+                host, {"requests": 0, "retries": 0, "failures": 0, "rejected": 0, "inFlight": 0}
+            )
+            counters[name] += amount
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        """
+        Send a request and return the final requests.Response. Network errors
+        still raise requests.exceptions.RequestException, as with requests.post.
+        """
+        if idempotent is None:
+            idempotent = method.upper() in ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+        kwargs.setdefault('timeout', self.timeout)
+        if 'json' in kwargs:
+            # Encode through serialization (numpy-aware, reuses already-encoded bytes)
+            body = kwargs.pop('json')
+            kwargs['data'] = body.data if isinstance(body, Encoded) else dumps(body)
+            headers = dict(kwargs.get('headers') or {})
+            headers.setdefault('Content-Type', 'application/json')
+            kwargs['headers'] = headers
+        host = urlsplit(url).netloc
+        breaker = self._breaker(host)
+
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                self._count(host, 'rejected')
+                OUTBOUND_REQUESTS.inc(host=host, outcome='circuit_open')
+                raise CircuitOpenError(f"Circuit open for {host}")
+
+            self._count(host, 'requests')
+            self._count(host, 'inFlight')
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                breaker.record_failure()
+                self._count(host, 'failures')
+                OUTBOUND_REQUESTS.inc(host=host, outcome=type(e).__name__)
+                if (idempotent or _never_sent(e)) and attempt < self.max_retries:
+                    attempt += 1
+                    self._count(host, 'retries')
+                    time.sleep(self._backoff(attempt))
+                    continue
+                raise
+            except BaseException:
+                # Any other error still settles a half-open probe
+                breaker.record_failure()
+                self._count(host, 'failures')
+                raise
+            finally:
+                self._count(host, 'inFlight', -1)
+
+            OUTBOUND_REQUESTS.inc(host=host, outcome=str(response.status_code))
+            retry_status = response.status_code in ALWAYS_RETRY_STATUSES or (
+                idempotent and response.status_code in IDEMPOTENT_RETRY_STATUSES
+            )
+            if response.status_code >= 500 or retry_status:
+                breaker.record_failure()
+                self._count(host, 'failures')
+            else:
+                breaker.record_success()
+            if retry_status and attempt < self.max_retries:
+                attempt += 1
+                self._count(host, 'retries')
+                response.close()
+                time.sleep(self._backoff(attempt))
+                continue
+            return response
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def metrics(self):
+        """
+        Per-host request/retry counters, breaker state and pool utilisation
+        """
+        pools = {}
+        for key in list(self._adapter.poolmanager.pools.keys()):
+            pool = self._adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            idle = pool.pool.qsize() if pool.pool is not None else 0
+            pools[f"{key.key_host}:{key.key_port}"] = {
+                "connectionsOpened": pool.num_connections,
+                "requestsSent": pool.num_requests,
+                "availableSlots": idle,
+                "maxSize": pool.pool.maxsize if pool.pool is not None else 0
+            }
+        with self._lock:
+            hosts = {host: dict(counters) for host, counters in self._counters.items()}
+        for host, breaker in list(self._breakers.items()):
+            hosts.setdefault(host, {})["circuit"] = {"state": breaker.state, "timesOpened": breaker.times_opened}
+        return {"hosts": hosts, "pools": pools}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Return the process-wide outbound client
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OutboundClient()
+    return _client
+
+
+def post(url, **kwargs):
+    return get_client().post(url, **kwargs)
@@ -0,0 +1,177 @@
+"""
+Deduplicated forwarding for retried submissions.
+
+A delivery is identified by the client's Idempotency-Key header or, without
+one, by a hash of the payload being forwarded. Successful forwards are kept
+in a bounded session store for IDEMPOTENCY_TTL seconds and repeats get the
+stored result without another outbound call. Identical requests that arrive
+while the first one is still in flight wait for its result instead of
+forwarding again (single-flight, per process).
+"""
+import asyncio
+import hashlib
+import os
+import threading
+from concurrent.futures import Future
+
+from instrumentation import registry
+from session_store import create_store
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+IDEMPOTENCY_TTL = float(os.environ.get('IDEMPOTENCY_TTL', 300))
+IDEMPOTENCY_MAX_SIZE = int(os.environ.get('IDEMPOTENCY_MAX_SIZE', 100000))
+# Deduplicate requests without an Idempotency-Key by payload hash
+IDEMPOTENCY_BY_CONTENT = os.environ.get('IDEMPOTENCY_BY_CONTENT', '1') == '1'
+
+IDEMPOTENT_REQUESTS = registry.counter('idempotent_requests_total', 'Forwards by deduplication result')
+
+
+class IdempotencyConflict(Exception):
+    """
+    Raised when an Idempotency-Key is reused with a different payload
+    """
+
+
+def fingerprint(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def replay_headers(replayed):
+    return {REPLAYED_HEADER: 'true'} if replayed else {}
+
+
+async def _run_in_executor(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+class DeliveryLedger:
+    """
+    Recent deliveries to one target. forward() callables return
+    (result, succeeded); only succeeded results, which must be
+    JSON-serializable, are kept for replay.
+    """
+
+    def __init__(self, name, ttl=IDEMPOTENCY_TTL, max_size=IDEMPOTENCY_MAX_SIZE):
+        self.name = name
+        self._store = create_store(f'deliveries_{name}', ttl=ttl, max_size=max_size)
+        # key -> (payload fingerprint, Future) of forwards in progress
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._in_flight_async = {}
+
+    def _key(self, idempotency_key, data):
+        digest = fingerprint(data)
+        if idempotency_key:
+            return 'key:' + idempotency_key, digest
+        if IDEMPOTENCY_BY_CONTENT:
+            return 'hash:' + digest, digest
+        return None, digest
+
+    def _replay(self, key, digest):
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        if entry['fingerprint'] != digest:
+            IDEMPOTENT_REQUESTS.inc(target=self.name, result='conflict')
+            raise IdempotencyConflict(f"{IDEMPOTENCY_HEADER} was already used with a different payload")
+        IDEMPOTENT_REQUESTS.inc(target=self.name, result='replayed')
+        return entry['result']
+
+    def _join(self, flights, key, digest):
+        # Caller holds the lock (or runs on the event loop) that guards flights
+        flight = flights.get(key)
+        if flight is not None and flight[0] != digest:
+            IDEMPOTENT_REQUESTS.inc(target=self.name, result='conflict')
+            raise IdempotencyConflict(f"{IDEMPOTENCY_HEADER} is in use with a different payload")
+        if flight is not None:
+            IDEMPOTENT_REQUESTS.inc(target=self.name, result='coalesced')
+        return flight
+
+    def _record(self, key, digest, result, succeeded):
+        IDEMPOTENT_REQUESTS.inc(target=self.name, result='forwarded')
+        if succeeded:
+            self._store.set(key, {'fingerprint': digest, 'result': result})
+
+    def deliver(self, idempotency_key, data, forward):
+        """
+        Forward a payload (serialized as `data`) unless it was already
+        delivered. Returns (result, replayed).
+        """
+        key, digest = self._key(idempotency_key, data)
+        if key is None:
+            return forward()[0], False
+        result = self._replay(key, digest)
+        if result is not None:
+            return result, True
+
+        with self._lock:
+            flight = self._join(self._in_flight, key, digest)
+            if flight is None:
+                future = Future()
+                self._in_flight[key] = (digest, future)
+        if flight is not None:
+            return flight[1].result(), True
+
+        try:
+            # The previous owner may have finished between the lookup and taking the lock
+            result = self._replay(key, digest)
+            replayed = result is not None
+            if not replayed:
+                result, succeeded = forward()
+                self._record(key, digest, result, succeeded)
+            future.set_result(result)
+            return result, replayed
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    async def deliver_async(self, idempotency_key, data, forward, run_blocking=None):
+        """
+        deliver() for the event loop: forward is a coroutine function.
+        Store lookups run through run_blocking(func, *args) (the loop's
+        default executor when None), since the sqlite backend blocks.
+        """
+        run_blocking = run_blocking or _run_in_executor
+        key, digest = self._key(idempotency_key, data)
+        if key is None:
+            return (await forward())[0], False
+        result = await run_blocking(self._replay, key, digest)
+        if result is not None:
+            return result, True
+
+        flight = self._join(self._in_flight_async, key, digest)
+        if flight is not None:
+            # shield: one waiter disconnecting must not cancel the shared forward
+            result, _ = await asyncio.shield(flight[1])
+            return result, True
+        # The forward runs as its own task, so cancelling the caller that
+        # started it doesn't cancel it for the callers waiting on it
+        task = asyncio.ensure_future(self._forward_async(key, digest, forward, run_blocking))
+        self._in_flight_async[key] = (digest, task)
+
+        def finished(task):
+            del self._in_flight_async[key]
+            if not task.cancelled():
+                # Waiters re-raise it; mark it retrieved when there are none
+                task.exception()
+        task.add_done_callback(finished)
+        return await asyncio.shield(task)
+
+    async def _forward_async(self, key, digest, forward, run_blocking):
+        # The previous owner may have finished while we looked the key up
+        result = await run_blocking(self._replay, key, digest)
+        if result is not None:
+            return result, True
+        result, succeeded = await forward()
+        await run_blocking(self._record, key, digest, result, succeeded)
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._in_flight) + len(self._in_flight_async)
+        return {"name": self.name, "inFlight": in_flight, **self._store.stats()}
@@ -1,9 +1,16 @@
-from fastapi import FastAPI, HTTPException, status
+import asyncio
+import os
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import AsyncIterator, Optional
+from kyc_store import KYCRecordStore, KYCStoreHolder
+from instrumentation import instrument_fastapi_app
+from serialization import dumps, loads
 
 
 app = FastAPI(title="KYC Test API")
+instrument_fastapi_app(app, 'kyc')
 
 
 class KYCRequest(BaseModel):
@@ -13,6 +20,14 @@ class KYCRequest(BaseModel):
     document_type: Optional[str] = None
 
 
+# Built once and reused for every item of a batch
+try:
+    from pydantic import TypeAdapter
+    validate_kyc_request = TypeAdapter(KYCRequest).validate_python
+except ImportError:  # pydantic v1
+    validate_kyc_request = KYCRequest.parse_obj
+
+
 sample_data = {
     'ABC123': {
         'name': 'John Doe',
@@ -27,46 +42,140 @@ sample_data = {
 }
 
 
+# Path to a CSV, xlsx or SQLite file of KYC records; sample_data is used when unset
+KYC_SOURCE = os.environ.get('KYC_SOURCE')
+KYC_RELOAD_INTERVAL = float(os.environ.get('KYC_RELOAD_INTERVAL', 5))
+KYC_MAX_BATCH = int(os.environ.get('KYC_MAX_BATCH', 10000))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+if KYC_SOURCE:
+    kyc_records = KYCStoreHolder.from_source(KYC_SOURCE)
+else:
+    kyc_records = KYCStoreHolder(KYCRecordStore.from_rows(
+        (customer_id, record['name'], record['Aadhar_Number'], record['document_type'])
+        for customer_id, record in sample_data.items()
+    ))
+
+
+@app.on_event("startup")
+async def watch_kyc_source():
+    # Reloads build the new store in a thread and swap it in when done
+    if KYC_SOURCE:
+        app.state.kyc_watcher = asyncio.create_task(kyc_records.watch(KYC_RELOAD_INTERVAL))
+
+
+def check_kyc(request: KYCRequest, store: KYCRecordStore) -> dict:
+    # Check if all required fields are present
+    if not all([request.customer_id, request.name, request.Aadhar_Number, request.document_type]):
+        return {
+            "is_verified": False,
+            "message": "KYC Verification failed: Incomplete details"
+        }
+
+    # Check Aadhar number validity
+    if len(request.Aadhar_Number) != 12:
+        return {
+            "is_verified": False,
+            "message": "KYC Verification failed: Invalid Aadhar Number"
+        }
+
+    # Check if customer exists in the KYC record store
+    customer_data = store.get(request.customer_id)
+    
+    if not customer_data:
+        return {
+            "is_verified": False,
+            "message": "KYC Verification failed: Customer not found"
+        }
+
+    # Verify the data
+    is_verified = (
+        request.name == customer_data['name'] and
+        request.Aadhar_Number == customer_data['Aadhar_Number'] and
+        request.document_type == customer_data['document_type']
+    )
+
+    return {
+        "is_verified": is_verified,
+        "message": "KYC Verification successful" if is_verified else "KYC Verification failed"
+    }
+
+
 @app.post("/verify-kyc", status_code=status.HTTP_200_OK)
 async def verify_kyc(request: KYCRequest):
     try:
-        # Check if all required fields are present
-        if not all([request.customer_id, request.name, request.Aadhar_Number, request.document_type]):
-            return {
-                "is_verified": False,
-                "message": "KYC Verification failed: Incomplete details"
-            }
-
-        # Check Aadhar number validity
-        if len(request.Aadhar_Number) != 12:
-            return {
-                "is_verified": False,
-                "message": "KYC Verification failed: Invalid Aadhar Number"
-            }
-
-        # Check if customer exists in sample data
-        customer_data = sample_data.get(request.customer_id)
-        
-        if not customer_data:
-            return {
-                "is_verified": False,
-                "message": "KYC Verification failed: Customer not found"
-            }
-
-        # Verify the data
-        is_verified = (
-            request.name == customer_data['name'] and
-            request.Aadhar_Number == customer_data['Aadhar_Number'] and
-            request.document_type == customer_data['document_type']
-        )
+        return check_kyc(request, kyc_records.store)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
 
+def verify_batch_item(index: int, item, store: KYCRecordStore) -> dict:
+    try:
+        kyc_request = validate_kyc_request(item)
+    except ValueError as e:
+        # pydantic's ValidationError is a ValueError; report it against this item only
         return {
-            "is_verified": is_verified,
-            "message": "KYC Verification successful" if is_verified else "KYC Verification failed"
+            "index": index,
+            "customer_id": item.get("customer_id") if isinstance(item, dict) else None,
+            "is_verified": False,
+            "message": f"KYC Verification failed: Invalid request: {e}"
         }
+    return {"index": index, "customer_id": kyc_request.customer_id, **check_kyc(kyc_request, store)}
 
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+async def verify_ndjson_stream(chunks: AsyncIterator[bytes], store: KYCRecordStore) -> AsyncIterator[bytes]:
+    # Results are written as soon as each input line is complete
+    buffer = b""
+    index = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if not line.strip():
+                continue
+            if index >= KYC_MAX_BATCH:
+                yield dumps({"index": index, "error": f"Batch exceeds {KYC_MAX_BATCH} items"}) + b"\n"
+                return
+            yield encode_batch_result(index, line, store)
+            index += 1
+    if buffer.strip() and index < KYC_MAX_BATCH:
+        yield encode_batch_result(index, buffer, store)
+
+
+def encode_batch_result(index: int, line: bytes, store: KYCRecordStore) -> bytes:
+    try:
+        item = loads(line)
+    except ValueError:
+        result = {"index": index, "customer_id": None, "is_verified": False,
+                  "message": "KYC Verification failed: Invalid JSON"}
+    else:
+        result = verify_batch_item(index, item, store)
+    return dumps(result) + b"\n"
+
+
+@app.post("/verify-kyc-batch", status_code=status.HTTP_200_OK)
+async def verify_kyc_batch(http_request: Request):
+    # Take the store once so the whole batch is checked against the same snapshot
+    store = kyc_records.store
+
+    if NDJSON_MEDIA_TYPE in http_request.headers.get("content-type", ""):
+        return StreamingResponse(verify_ndjson_stream(http_request.stream(), store), media_type=NDJSON_MEDIA_TYPE)
+
+    try:
+        items = loads(await http_request.body())
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array of KYC requests")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array of KYC requests")
+    if len(items) > KYC_MAX_BATCH:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Batch exceeds {KYC_MAX_BATCH} items")
+
+    results = [verify_batch_item(index, item, store) for index, item in enumerate(items)]
+    if NDJSON_MEDIA_TYPE in http_request.headers.get("accept", ""):
+        return StreamingResponse((dumps(result) + b"\n" for result in results), media_type=NDJSON_MEDIA_TYPE)
+    return results
 
 
 if __name__ == "__main__":
@@ -0,0 +1,194 @@
+"""
+Compact, indexed store of KYC records for kyc.py.
+
+Records are kept column-wise instead of as one dict per customer: names and
+document types are interned, Aadhaar numbers are packed into an unsigned
+64-bit array, and document types are stored as one-byte codes. The Aadhaar
+index is a pair of sorted arrays searched with bisect rather than a dict of
+Python ints.
+"""
+import asyncio
+import csv
+import os
+import sqlite3
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+CSV_COLUMNS = ('customer_id', 'name', 'Aadhar_Number', 'document_type')
+
+# Marks a row whose Aadhaar number isn't 12 digits and lives in the overflow dict
+_RAW_AADHAAR = 0
+
+
+class KYCRecordStore:
+
+    def __init__(self):
+        self._rows = {}              # customer_id -> row number
+        self._customer_ids = []      # row -> customer_id (same string objects as the dict keys)
+        self._names = []             # row -> interned name
+        self._aadhaar = array('Q')   # row -> Aadhaar as an integer
+        self._raw_aadhaar = {}       # row -> Aadhaar string that isn't 12 digits
+        self._doc_codes = array('B')
+        self._doc_types = []         # code -> interned document type
+        self._doc_lookup = {}
+        self._aadhaar_sorted = array('Q')  # Aadhaar numbers in ascending order
+        self._aadhaar_rows = array('I')    # row holding each entry of _aadhaar_sorted
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build a store from (customer_id, name, Aadhar_Number, document_type) tuples
+        """
+        store = cls()
+        for customer_id, name, aadhaar, document_type in rows:
+            store._add(str(customer_id), name, aadhaar, document_type)
+        store._build_aadhaar_index()
+        return store
+
+    def _build_aadhaar_index(self):
+        order = sorted(range(len(self._aadhaar)), key=self._aadhaar.__getitem__)
+        self._aadhaar_sorted = array('Q', (self._aadhaar[row] for row in order))
+        self._aadhaar_rows = array('I', order)
+
+    def _doc_code(self, document_type):
+        code = self._doc_lookup.get(document_type)
+        if code is None:
+            code = len(self._doc_types)
+            if code > 255:
+                raise ValueError("More than 256 distinct document types")
+            self._doc_types.append(None if document_type is None else sys.intern(document_type))
+            self._doc_lookup[document_type] = code
+        return code
+
+    def _add(self, customer_id, name, aadhaar, document_type):
+        if customer_id in self._rows:
+            raise ValueError(f"Duplicate customer_id: {customer_id}")
+        row = len(self._names)
+        customer_id = sys.intern(customer_id)
+        self._rows[customer_id] = row
+        self._customer_ids.append(customer_id)
+        self._names.append(None if name is None else sys.intern(str(name)))
+        self._doc_codes.append(self._doc_code(None if document_type is None else str(document_type)))
+
+        aadhaar = None if aadhaar is None else str(aadhaar).strip()
+        if aadhaar and len(aadhaar) == 12 and aadhaar.isdigit() and int(aadhaar) != _RAW_AADHAAR:
+            self._aadhaar.append(int(aadhaar))
+        else:
+            self._aadhaar.append(_RAW_AADHAAR)
+            self._raw_aadhaar[row] = aadhaar
+
+    def _record(self, row):
+        number = self._aadhaar[row]
+        return {
+            'name': self._names[row],
+            'Aadhar_Number': f"{number:012d}" if number != _RAW_AADHAAR else self._raw_aadhaar[row],
+            'document_type': self._doc_types[self._doc_codes[row]]
+        }
+
+    def get(self, customer_id):
+        """
+        Return the record for a customer id as a dict, or None
+        """
+        row = self._rows.get(customer_id)
+        return None if row is None else self._record(row)
+
+    def find_by_aadhaar(self, aadhaar):
+        """
+        Return (customer_id, record) pairs for every customer with this Aadhaar number
+        """
+        if not (aadhaar and len(aadhaar) == 12 and aadhaar.isdigit()):
+            return []
+        number = int(aadhaar)
+        if number == _RAW_AADHAAR:
+            return []
+        start = bisect_left(self._aadhaar_sorted, number)
+        end = bisect_right(self._aadhaar_sorted, number, start)
+        return [(self._customer_ids[row], self._record(row)) for row in self._aadhaar_rows[start:end]]
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, customer_id):
+        return customer_id in self._rows
+
+
+def _read_csv(path):
+    with open(path, newline='') as f:
+        for record in csv.DictReader(f):
+            yield tuple(record.get(column) for column in CSV_COLUMNS)
+
+
+def _read_xlsx(path):
+    # Read-only mode streams rows instead of building the whole sheet in memory
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell) for cell in next(rows)]
+        positions = [header.index(column) for column in CSV_COLUMNS]
+        for values in rows:
+            yield tuple(values[position] for position in positions)
+    finally:
+        workbook.close()
+
+
+def _read_sqlite(path):
+    conn = sqlite3.connect(path)
+    try:
+        yield from conn.execute(f"SELECT {', '.join(CSV_COLUMNS)} FROM kyc_records")
+    finally:
+        conn.close()
+
+
+LOADERS = {'.csv': _read_csv, '.xlsx': _read_xlsx, '.db': _read_sqlite, '.sqlite': _read_sqlite, '.sqlite3': _read_sqlite}
+
+
+def load_store(path):
+    """
+    Build a store from a CSV, xlsx or SQLite (table kyc_records) file
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in LOADERS:
+        raise ValueError(f"Unsupported KYC source: {path}")
+    return KYCRecordStore.from_rows(LOADERS[extension](path))
+
+
+class KYCStoreHolder:
+    """
+    Holds the live store and replaces it when the source file changes. The
+    rebuild runs in a worker thread, so the event loop keeps serving requests
+    from the old store until the new one is swapped in.
+    """
+
+    def __init__(self, store, path=None):
+        self.store = store
+        self.path = path
+        self._mtime = os.stat(path).st_mtime_ns if path else None
+        self.reload_count = 0
+
+    @classmethod
+    def from_source(cls, path):
+        return cls(load_store(path), path)
+
+    async def reload(self):
+        loop = asyncio.get_running_loop()
+        store = await loop.run_in_executor(None, load_store, self.path)
+        self.store = store
+        self.reload_count += 1
+
+    async def watch(self, interval=5.0):
+        """
+        Poll the source file's mtime and reload when it changes
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime != self._mtime:
+                    await self.reload()
+                    self._mtime = mtime
+            except Exception:
+                # Keep serving the current store; the next poll tries again
+                continue
@@ -0,0 +1,114 @@
+from collections import namedtuple
+
+# Casts a schema field can apply to its source column
+AS_IS = 'as_is'
+INT = 'int'
+STR = 'str'
+YES_NO = 'yes_no'
+# 'Yes'/'No' become True/False; any other value is passed through unchanged
+YES_NO_TEXT = 'yes_no_text'
+
+# One field of a schema: where its value comes from, the key it is sent as,
+# how it is converted and whether a payload must carry it
+Field = namedtuple('Field', ['source', 'key', 'cast', 'required'], defaults=[AS_IS, False])
+
+# Expression each cast compiles to, applied to the value named by {v}
+_CAST_EXPRESSIONS = {
+    AS_IS: '{v}',
+    INT: 'int({v})',
+    STR: 'str({v})',
+    # Flags loaded as bool (workbook_loader's compact profile) are already decided;
+    # matched by class name so numpy.bool_ is recognised without importing numpy
+    YES_NO: "(bool({v}) if {v}.__class__.__name__ in ('bool', 'bool_') else {v} == 'Yes')",
+    YES_NO_TEXT: "True if {v} == 'Yes' else False if {v} == 'No' else {v}"
+}
+
+
+def _cast_expression(cast, v):
+    if cast not in _CAST_EXPRESSIONS:
+        raise ValueError(f"Unknown cast: {cast}")
+    return _CAST_EXPRESSIONS[cast].format(v=v)
+
+
+def _compile(name, lines):
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    return namespace[name]
+
+
+class SheetSchema:
+    """
+    Describes how one sheet is turned into records: an ordered list of
+    (source column, output key, cast[, required]) fields. `required` lists
+    the required keys in the order missing() reports them, when that differs
+    from the field order. Each schema also compiles, on first use,
+    specialised functions for single records:
+
+        schema.convert(row)       source mapping (dict or pandas row) -> payload
+        schema.coerce(payload)    payload with its keys' casts applied, if present
+        schema.missing(payload)   required keys absent from a payload
+    """
+
+    def __init__(self, sheet_name, fields, required=None):
+        self.sheet_name = sheet_name
+        self.fields = [Field(*field) for field in fields]
+        self.keys = [field.key for field in self.fields]
+        self.columns = [field.source for field in self.fields]
+        self.required = list(required) if required is not None else [
+            field.key for field in self.fields if field.required]
+        self._convert = self._coerce = None
+
+    @property
+    def convert(self):
+        if self._convert is None:
+            # Each source value is read once into a local, then the payload is one dict literal
+            reads = [f"    v{number} = row[{field.source!r}]" for number, field in enumerate(self.fields)]
+            entries = [f"        {field.key!r}: {_cast_expression(field.cast, f'v{number}')},"
+                       for number, field in enumerate(self.fields)]
+            self._convert = _compile('convert', ['def convert(row):'] + reads + ['    return {'] + entries + ['    }'])
+        return self._convert
+
+    @property
+    def coerce(self):
+        if self._coerce is None:
+            lines = ['def coerce(payload):', '    payload = dict(payload)']
+            for field in self.fields:
+                if field.cast == AS_IS:
+                    continue
+                lines += [f"    if {field.key!r} in payload:",
+                          f"        v = payload[{field.key!r}]",
+                          f"        payload[{field.key!r}] = {_cast_expression(field.cast, 'v')}"]
+            self._coerce = _compile('coerce', lines + ['    return payload'])
+        return self._coerce
+
+    def missing(self, payload):
+        return [key for key in self.required if key not in payload]
+
+
+def _convert_column(column, cast):
+    # Series.tolist() yields the same Python scalars iterrows() hands to the
+    # per-row normalizers, which keeps the JSON output identical
+    if cast == AS_IS:
+        return column.tolist()
+    if cast == INT:
+        if column.dtype == object:
+            return [int(value) for value in column.tolist()]
+        return column.astype('int64').tolist()
+    if cast == STR:
+        return [str(value) for value in column.tolist()]
+    if cast == YES_NO:
+        if column.dtype == bool:
+            return column.tolist()
+        return (column == 'Yes').tolist()
+    if cast == YES_NO_TEXT:
+        return [True if value == 'Yes' else False if value == 'No' else value for value in column.tolist()]
+    raise ValueError(f"Unknown cast: {cast}")
+
+
+def normalize_frame(df, schema):
+    """
+    Normalize a whole sheet column by column and return a list of records
+    """
+    columns = [_convert_column(df[field.source], field.cast) for field in schema.fields]
+    keys = schema.keys
+    return [dict(zip(keys, values)) for values in zip(*columns)]
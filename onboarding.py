@@ -0,0 +1,126 @@
+"""
+Request handling shared by the Flask services (excel_to_api.py,
+process_and_send_request.py) and the ASGI gateway (async_gateway.py):
+building payloads from the workbook snapshot and turning forward outcomes
+into response bodies. Functions return plain data or (body, status code);
+the caller owns the framework's request and response objects and the I/O.
+"""
+import logging
+
+from instrumentation import span
+from normalization import normalize_frame
+from payload_schemas import BANK_SCHEMA, BANK_DETAILS_SCHEMA, ONBOARD_SCHEMA
+from serialization import encode, loads
+from workbook_cache import APPLICANT_ID_COLUMN, get_workbook_cache
+
+
+logger = logging.getLogger(__name__)
+
+# Sheets joined for a payload, in the order get_all_data_by_id checks them
+ONBOARD_SHEETS = [
+    ('Company_Data', 'Company data not found'),
+    ('Applicant_Data', 'Applicant data not found'),
+    ('Directors_Data', 'Directors data not found')
+]
+
+
+# Look up one applicant's rows through the snapshot's applicant index
+def read_applicant_rows(file_path, sheet_name, applicant_id):
+    try:
+        with span('read_sheet', sheet=sheet_name):
+            snapshot = get_workbook_cache(file_path).snapshot()
+        with span('filter', sheet=sheet_name):
+            return snapshot.rows_for(sheet_name, applicant_id)
+    except Exception as e:
+        return str(e)
+
+
+# Combine one applicant's rows into the onboarding payload
+def build_onboard_payload(applicant_id, company_data, applicant_data, directors_data):
+    # to_dict() is one pass per row instead of a Series lookup per field
+    row = {**company_data.to_dict(), **applicant_data.to_dict(), **directors_data.to_dict(),
+           APPLICANT_ID_COLUMN: applicant_id}
+    return ONBOARD_SCHEMA.convert(row)
+
+
+# Assemble one applicant's onboarding payload from the current snapshot, or
+# return (error message, status code)
+def load_onboard_payload(file_path, applicant_id):
+    rows = []
+    for sheet_name, message in ONBOARD_SHEETS:
+        df = read_applicant_rows(file_path, sheet_name, applicant_id)
+        if isinstance(df, str):
+            return df, 500
+        if df.empty:
+            return message, 404
+        rows.append(df.iloc[0])
+
+    with span('assemble', route='onboard'):
+        # Serialized once; the same bytes are posted downstream and returned
+        return encode(build_onboard_payload(applicant_id, *rows))
+
+
+# Normalize one applicant's Bank_Data rows for /bank-data, or return (error
+# message, status code)
+def load_bank_details(file_path, applicant_id):
+    applicant_df = read_applicant_rows(file_path, 'Bank_Data', applicant_id)
+    if isinstance(applicant_df, str):
+        return applicant_df, 500
+    if applicant_df.empty:
+        return 'Applicant bank data not found', 404
+    with span('assemble', route='bank'):
+        return encode(normalize_frame(applicant_df, BANK_SCHEMA))
+
+
+# The KYC details of one applicant (its first Bank_Data row), or (error
+# message, status code)
+def load_kyc_details(file_path, applicant_id):
+    applicant_df = read_applicant_rows(file_path, 'Bank_Data', applicant_id)
+    if isinstance(applicant_df, str):
+        return applicant_df, 500
+    if applicant_df.empty:
+        return 'Applicant bank data not found', 404
+    return BANK_DETAILS_SCHEMA.convert(applicant_df.iloc[0].to_dict())
+
+
+def forward_result(status_code):
+    """
+    The delivery ledger result of a forward the target answered: only a 200
+    counts as delivered
+    """
+    return {'statusCode': status_code}, status_code == 200
+
+
+def delivery_response(data, delivery, target):
+    """
+    Body and status code for a forward's outcome ({'statusCode': ...} or
+    {'error': ...}): the data itself once the target accepted it, otherwise
+    the data with an error or a warning and 206 (Partial Content)
+    """
+    if 'error' in delivery:
+        return {'data': data, 'error': 'Failed to send data to target server'}, 206
+    if delivery['statusCode'] != 200:
+        logger.warning(f"Failed to send {target} data to target server. Status: {delivery['statusCode']}")
+        return {'data': data, 'warning': 'Failed to send data to target server'}, 206
+    return data, 200
+
+
+def target_json(content):
+    """
+    Parse a target server's reply; an empty body is an empty object
+    """
+    data = loads(content) if content else {}
+    return data if isinstance(data, dict) else {'response': data}
+
+
+def kyc_response(response_data):
+    """
+    Body for KYC details the target accepted
+    """
+    return {
+        "status": "success",
+        "message": "KYC details forwarded successfully",
+        "TransactionId": response_data.get("TransactionId"),
+        "ApplicantId": response_data.get("ApplicantId"),
+        "targetResponse": response_data
+    }
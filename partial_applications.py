@@ -0,0 +1,302 @@
+"""
+Assemble partial applications (applicant, company and director parts sent
+separately under one session id) and forward the completed ones.
+
+process_and_send_request.py does this one HTTP request at a time; the
+pipeline below does it offline for JSONL files of parts, e.g. for
+migrations:
+
+    python partial_applications.py parts.jsonl --workers 16 --retry-file leftovers.jsonl
+
+Each line is {"session_id": ..., "payload": {...}}, a part carrying its own
+"session_id" key, or a benchmarks.replay record of a POST
+/receive-partial-application. Sessions are grouped as lines stream in;
+only sessions still missing parts and applications being forwarded are
+held in memory, both bounded.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import http_client
+from payload_schemas import APPLICATION_FLAGS_SCHEMA
+from serialization import dumps, loads
+
+
+logger = logging.getLogger(__name__)
+
+
+# Key that tells each part apart, in the order they are checked
+PART_MARKERS = [
+    ('applicantAadhaar', 'applicant'),
+    ('companyCIN', 'company'),
+    ('directorAadhaar', 'director')
+]
+PARTS_PER_APPLICATION = len(PART_MARKERS)
+
+DEFAULT_SESSION = 'default_session'
+PIPELINE_WORKERS = int(os.environ.get('PIPELINE_WORKERS', 8))
+# Sessions waiting for more parts; the oldest is set aside when there are more
+PIPELINE_MAX_OPEN_SESSIONS = int(os.environ.get('PIPELINE_MAX_OPEN_SESSIONS', 100000))
+
+
+def classify_part(payload):
+    """
+    Return which part of an application a payload is, or None
+    """
+    for marker, part in PART_MARKERS:
+        if marker in payload:
+            return part
+    return None
+
+
+def merge_payloads(payload_store):
+    """
+    Merge multiple partial payloads into a single comprehensive payload
+    """
+    merged_payload = {}
+
+    for partial_payload in payload_store.values():
+        merged_payload.update(partial_payload)
+
+    return merged_payload
+
+
+def assemble_application(parts):
+    """
+    Merge a session's parts and turn the Yes/No flags into booleans
+    """
+    return APPLICATION_FLAGS_SCHEMA.coerce(merge_payloads(parts))
+
+
+def add_session_part(store, session_id, payload):
+    """
+    Store a part under its session atomically, creating the session if
+    needed. Returns (part, parts received so far, completed parts); the
+    completed parts are popped, so only the request that completed the
+    session gets them.
+    """
+    part = classify_part(payload)
+
+    def add_part(parts):
+        parts = dict(parts or {})
+        if part:
+            parts[part] = payload
+        return parts
+    session_parts = store.update(session_id, add_part)
+    completed_parts = store.pop(session_id) if len(session_parts) == PARTS_PER_APPLICATION else None
+    return part, session_parts, completed_parts
+
+
+def partial_response(session_parts):
+    """
+    Body and status code while a session is still missing parts
+    """
+    return {
+        "status": "partial",
+        "message": "Partial application received",
+        "partsReceived": list(session_parts.keys())
+    }, 202
+
+
+def application_response(session_id, processed_payload, target_response):
+    """
+    Body for a completed application the target accepted
+    """
+    return {
+        "status": "success",
+        "message": "Complete application received and forwarded",
+        "processedPayload": processed_payload,
+        "targetResponse": target_response,
+        "ApplicantId": {session_id: target_response.get('ApplicantId')}
+    }
+
+
+def read_parts(lines):
+    """
+    Yield (session id, payload) for each part in a stream of JSONL lines,
+    and (None, reason) for lines that aren't one
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = loads(line)
+        except ValueError:
+            yield None, 'invalid_json'
+            continue
+        if not isinstance(record, dict):
+            yield None, 'invalid_json'
+        elif 'path' in record and 'body' in record:
+            # A recorded request (benchmarks.replay)
+            url = urlsplit(record['path'])
+            if url.path != '/receive-partial-application' or not isinstance(record['body'], dict):
+                yield None, 'other_request'
+                continue
+            yield parse_qs(url.query).get('session_id', [DEFAULT_SESSION])[0], record['body']
+        elif isinstance(record.get('payload'), dict):
+            yield record.get('session_id') or DEFAULT_SESSION, record['payload']
+        else:
+            payload = dict(record)
+            yield payload.pop('session_id', None) or DEFAULT_SESSION, payload
+
+
+class PipelineStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.counts = {"lines": 0, "parts": 0, "skipped": 0, "completed": 0, "forwarded": 0,
+                       "failed": 0, "setAside": 0}
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counts[name] += amount
+
+    def report(self, open_sessions):
+        with self._lock:
+            counts = dict(self.counts)
+        elapsed = time.monotonic() - self.started
+        return {
+            "elapsedSeconds": round(elapsed, 1),
+            **counts,
+            "openSessions": open_sessions,
+            "linesPerSecond": round(counts["lines"] / elapsed, 1) if elapsed else None,
+            "applicationsPerSecond": round((counts["forwarded"] + counts["failed"]) / elapsed, 1) if elapsed else None
+        }
+
+
+class _RetryWriter:
+    """
+    Writes parts that still need sending as pipeline input lines, so the
+    file can be fed back in
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'w') if path else None
+        self._lock = threading.Lock()
+
+    def write(self, session_id, parts):
+        if self._file is None:
+            return
+        lines = ''.join(json.dumps({"session_id": session_id, "payload": payload}) + '\n'
+                        for payload in parts.values())
+        with self._lock:
+            self._file.write(lines)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _forward_application(url, session_id, parts, stats, retry):
+    try:
+        application = assemble_application(parts)
+        response = http_client.post(url, data=dumps(application), headers={'Content-Type': 'application/json'})
+        response.raise_for_status()
+    except Exception as e:
+        logger.warning(f"Failed to forward application {session_id}: {e!r}")
+        stats.count('failed')
+        retry.write(session_id, parts)
+        return
+    stats.count('forwarded')
+
+
+def run_pipeline(lines, url, workers=PIPELINE_WORKERS, max_open_sessions=PIPELINE_MAX_OPEN_SESSIONS,
+                 forward=True, retry_file=None, progress=None, progress_interval=10.0):
+    """
+    Group the parts read from `lines` by session and forward each completed
+    application through a pool of `workers` threads. At most
+    max_open_sessions incomplete sessions and 2 * workers applications are
+    held at once. Failed and incomplete sessions are written to retry_file.
+    Progress reports are passed to progress(report) every progress_interval
+    seconds. Returns the final report.
+    """
+    stats = PipelineStats()
+    retry = _RetryWriter(retry_file)
+    sessions = OrderedDict()
+    # Backpressure: reading stops while this many applications are queued or in flight
+    slots = threading.BoundedSemaphore(workers * 2)
+    next_progress = time.monotonic() + progress_interval
+
+    def release(future):
+        slots.release()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for session_id, payload in read_parts(lines):
+                stats.count('lines')
+                part = classify_part(payload) if session_id is not None else None
+                if part is None:
+                    stats.count('skipped')
+                    continue
+                stats.count('parts')
+
+                parts = sessions.pop(session_id, None) or {}
+                parts[part] = payload
+                if len(parts) < PARTS_PER_APPLICATION:
+                    sessions[session_id] = parts
+                    if len(sessions) > max_open_sessions:
+                        stale_session, stale_parts = sessions.popitem(last=False)
+                        stats.count('setAside')
+                        retry.write(stale_session, stale_parts)
+                else:
+                    stats.count('completed')
+                    if forward:
+                        slots.acquire()
+                        executor.submit(_forward_application, url, session_id, parts, stats, retry
+                                        ).add_done_callback(release)
+                    else:
+                        # Assembled, not sent: checks the input converts
+                        assemble_application(parts)
+
+                if progress is not None and time.monotonic() >= next_progress:
+                    next_progress = time.monotonic() + progress_interval
+                    progress(stats.report(len(sessions)))
+
+        # Sessions the input never completed
+        for session_id, parts in sessions.items():
+            retry.write(session_id, parts)
+    finally:
+        retry.close()
+    return stats.report(len(sessions))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Assemble and forward partial applications from JSONL files")
+    parser.add_argument('files', nargs='+', help="JSONL files of parts ('-' for stdin)")
+    parser.add_argument('--url', default=None,
+                        help="target URL (defaults to process_and_send_request's target /receive-partial-application)")
+    parser.add_argument('--workers', type=int, default=PIPELINE_WORKERS)
+    parser.add_argument('--max-open-sessions', type=int, default=PIPELINE_MAX_OPEN_SESSIONS)
+    parser.add_argument('--retry-file', help="write failed and incomplete sessions here, as pipeline input")
+    parser.add_argument('--progress-interval', type=float, default=10.0)
+    parser.add_argument('--no-forward', action='store_true', help="only group and assemble the applications")
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        from process_and_send_request import TARGET_URL_SERVER
+        url = TARGET_URL_SERVER + '/receive-partial-application'
+
+    def lines():
+        for path in args.files:
+            if path == '-':
+                yield from sys.stdin
+            else:
+                with open(path) as f:
+                    yield from f
+
+    report = run_pipeline(lines(), url, args.workers, args.max_open_sessions, forward=not args.no_forward,
+                          retry_file=args.retry_file, progress_interval=args.progress_interval,
+                          progress=lambda report: print(json.dumps(report), file=sys.stderr, flush=True))
+    print(json.dumps(report))
+    sys.exit(0 if report["failed"] == 0 else 1)
@@ -0,0 +1,126 @@
+"""
+Field mappings shared by the services: which sheet column each payload key
+comes from, how it is converted and which keys a payload must carry.
+
+Each SheetSchema compiles its converters on first use (see normalization.py),
+so per-record conversion is a single generated function instead of per-key
+lookups through hand-written dicts.
+"""
+from normalization import SheetSchema, AS_IS, INT, STR, YES_NO, YES_NO_TEXT
+
+
+# Sheet endpoints of excel_to_api.py (same keys as the normalize_* functions)
+COMPANY_SCHEMA = SheetSchema('Company_Data', [
+    ('Applicant id', "Applicant ID", AS_IS),
+    ('Company Name', "Company Name", AS_IS),
+    ('CIN', "CIN", AS_IS),
+    ('GSTIN', "GSTIN", AS_IS),
+    ('Company PAN', "Company PAN", AS_IS),
+    ('Company Phone', "Company Phone", INT),
+    ('Company Email', "Company Email", AS_IS),
+    ('Company Address', "Company Address", AS_IS),
+    ('Company MSME', "Company MSME", AS_IS)
+])
+
+BANK_SCHEMA = SheetSchema('Bank_Data', [
+    ('Applicant id', "Applicant id", AS_IS),
+    ('Name', "Name", AS_IS),
+    ('Account No.', "Account No.", AS_IS),
+    ('Bank Name', "Bank Name", AS_IS),
+    ('IFSC Code', "IFSC Code", AS_IS),
+    ('Branch Name', "Branch Name", AS_IS)
+])
+
+APPLICANT_SCHEMA = SheetSchema('Applicant_Data', [
+    ('Applicant id', "Applicant id", AS_IS),
+    ('First Name', "First Name", AS_IS),
+    ('Last Name', "Last Name", AS_IS),
+    ('Email', "Email", AS_IS),
+    ('Phone', "Phone", AS_IS),
+    ('Designation', "Designation", AS_IS),
+    ('Aadhar', "Aadhar", AS_IS)
+])
+
+DIRECTORS_SCHEMA = SheetSchema('Directors_Data', [
+    ('Applicant id', "Applicant ID", AS_IS),
+    ('Director First Name', "Director First Name", AS_IS),
+    ('Director Last Name', "Director Last Name", AS_IS),
+    ('Director Email', "Director Email", AS_IS),
+    ('Director Phone', "Director Phone", AS_IS),
+    ('Director Designation', "Director Designation", AS_IS),
+    ('Director PAN', "Director PAN", AS_IS),
+    ('Director Aadhaar', "Director Aadhaar", AS_IS),
+    ('Total Current No. of Loans', "Total Current No. of Loans", INT),
+    ('Total Current No. of ODs', "Total Current No. of ODs", INT),
+    ('Total Current Loan Outstanding', "Total Current Loan Outstanding", INT),
+    ('Current Total EMI', "Current Total EMI", INT),
+    ('Any Dues Missed in Last 6 Months', "Any Dues Missed in Last 6 Months", YES_NO),
+    ('Any Dues Missed in Last 12 Months', "Any Dues Missed in Last 12 Months", YES_NO),
+    ('Any Dues Missed in Last 18 Months', "Any Dues Missed in Last 18 Months", YES_NO)
+])
+
+# Onboarding payload: Company_Data, Applicant_Data and Directors_Data joined on 'Applicant id'
+ONBOARD_SCHEMA = SheetSchema('Onboarding', [
+    ('Applicant id', "ApplicantId", AS_IS),
+    ('Company Name', "companyName", STR),
+    ('CIN', "companyCIN", STR),
+    ('GSTIN', "companyGSTIN", STR),
+    ('Company PAN', "companyPAN", STR),
+    ('Company Phone', "companyPhone", STR),
+    ('Company Email', "companyEmail", STR),
+    ('Company Address', "companyAddress", STR),
+    ('Company MSME', "companyMSME", STR),
+    ('First Name', "applicantFirstName", STR),
+    ('Last Name', "applicantLastName", STR),
+    ('Email', "applicantEmail", STR),
+    ('Phone', "applicantPhone", STR),
+    ('Designation', "applicantDesignation", STR),
+    ('Aadhar', "applicantAadhaar", STR),
+    ('Director First Name', "directorFirstName", STR),
+    ('Director Last Name', "directorLastName", STR),
+    ('Director Email', "directorEmail", STR),
+    ('Director Phone', "directorPhone", STR),
+    ('Director Designation', "directorDesignation", STR),
+    ('Director Aadhaar', "directorAadhaar", STR),
+    ('Director PAN', "directorPAN", STR),
+    ('Total Current No. of Loans', "directorTotalLoanCount", INT),
+    ('Total Current No. of ODs', "directorTotalODCount", INT),
+    ('Total Current Loan Outstanding', "directorCurrentLoanOutstanding", INT),
+    ('Current Total EMI', "directorCurrentLoanEMI", INT),
+    ('Any Dues Missed in Last 6 Months', "isDirectorDueMissedLast6Months", YES_NO),
+    ('Any Dues Missed in Last 12 Months', "isDirectorDueMissedLast12Months", YES_NO),
+    ('Any Dues Missed in Last 18 Months', "isDirectorDueMissedLast18Months", YES_NO)
+])
+
+# Bank details sent by get_and_post_bank_data.py and required by
+# process_and_send_request.py's /receive-kyc-details
+BANK_DETAILS_SCHEMA = SheetSchema('Bank_Data', [
+    ('Applicant id', "ApplicantId", AS_IS, True),
+    ('Name', "applicantFullName", AS_IS, True),
+    ('Account No.', "applicantBankAccountNumber", INT, True),
+    ('Bank Name', "applicantBankName", AS_IS, True),
+    ('IFSC Code', "applicantBankIFSCCode", AS_IS, True),
+    ('Branch Name', "applicantBankBranchName", AS_IS, True)
+], required=[
+    # The order /receive-kyc-details has always checked them in
+    "applicantBankBranchName",
+    "applicantFullName",
+    "applicantBankAccountNumber",
+    "applicantBankName",
+    "applicantBankIFSCCode",
+    "ApplicantId"
+])
+
+# Yes/No flags of a merged partial application, turned into booleans when present
+APPLICATION_FLAGS_SCHEMA = SheetSchema('Directors_Data', [
+    ('Any Dues Missed in Last 12 Months', "isDirectorDueMissedLast12Months", YES_NO_TEXT),
+    ('Any Dues Missed in Last 18 Months', "isDirectorDueMissedLast18Months", YES_NO_TEXT),
+    ('Any Dues Missed in Last 6 Months', "isDirectorDueMissedLast6Months", YES_NO_TEXT)
+])
+
+# Columns of each sheet the services read; workbook_loader parses only these
+SHEET_COLUMNS = {}
+for _schema in (COMPANY_SCHEMA, APPLICANT_SCHEMA, DIRECTORS_SCHEMA, BANK_SCHEMA, BANK_DETAILS_SCHEMA):
+    _columns = SHEET_COLUMNS.setdefault(_schema.sheet_name, [])
+    _columns.extend(column for column in _schema.columns if column not in _columns)
+del _schema, _columns
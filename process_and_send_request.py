@@ -1,52 +1,48 @@
 import json
 import logging
+import os
 from datetime import datetime
 import requests
+import http_client
 from flask import Flask, request, jsonify
+from session_store import create_store, SESSION_TTL
+from health import register_health_routes
+from instrumentation import instrument_flask_app, span
+from structured_logging import configure_logging
+from payload_schemas import APPLICATION_FLAGS_SCHEMA, BANK_DETAILS_SCHEMA
+from serialization import dumps, install_json_provider
+# merge_payloads stays importable from here, next to convert_yes_no_to_boolean
+from partial_applications import (merge_payloads, assemble_application, add_session_part, partial_response,
+                                  application_response)
+from onboarding import target_json, kyc_response
+from idempotency import DeliveryLedger, IdempotencyConflict, IDEMPOTENCY_HEADER, replay_headers
 
-application_ids = {}
-kyc_transactions = {}
-# Configure logging
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+# Bounded, TTL-evicting stores (in-memory per process, or SQLite shared across workers)
+application_ids = create_store('application_ids', ttl=SESSION_TTL * 48)
+kyc_transactions = create_store('kyc_transactions', ttl=SESSION_TTL * 48)
+# Recent KYC forwards, so client retries get the stored target response
+kyc_deliveries = DeliveryLedger('kyc')
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+instrument_flask_app(app, 'process_and_send_request')
+install_json_provider(app)
+register_health_routes(app)
 
-# Global dictionary to store partial payloads
-payload_store = {}
+# Target server for completed applications and KYC details
+TARGET_URL_SERVER = os.environ.get(
+    'TARGET_URL',
+    'https://3228-2401-4900-8838-9963-bdb9-6092-94a4-defb.ngrok-free.app'
+)
+
+# Partial payloads per session, dropped when the session expires
+payload_store = create_store('payload')
 
 def convert_yes_no_to_boolean(payload):
     """
     Convert 'Yes'/'No' strings to boolean True/False for specific fields
     """
-    boolean_fields = [
-        'isDirectorDueMissedLast12Months',
-        'isDirectorDueMissedLast18Months',
-        'isDirectorDueMissedLast6Months'
-    ]
-    
-    processed_payload = payload.copy()
-    
-    for field in boolean_fields:
-        if field in processed_payload:
-            if processed_payload[field] == "Yes":
-                processed_payload[field] = True
-            elif processed_payload[field] == "No":
-                processed_payload[field] = False
-    
-    return processed_payload
-
-def merge_payloads(payload_store):
-    """
-    Merge multiple partial payloads into a single comprehensive payload
-    """
-    merged_payload = {}
-    
-    for partial_payload in payload_store.values():
-        merged_payload.update(partial_payload)
-    
-    return merged_payload
+    return APPLICATION_FLAGS_SCHEMA.coerce(payload)
 
 @app.route('/receive-partial-application', methods=['POST'])
 def receive_partial_application():
@@ -60,54 +56,33 @@ def receive_partial_application():
         # Generate a unique session ID (you might want to pass this from the client)
         session_id = request.args.get('session_id', 'default_session')
         
-        # Ensure the session exists in the payload store
-        if session_id not in payload_store:
-            payload_store[session_id] = {}
-        
-        # Determine which type of payload this is and store accordingly
-        if 'applicantAadhaar' in payload:
-            payload_store[session_id]['applicant'] = payload
-        elif 'companyCIN' in payload:
-            payload_store[session_id]['company'] = payload
-        elif 'directorAadhaar' in payload:
-            payload_store[session_id]['director'] = payload
-        
-        # Log the received payload
-        logger.info(f"Received partial payload for session {session_id}:")
-        logger.info(json.dumps(payload, indent=2))
-        
-        # Check if all parts are received
-        if len(payload_store[session_id]) == 3:
-            # Merge payloads
-            final_payload = merge_payloads(payload_store[session_id])
-            
-            # Process the payload
-            processed_payload = convert_yes_no_to_boolean(final_payload)
+        # Store it in the session by type; the request that completes the session claims the parts
+        part, session_parts, completed_parts = add_session_part(payload_store, session_id, payload)
+        
+        # Log the received payload (the body itself only for a sample of requests)
+        logger.info("Received partial payload", extra={'session_id': session_id, 'part': part, 'payload': payload})
+        
+        if completed_parts is not None:
+            with span('assemble', route='partial-application'):
+                # Merge the parts and turn the Yes/No flags into booleans
+                processed_payload = assemble_application(completed_parts)
             
-            # Forward to target server
-            target_response = forward_to_target_server(processed_payload)
+            # Forward to target server, keeping the parts so the client can retry on failure
+            try:
+                target_response = forward_to_target_server(processed_payload)
+            except Exception:
+                payload_store.set(session_id, completed_parts)
+                raise
             
             # Store the application ID
-            application_ids[session_id] = target_response.get('ApplicantId')
-            
-            # Clear the payload store for this session
-            del payload_store[session_id]
+            application_ids.set(session_id, target_response.get('ApplicantId'))
             
             # Prepare response
-            return jsonify({
-                "status": "success",
-                "message": "Complete application received and forwarded",
-                "processedPayload": processed_payload,
-                "targetResponse": target_response,
-                "ApplicantId": application_ids
-            }), 200
+            return jsonify(application_response(session_id, processed_payload, target_response)), 200
         else:
             # Not all parts received yet
-            return jsonify({
-                "status": "partial",
-                "message": "Partial application received",
-                "partsReceived": list(payload_store[session_id].keys())
-            }), 202
+            body, status_code = partial_response(session_parts)
+            return jsonify(body), status_code
     
     except Exception as e:
         logger.error(f"Error processing request: {e}")
@@ -122,29 +97,30 @@ def forward_to_target_server(payload):
     """
     try:
         # Replace with your actual target server URL
-        target_url = 'https://3228-2401-4900-8838-9963-bdb9-6092-94a4-defb.ngrok-free.app/receive-partial-application'  # Use httpbin for testing
+        target_url = TARGET_URL_SERVER + '/receive-partial-application'
         
         # Set up headers
         headers = {
             'Content-Type': 'application/json'
         }
         
-        # Convert payload to JSON string
-        payload_json = json.dumps(payload)
+        # Convert payload to JSON bytes
+        payload_json = dumps(payload)
         
         # Send POST request
-        response = requests.post(
-            target_url, 
-            data=payload_json,
-            headers=headers
-        )
+        with span('forward', target='partial-application'):
+            response = http_client.post(
+                target_url, 
+                data=payload_json,
+                headers=headers
+            )
         
         # Check response
         response.raise_for_status()
         
         # Parse and return JSON response
-        response_json = response.json()
-        logger.info(f"Response JSON: {json.dumps(response_json, indent=2)}")
+        response_json = target_json(response.content)
+        logger.info("Target server accepted application", extra={'payload': response_json})
         return response_json
     
     except requests.RequestException as e:
@@ -160,49 +136,47 @@ def receive_kyc_details():
         payload = request.get_json()
         
         # Validate required fields
-        required_fields = [
-            'applicantBankBranchName', 
-            'applicantFullName', 
-            'applicantBankAccountNumber', 
-            'applicantBankName', 
-            'applicantBankIFSCCode', 
-            'ApplicantId'
-        ]
-        for field in required_fields:
-            if field not in payload:
-                return jsonify({
-                    "status": "error",
-                    "message": f"Missing required field: {field}"
-                }), 400
+        missing = BANK_DETAILS_SCHEMA.missing(payload)
+        if missing:
+            return jsonify({
+                "status": "error",
+                "message": f"Missing required field: {missing[0]}"
+            }), 400
         
         # Forward to target server
-        target_url = 'https://3228-2401-4900-8838-9963-bdb9-6092-94a4-defb.ngrok-free.app/onboard-kyc'
+        target_url = TARGET_URL_SERVER + '/onboard-kyc'
         headers = {'Content-Type': 'application/json'}
-        payload_json = json.dumps(payload)
+        # Sorted keys, so the same details in any order are recognised as a retry
+        payload_json = dumps(payload, sort_keys=True)
         
-        try:
+        def send():
             # Send the request
-            response = requests.post(target_url, data=payload_json, headers=headers)
+            with span('forward', target='kyc'):
+                response = http_client.post(target_url, data=payload_json, headers=headers)
             response.raise_for_status()  # Raise exception for HTTP errors
             
             # Parse the response JSON
-            response_data = response.json()
-            transaction_id = response_data.get("TransactionId")
-            applicant_id = response_data.get("ApplicantId")
+            return target_json(response.content), True
+        
+        try:
+            # A retry of delivered details (same Idempotency-Key, or same content) is not sent again
+            response_data, replayed = kyc_deliveries.deliver(request.headers.get(IDEMPOTENCY_HEADER), payload_json, send)
+            body = kyc_response(response_data)
+            transaction_id, applicant_id = body["TransactionId"], body["ApplicantId"]
             
             # Log and store the transaction ID
             if transaction_id and applicant_id:
-                kyc_transactions[applicant_id] = transaction_id
-                logger.info(f"Stored Transaction ID: {transaction_id} for Applicant ID: {applicant_id}")
+                kyc_transactions.set(applicant_id, transaction_id)
+                logger.info("Stored KYC transaction", extra={'transaction_id': transaction_id, 'applicant_id': applicant_id})
             
             # Return success response
+            return jsonify(body), 200, replay_headers(replayed)
+        
+        except IdempotencyConflict as e:
             return jsonify({
-                "status": "success",
-                "message": "KYC details forwarded successfully",
-                "TransactionId": transaction_id,  # Include TransactionId
-                "ApplicantId": applicant_id,
-                "targetResponse": response_data
-            }), 200
+                "status": "error",
+                "message": str(e)
+            }), 422
         
         except requests.RequestException as e:
             logger.error(f"Failed to forward KYC request: {e}")
@@ -218,7 +192,30 @@ def receive_kyc_details():
             "message": str(e)
         }), 400
 
+
+@app.route('/session-stats', methods=['GET'])
+def get_session_stats():
+    """
+    Endpoint reporting size and eviction counts of the session stores
+    """
+    return jsonify({
+        "payloads": payload_store.stats(),
+        "applicationIds": application_ids.stats(),
+        "kycTransactions": kyc_transactions.stats(),
+        "kycDeliveries": kyc_deliveries.stats()
+    }), 200
+
+
+@app.route('/outbound-stats', methods=['GET'])
+def get_outbound_stats():
+    """
+    Endpoint reporting outbound connection pool, retry and breaker metrics
+    """
+    return jsonify(http_client.get_client().metrics()), 200
+
         
 if __name__ == '__main__':
+    # Configure logging: JSON lines written off the request thread, PII masked
+    configure_logging()
     # Run the Flask app
     app.run(host='0.0.0.0', port=5003, debug=True)
\ No newline at end of file
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from instrumentation import registry
+
+
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 10000))
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 600))
+
+RESPONSE_CACHE = registry.counter('response_cache_requests_total', 'Assembled payload cache lookups by result')
+
+
+def etag_for(data):
+    """
+    Strong ETag (without quotes) for a serialized payload
+    """
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+class CacheEntry:
+    __slots__ = ('version', 'payload', 'etag', 'expires_at')
+
+    def __init__(self, version, payload, expires_at):
+        self.version = version
+        self.payload = payload
+        self.etag = etag_for(payload.data)
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """
+    Bounded LRU of assembled payloads (serialization.Encoded), each stamped
+    with the workbook version it was built from. An entry only answers
+    lookups for that same version and expires after the TTL regardless.
+    """
+
+    def __init__(self, name, maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidated": 0, "carriedOver": 0}
+
+    def _count(self, name, amount=1):
+        # Caller holds self._lock
+        self._counters[name] += amount
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version != version:
+                # Built from another workbook version; put() will replace it
+                entry = None
+            elif entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                self._count('expired')
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            self._count('hits' if entry is not None else 'misses')
+        RESPONSE_CACHE.inc(cache=self.name, result='hit' if entry is not None else 'miss')
+        return entry
+
+    def put(self, key, version, payload):
+        entry = CacheEntry(version, payload, time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._count('evictions')
+        return entry
+
+    def carry_over(self, old_version, new_version, is_stale):
+        """
+        After a workbook reload, keep the entries whose applicant did not change
+        by re-stamping them with the new version; drop the rest
+        """
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.version != old_version:
+                    continue
+                if is_stale(key):
+                    del self._entries[key]
+                    self._count('invalidated')
+                else:
+                    entry.version = new_version
+                    self._count('carriedOver')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "maxSize": self.maxsize,
+                "ttlSeconds": self.ttl,
+                "hitRatio": round(self._counters['hits'] / lookups, 4) if lookups else None,
+                **self._counters
+            }
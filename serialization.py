@@ -0,0 +1,112 @@
+"""
+JSON encoding for the Flask apps and the outbound client.
+
+orjson is used when it is installed (JSON_BACKEND=json forces the standard
+library). Both backends accept numpy scalars and arrays, pandas timestamps
+and payloads that were already encoded with encode(), whose bytes are
+spliced in as-is instead of being serialized again.
+"""
+import datetime
+import decimal
+import json
+import os
+import uuid
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'orjson' if orjson is not None else 'json')
+if JSON_BACKEND == 'orjson' and orjson is None:
+    JSON_BACKEND = 'json'
+
+JSON_MIMETYPE = 'application/json'
+
+# orjson >= 3.9.15 can splice pre-encoded bytes; otherwise they are re-encoded from the value
+_FRAGMENTS = JSON_BACKEND == 'orjson' and hasattr(orjson, 'Fragment')
+
+
+class Encoded:
+    """
+    A payload together with its serialized bytes, for payloads that are sent
+    more than once (the downstream POST and the response to the caller)
+    """
+
+    __slots__ = ('value', 'data')
+
+    def __init__(self, value, data):
+        self.value = value
+        self.data = data
+
+
+def _default(obj):
+    # numpy scalars and arrays, without importing numpy
+    if hasattr(obj, 'dtype'):
+        return obj.tolist() if getattr(obj, 'ndim', 0) else obj.item()
+    if isinstance(obj, Encoded):
+        return orjson.Fragment(obj.data) if _FRAGMENTS else obj.value
+    # pandas.Timestamp is a datetime subclass
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj, sort_keys=False, indent=False):
+    """
+    Serialize to UTF-8 JSON bytes
+    """
+    if JSON_BACKEND == 'orjson':
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(obj, default=_default, sort_keys=sort_keys, indent=2 if indent else None,
+                      separators=None if indent else (',', ':'), ensure_ascii=False).encode()
+
+
+def loads(data):
+    if JSON_BACKEND == 'orjson':
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode(value, sort_keys=True):
+    """
+    Serialize a payload once so its bytes can be reused. Keys are sorted by
+    default to match Flask's jsonify, so the same bytes serve both the
+    downstream POST and the response.
+    """
+    if isinstance(value, Encoded):
+        return value
+    return Encoded(value, dumps(value, sort_keys=sort_keys))
+
+
+def install_json_provider(app):
+    """
+    Make jsonify and request.get_json on a Flask app use this module
+    """
+    from flask.json.provider import DefaultJSONProvider
+
+    class FastJSONProvider(DefaultJSONProvider):
+
+        def dumps(self, obj, **kwargs):
+            return dumps(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys)).decode()
+
+        def loads(self, s, **kwargs):
+            return loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            indent = self.compact is False or (self.compact is None and self._app.debug)
+            body = dumps(obj, sort_keys=self.sort_keys, indent=indent)
+            return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+    app.json = FastJSONProvider(app)
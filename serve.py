@@ -0,0 +1,145 @@
+"""
+Production server for the services (gunicorn, pre-fork). The Flask apps run
+on gthread workers, the ASGI gateway on uvicorn workers.
+
+    python serve.py excel_to_api --workers 4 --threads 8 --port 5001
+    python serve.py process_and_send_request --workers 2
+    python serve.py async_gateway --workers 2
+"""
+import argparse
+import gc
+import importlib
+import os
+import signal
+import sys
+import threading
+
+from forwarding_queue import drain_forwarding_queue
+from health import start_draining
+from structured_logging import configure_logging
+from workbook_cache import get_workbook_cache
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = object
+
+
+WORKBOOK_PATH = 'sample_excel_api.xlsx'
+
+SERVICES = {
+    'excel_to_api': {'port': 5001, 'workbook': True},
+    'get_and_post_bank_data': {'port': 5001, 'workbook': True},
+    'process_and_send_request': {'port': 5003, 'workbook': False, 'json_logs': True},
+    'async_gateway': {'port': 5004, 'workbook': True, 'asgi': True, 'json_logs': True}
+}
+
+WORKERS = int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1))
+THREADS = int(os.environ.get('WEB_THREADS', 4))
+# Seconds a worker gets to finish requests and queued forwards on shutdown
+GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+# Seconds a worker keeps serving after SIGTERM while /readyz answers 503, so
+# load balancers stop routing to it before it closes its listeners
+DRAIN_DELAY = float(os.environ.get('WEB_DRAIN_DELAY', 5))
+
+
+def load_service(name):
+    """
+    Import the service and load its workbook snapshot before workers fork, so
+    they share the parsed sheets copy-on-write
+    """
+    if SERVICES[name].get('json_logs'):
+        # Configured here rather than on import, so importing a service doesn't take over logging
+        configure_logging()
+    module = importlib.import_module(name)
+    if SERVICES[name]['workbook']:
+        get_workbook_cache(WORKBOOK_PATH).snapshot()
+    # Move everything loaded so far out of the collector's reach; otherwise the
+    # first collection in each worker touches every object and un-shares the pages
+    gc.collect()
+    gc.freeze()
+    return module.app
+
+
+def post_worker_init(worker):
+    """
+    Gunicorn hook, run after the worker installed its signal handlers: on
+    SIGTERM, report draining on /readyz first and only stop the worker
+    DRAIN_DELAY seconds later. (Uvicorn workers install their own handlers
+    when they start serving, so for them draining starts at worker_int or
+    worker_exit.)
+    """
+    stop = signal.getsignal(signal.SIGTERM)
+    if not callable(stop):
+        return
+
+    def drain_then_stop(signum, frame):
+        start_draining()
+        timer = threading.Timer(min(DRAIN_DELAY, GRACEFUL_TIMEOUT / 2), stop, args=(signum, frame))
+        timer.daemon = True
+        timer.start()
+    signal.signal(signal.SIGTERM, drain_then_stop)
+
+
+def worker_int(worker):
+    """
+    Gunicorn hook: SIGINT or SIGQUIT, the worker is about to stop
+    """
+    start_draining()
+
+
+def worker_exit(server, worker):
+    """
+    Gunicorn hook: the worker has stopped taking requests, so wait for any
+    fire-and-forget forwards still queued in it
+    """
+    start_draining()
+    if not drain_forwarding_queue(GRACEFUL_TIMEOUT):
+        server.log.warning("Worker %s exited with forwards still pending", worker.pid)
+
+
+class ServiceApplication(BaseApplication):
+
+    def __init__(self, app, options):
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a service under gunicorn")
+    parser.add_argument('service', choices=sorted(SERVICES))
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--threads', type=int, default=THREADS)
+    args = parser.parse_args()
+
+    if BaseApplication is object:
+        sys.exit("gunicorn is required for serve.py: pip install gunicorn")
+
+    port = args.port or SERVICES[args.service]['port']
+    if SERVICES[args.service].get('asgi'):
+        # One event loop per worker; --threads does not apply
+        worker_class = 'uvicorn.workers.UvicornWorker'
+    else:
+        worker_class = 'gthread' if args.threads > 1 else 'sync'
+    options = {
+        'bind': f"{args.host}:{port}",
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': worker_class,
+        'preload_app': True,
+        'graceful_timeout': GRACEFUL_TIMEOUT,
+        'post_worker_init': post_worker_init,
+        'worker_int': worker_int,
+        'worker_exit': worker_exit
+    }
+    ServiceApplication(load_service(args.service), options).run()
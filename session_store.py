@@ -0,0 +1,347 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'memory')
+SESSION_DB = os.environ.get('SESSION_DB', 'sessions.sqlite3')
+SESSION_TTL = float(os.environ.get('SESSION_TTL', 1800))
+SESSION_MAX_SIZE = int(os.environ.get('SESSION_MAX_SIZE', 100000))
+LOCK_STRIPES = int(os.environ.get('SESSION_LOCK_STRIPES', 16))
+# Seconds between sweeps of expired entries (and, in sqlite, the size cap)
+SWEEP_INTERVAL = float(os.environ.get('SESSION_SWEEP_INTERVAL', 5))
+
+
+class SessionBackend:
+    """
+    Interface for keyed session state with a per-entry TTL and a size cap.
+    Values must be JSON-serializable so every backend can store them.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def update(self, key, func, ttl=None):
+        """
+        Atomically replace the value with func(current value or None) and return it
+        """
+        raise NotImplementedError
+
+    def pop(self, key):
+        """
+        Remove the entry and return its value, or None if it wasn't there
+        """
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+
+class _Stripe:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> (expires_at, value), ordered from least to most recently used
+        self.entries = OrderedDict()
+
+
+class InMemoryBackend(SessionBackend):
+    """
+    Per-process store: entries are spread over lock stripes so unrelated
+    sessions don't contend. max_size caps the whole store: a write that goes
+    over it evicts the least-recently-used entries of the stripe it wrote
+    to, so eviction order is LRU per stripe, not across the store (and a
+    stripe holding nothing else lets the store run briefly over). Expired
+    entries are swept every sweep_interval seconds, on the next write.
+    """
+
+    def __init__(self, ttl=SESSION_TTL, max_size=SESSION_MAX_SIZE, stripes=LOCK_STRIPES,
+                 sweep_interval=SWEEP_INTERVAL):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sweep_interval = sweep_interval
+        self._stripes = [_Stripe() for _ in range(stripes)]
+        self._size = 0
+        self._next_sweep = time.time() + sweep_interval
+        self._sweep_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+
+    def _stripe(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def _count(self, name, amount=1):
+        with self._metrics_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def _resize(self, amount):
+        # Returns the new size of the whole store
+        with self._metrics_lock:
+            self._size += amount
+            return self._size
+
+    def _live(self, stripe, key, now):
+        # Caller holds stripe.lock
+        entry = stripe.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del stripe.entries[key]
+            self._resize(-1)
+            self._count('expired')
+            return None
+        stripe.entries.move_to_end(key)
+        return entry
+
+    def _store(self, stripe, key, value, ttl, now):
+        # Caller holds stripe.lock
+        added = key not in stripe.entries
+        stripe.entries[key] = (now + (self.ttl if ttl is None else ttl), value)
+        stripe.entries.move_to_end(key)
+        if not added:
+            return
+        # Over the store-wide cap: make room in this stripe (never evicting the
+        # entry just written); other stripes' locks aren't taken here
+        overflow = self._resize(1) - self.max_size
+        while overflow > 0 and len(stripe.entries) > 1:
+            oldest_key, (expires_at, _) = stripe.entries.popitem(last=False)
+            overflow = self._resize(-1) - self.max_size
+            self._count('expired' if expires_at <= now else 'evicted')
+
+    def _maybe_sweep(self, now):
+        # Expired entries are invisible to reads already; dropping them every
+        # sweep_interval seconds keeps idle sessions from holding memory
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = now + self.sweep_interval
+            for stripe in self._stripes:
+                with stripe.lock:
+                    expired = [key for key, (expires_at, _) in stripe.entries.items() if expires_at <= now]
+                    for key in expired:
+                        del stripe.entries[key]
+                if expired:
+                    self._resize(-len(expired))
+                    self._count('expired', len(expired))
+        finally:
+            self._sweep_lock.release()
+
+    def get(self, key):
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = self._live(stripe, key, time.time())
+            return entry[1] if entry else None
+
+    def set(self, key, value, ttl=None):
+        stripe = self._stripe(key)
+        now = time.time()
+        with stripe.lock:
+            self._store(stripe, key, value, ttl, now)
+        self._maybe_sweep(now)
+
+    def update(self, key, func, ttl=None):
+        stripe = self._stripe(key)
+        now = time.time()
+        with stripe.lock:
+            entry = self._live(stripe, key, now)
+            value = func(entry[1] if entry else None)
+            self._store(stripe, key, value, ttl, now)
+        self._maybe_sweep(now)
+        return value
+
+    def pop(self, key):
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = self._live(stripe, key, time.time())
+            if entry is None:
+                return None
+            del stripe.entries[key]
+            self._resize(-1)
+            return entry[1]
+
+    def __len__(self):
+        with self._metrics_lock:
+            return self._size
+
+    def stats(self):
+        return {"backend": "memory", "size": len(self), "expired": self.expired, "evicted": self.evicted}
+
+
+class SQLiteBackend(SessionBackend):
+    """
+    Store shared by every worker process on the host through one SQLite file
+    """
+
+    def __init__(self, namespace, path=SESSION_DB, ttl=SESSION_TTL, max_size=SESSION_MAX_SIZE,
+                 sweep_interval=SWEEP_INTERVAL):
+        self.namespace = namespace
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._local = threading.local()
+        self._metrics_lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+        # Created on a connection of its own: stores are built at import, often in
+        # gunicorn's master, and a connection kept from there would cross the fork
+        conn = self._connect()
+        try:
+            with _Transaction(conn):
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS sessions ("
+                    " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                    " expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                    " PRIMARY KEY (namespace, key))"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS sessions_accessed ON sessions (namespace, accessed_at)")
+                conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (namespace, expires_at)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _connection(self):
+        # sqlite3 connections can't be shared across threads or forked
+        # processes, so keep one per thread and open it on first use in a process
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return _Transaction(conn)
+
+    def _count(self, name, amount):
+        if amount:
+            with self._metrics_lock:
+                setattr(self, name, getattr(self, name) + amount)
+
+    def _read(self, conn, key, now):
+        row = conn.execute(
+            "SELECT value, expires_at FROM sessions WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute("DELETE FROM sessions WHERE namespace = ? AND key = ?", (self.namespace, key))
+            self._count('expired', 1)
+            return None
+        conn.execute(
+            "UPDATE sessions SET accessed_at = ? WHERE namespace = ? AND key = ?",
+            (now, self.namespace, key)
+        )
+        return json.loads(row[0])
+
+    def _write(self, conn, key, value, ttl, now):
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (namespace, key, value, expires_at, accessed_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, key, json.dumps(value), now + (self.ttl if ttl is None else ttl), now)
+        )
+        # Expired rows are already invisible to reads, so they and the size cap
+        # are swept every sweep_interval seconds instead of on every write
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self._sweep(conn, now)
+
+    def _sweep(self, conn, now):
+        expired = conn.execute(
+            "DELETE FROM sessions WHERE namespace = ? AND expires_at <= ?", (self.namespace, now)
+        ).rowcount
+        self._count('expired', expired)
+        overflow = conn.execute(
+            "SELECT COUNT(*) FROM sessions WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0] - self.max_size
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM sessions WHERE rowid IN (SELECT rowid FROM sessions WHERE namespace = ?"
+                " ORDER BY accessed_at LIMIT ?)",
+                (self.namespace, overflow)
+            )
+            self._count('evicted', overflow)
+
+    def get(self, key):
+        with self._connection() as conn:
+            return self._read(conn, key, time.time())
+
+    def set(self, key, value, ttl=None):
+        with self._connection() as conn:
+            self._write(conn, key, value, ttl, time.time())
+
+    def update(self, key, func, ttl=None):
+        with self._connection() as conn:
+            now = time.time()
+            value = func(self._read(conn, key, now))
+            self._write(conn, key, value, ttl, now)
+            return value
+
+    def pop(self, key):
+        with self._connection() as conn:
+            value = self._read(conn, key, time.time())
+            if value is not None:
+                conn.execute("DELETE FROM sessions WHERE namespace = ? AND key = ?", (self.namespace, key))
+            return value
+
+    def __len__(self):
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE namespace = ? AND expires_at > ?",
+                (self.namespace, time.time())
+            ).fetchone()[0]
+
+    def stats(self):
+        return {"backend": "sqlite", "size": len(self), "expired": self.expired, "evicted": self.evicted}
+
+
+class _Transaction:
+    """
+    BEGIN IMMEDIATE ... COMMIT around a block, so read-modify-write is atomic
+    across processes
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def claim(store, key, owner=None):
+    """
+    Record `owner` (this process by default) as the owner of key unless
+    someone already is. Returns True only to the owner, so with a store
+    shared across workers exactly one of them acts on the key.
+    """
+    owner = owner or os.getpid()
+    return store.update(key, lambda claimed: claimed or owner) == owner
+
+
+def create_store(namespace, ttl=SESSION_TTL, max_size=SESSION_MAX_SIZE, backend=SESSION_BACKEND):
+    """
+    Build a session store for one kind of state, using the configured backend
+    """
+    if backend == 'sqlite':
+        return SQLiteBackend(namespace, ttl=ttl, max_size=max_size)
+    if backend == 'memory':
+        return InMemoryBackend(ttl=ttl, max_size=max_size)
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -0,0 +1,74 @@
+from flask import Response, jsonify, stream_with_context
+
+from normalization import SheetSchema, normalize_frame
+from serialization import dumps
+
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Rows normalized and serialized per streamed chunk
+STREAM_CHUNK_ROWS = 5000
+
+
+def wants_ndjson(request):
+    """
+    Streaming is selected with ?stream=ndjson (or 1/true) or an NDJSON Accept header
+    """
+    if request.args.get('stream', '').lower() in ('1', 'true', 'ndjson'):
+        return True
+    return NDJSON_MIMETYPE in request.headers.get('Accept', '')
+
+
+def parse_page(args):
+    """
+    Read offset/limit query parameters, raising ValueError on bad input
+    """
+    offset = int(args.get('offset', 0))
+    limit = args.get('limit')
+    limit = int(limit) if limit is not None else None
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ValueError("offset and limit must be non-negative")
+    return offset, limit
+
+
+def project_schema(schema, fields_param):
+    """
+    Narrow a schema to the output keys listed in ?fields=, so unused columns
+    are never converted. A ?fields= that names no field (empty, or only
+    commas) selects every field, like leaving it out.
+    """
+    wanted = [field.strip() for field in (fields_param or '').split(',') if field.strip()]
+    if not wanted:
+        return schema
+    unknown = [field for field in wanted if field not in schema.keys]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return SheetSchema(schema.sheet_name, [field for field in schema.fields if field[1] in wanted])
+
+
+def _ndjson_chunks(df, schema):
+    for start in range(0, len(df), STREAM_CHUNK_ROWS):
+        records = normalize_frame(df.iloc[start:start + STREAM_CHUNK_ROWS], schema)
+        yield b''.join(dumps(record) + b'\n' for record in records)
+
+
+def sheet_response(df, schema, request):
+    """
+    Build the response for a bulk sheet endpoint, honouring pagination,
+    field projection and NDJSON streaming
+    """
+    try:
+        offset, limit = parse_page(request.args)
+        schema = project_schema(schema, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    total = len(df)
+    end = total if limit is None else offset + limit
+    page = df.iloc[offset:end]
+    headers = {'X-Total-Count': str(total)}
+
+    if wants_ndjson(request):
+        return Response(stream_with_context(_ndjson_chunks(page, schema)),
+                        mimetype=NDJSON_MIMETYPE, headers=headers), 200
+    return jsonify(normalize_frame(page, schema)), 200, headers
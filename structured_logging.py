@@ -0,0 +1,179 @@
+"""
+Non-blocking JSON-lines logging.
+
+Request threads only put the LogRecord on a bounded queue. A listener thread
+does the expensive part: PII masking, JSON encoding and the write itself.
+Payload bodies ride along as the `payload` extra and are kept for a sample
+of records only:
+
+    logger.info("Received partial payload", extra={'session_id': sid, 'payload': payload})
+
+A payload handed to the logger must not be mutated afterwards, since it is
+serialized later on the listener thread.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueListener
+
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+# Fraction of records whose payload body is kept (the log line itself is always written)
+PAYLOAD_SAMPLE_RATE = float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', 0.01))
+
+# Normalized keys (lower-case, alphanumerics only) whose values are masked
+_SENSITIVE_KEY = re.compile(r'aadh?aa?r|pan$|accountnumber')
+# Aadhaar numbers and PANs that turn up inside free text
+_SENSITIVE_TEXT = re.compile(r'(?<!\d)\d{4}\s?\d{4}\s?\d{4}(?!\d)|\b[A-Z]{5}\d{4}[A-Z]\b')
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+def _mask_value(value):
+    text = str(value)
+    if len(text) <= 4:
+        return '*' * len(text)
+    return '*' * (len(text) - 4) + text[-4:]
+
+
+def _is_sensitive(key):
+    return bool(_SENSITIVE_KEY.search(re.sub(r'[^0-9a-z]', '', str(key).lower())))
+
+
+def mask_pii(value):
+    """
+    Return a copy of a payload with Aadhaar, PAN and account numbers masked to
+    their last four characters
+    """
+    if isinstance(value, dict):
+        return {key: _mask_value(item) if _is_sensitive(key) and item is not None and not isinstance(item, (dict, list))
+                else mask_pii(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [mask_pii(item) for item in value]
+    if isinstance(value, str):
+        return mask_text(value)
+    return value
+
+
+def mask_text(text):
+    return _SENSITIVE_TEXT.sub(lambda match: _mask_value(match.group(0)), text)
+
+
+class JsonLineFormatter(logging.Formatter):
+    """
+    One compact JSON object per record, with `extra` fields and PII masked
+    """
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': mask_text(record.getMessage())
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = mask_pii(value)
+        if record.exc_info:
+            entry['exc'] = mask_text(self.formatException(record.exc_info))
+        elif record.exc_text:
+            entry['exc'] = mask_text(record.exc_text)
+        return json.dumps(entry, separators=(',', ':'), default=str)
+
+
+class PayloadSampler(logging.Filter):
+    """
+    Drop the payload body from all but a sample of records, before they are queued
+    """
+
+    def __init__(self, rate=PAYLOAD_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if getattr(record, 'payload', None) is not None and random.random() >= self.rate:
+            record.payload = None
+        return True
+
+
+class AsyncQueueHandler(logging.Handler):
+    """
+    Hand records to a listener thread through a bounded queue. When the queue
+    is full the record is dropped and counted rather than blocking the request.
+    """
+
+    def __init__(self, targets, maxsize=LOG_QUEUE_SIZE):
+        super().__init__()
+        self.targets = targets
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._reset()
+        # A forked worker inherits no listener thread; start a fresh one on its first record
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.queue = queue.Queue(maxsize=self.maxsize)
+        self._listener = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        with self._start_lock:
+            if self._listener is None:
+                listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+                listener.start()
+                self._listener = listener
+
+    def prepare(self, record):
+        # Only the cheap %-merge happens here; formatting and masking run on the listener
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        if self._listener is None:
+            self._start()
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def stop(self):
+        """
+        Flush queued records and stop the listener thread
+        """
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+def configure_logging(level=LOG_LEVEL, stream=None, sample_rate=PAYLOAD_SAMPLE_RATE):
+    """
+    Route the root logger through an AsyncQueueHandler writing JSON lines to
+    `stream` (stderr by default), and return the handler
+    """
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonLineFormatter())
+    handler = AsyncQueueHandler([output])
+    handler.addFilter(PayloadSampler(sample_rate))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    atexit.register(handler.stop)
+    return handler
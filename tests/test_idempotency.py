@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import pytest
+
+from idempotency import DeliveryLedger, IdempotencyConflict
+
+
+def counting_forward(result=None, succeeded=True):
+    calls = []
+
+    def forward():
+        calls.append(1)
+        return result or {'statusCode': 200}, succeeded
+    return forward, calls
+
+
+def test_repeat_is_replayed_without_forwarding():
+    ledger = DeliveryLedger('test_replay')
+    forward, calls = counting_forward()
+    assert ledger.deliver('key-1', b'payload', forward) == ({'statusCode': 200}, False)
+    assert ledger.deliver('key-1', b'payload', forward) == ({'statusCode': 200}, True)
+    assert len(calls) == 1
+
+
+def test_failed_forward_is_not_replayed():
+    ledger = DeliveryLedger('test_failed')
+    forward, calls = counting_forward({'error': 'refused'}, succeeded=False)
+    ledger.deliver('key-1', b'payload', forward)
+    ledger.deliver('key-1', b'payload', forward)
+    assert len(calls) == 2
+
+
+def test_key_reused_with_other_payload_conflicts():
+    ledger = DeliveryLedger('test_conflict')
+    forward, _ = counting_forward()
+    ledger.deliver('key-1', b'payload', forward)
+    with pytest.raises(IdempotencyConflict):
+        ledger.deliver('key-1', b'other payload', forward)
+
+
+def test_concurrent_repeats_share_one_forward():
+    ledger = DeliveryLedger('test_single_flight')
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def forward():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'statusCode': 200}, True
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(ledger.deliver('key-1', b'payload', forward)))
+    owner.start()
+    started.wait(5)
+    waiter = threading.Thread(target=lambda: results.append(ledger.deliver('key-1', b'payload', forward)))
+    waiter.start()
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+    assert len(calls) == 1
+    assert sorted(replayed for _, replayed in results) == [False, True]
+
+
+def test_async_concurrent_repeats_share_one_forward():
+    ledger = DeliveryLedger('test_async_single_flight')
+    calls = []
+
+    async def forward():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'statusCode': 200}, True
+
+    async def main():
+        return await asyncio.gather(*(ledger.deliver_async('key-1', b'payload', forward) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert sorted(replayed for _, replayed in results) == [False, True, True, True, True]
+    assert ledger.stats()['inFlight'] == 0
+
+
+def test_async_owner_cancelled_does_not_fail_waiters():
+    ledger = DeliveryLedger('test_async_cancel')
+
+    async def forward():
+        await asyncio.sleep(0.05)
+        return {'statusCode': 200}, True
+
+    async def main():
+        owner = asyncio.ensure_future(ledger.deliver_async('key-1', b'payload', forward))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(ledger.deliver_async('key-1', b'payload', forward))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        return await waiter, owner
+
+    result, owner = asyncio.run(main())
+    assert owner.cancelled()
+    assert result == ({'statusCode': 200}, True)
+
+
+def test_async_conflict():
+    ledger = DeliveryLedger('test_async_conflict')
+
+    async def forward():
+        return {'statusCode': 200}, True
+
+    async def main():
+        await ledger.deliver_async('key-1', b'payload', forward)
+        await ledger.deliver_async('key-1', b'other payload', forward)
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(main())
@@ -0,0 +1,159 @@
+import math
+import os
+
+import pytest
+
+pd = pytest.importorskip('pandas', exc_type=ImportError)
+pytest.importorskip('openpyxl', exc_type=ImportError)
+
+from normalization import normalize_frame
+from payload_schemas import APPLICANT_SCHEMA, BANK_SCHEMA, COMPANY_SCHEMA, DIRECTORS_SCHEMA
+from workbook_loader import SHEET_COLUMNS, SHEET_DTYPES, load_workbook
+
+WORKBOOK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_excel_api.xlsx')
+
+
+# The row-wise normalizers excel_to_api.py used before the schemas, kept as the reference
+
+def baseline_company(row):
+    return {
+        "Applicant ID": row['Applicant id'],
+        "Company Name": row['Company Name'],
+        "CIN": row['CIN'],
+        "GSTIN": row['GSTIN'],
+        "Company PAN": row['Company PAN'],
+        "Company Phone": int(row['Company Phone']),
+        "Company Email": row['Company Email'],
+        "Company Address": row['Company Address'],
+        "Company MSME": row['Company MSME']
+    }
+
+
+def baseline_bank(row):
+    return {
+        "Applicant id": row['Applicant id'],
+        "Name": row['Name'],
+        "Account No.": row['Account No.'],
+        "Bank Name": row['Bank Name'],
+        "IFSC Code": row['IFSC Code'],
+        "Branch Name": row['Branch Name']
+    }
+
+
+def baseline_applicant(row):
+    return {
+        "Applicant id": row['Applicant id'],
+        "First Name": row['First Name'],
+        "Last Name": row['Last Name'],
+        "Email": row['Email'],
+        "Phone": row['Phone'],
+        "Designation": row['Designation'],
+        "Aadhar": row['Aadhar']
+    }
+
+
+def baseline_directors(row):
+    return {
+        "Applicant ID": row['Applicant id'],
+        "Director First Name": row['Director First Name'],
+        "Director Last Name": row['Director Last Name'],
+        "Director Email": row['Director Email'],
+        "Director Phone": row['Director Phone'],
+        "Director Designation": row['Director Designation'],
+        "Director PAN": row['Director PAN'],
+        "Director Aadhaar": row['Director Aadhaar'],
+        "Total Current No. of Loans": int(row['Total Current No. of Loans']),
+        "Total Current No. of ODs": int(row['Total Current No. of ODs']),
+        "Total Current Loan Outstanding": int(row['Total Current Loan Outstanding']),
+        "Current Total EMI": int(row['Current Total EMI']),
+        "Any Dues Missed in Last 6 Months": row['Any Dues Missed in Last 6 Months'] == 'Yes',
+        "Any Dues Missed in Last 12 Months": row['Any Dues Missed in Last 12 Months'] == 'Yes',
+        "Any Dues Missed in Last 18 Months": row['Any Dues Missed in Last 18 Months'] == 'Yes'
+    }
+
+
+CASES = [
+    ('Company_Data', COMPANY_SCHEMA, baseline_company),
+    ('Bank_Data', BANK_SCHEMA, baseline_bank),
+    ('Applicant_Data', APPLICANT_SCHEMA, baseline_applicant),
+    ('Directors_Data', DIRECTORS_SCHEMA, baseline_directors)
+]
+
+
+def plain(records):
+    # numpy scalars as Python values and NaN as None, so records compare by value and type
+    def value(item):
+        if hasattr(item, 'item'):
+            item = item.item()
+        if isinstance(item, float) and math.isnan(item):
+            return None
+        return item
+    return [{key: (type(value(item)), value(item)) for key, item in record.items()} for record in records]
+
+
+@pytest.mark.parametrize('sheet_name, schema, baseline', CASES)
+def test_matches_row_wise_baseline_on_sample_workbook(sheet_name, schema, baseline):
+    df = pd.read_excel(WORKBOOK, sheet_name=sheet_name)
+    expected = [baseline(row) for _, row in df.iterrows()]
+    assert plain(normalize_frame(df, schema)) == plain(expected)
+
+
+@pytest.mark.parametrize('sheet_name, schema, baseline', CASES)
+def test_compact_load_gives_the_same_records(sheet_name, schema, baseline):
+    # The services load with pruned columns and compact dtypes (Yes/No as bool, narrow ints)
+    df = pd.read_excel(WORKBOOK, sheet_name=sheet_name)
+    sheets, _ = load_workbook(WORKBOOK, [sheet_name], SHEET_COLUMNS, processes=1, dtypes=SHEET_DTYPES)
+    assert plain(normalize_frame(sheets[sheet_name], schema)) == plain([baseline(row) for _, row in df.iterrows()])
+
+
+@pytest.mark.parametrize('sheet_name, schema, baseline', CASES)
+def test_compiled_convert_matches_normalize_frame(sheet_name, schema, baseline):
+    df = pd.read_excel(WORKBOOK, sheet_name=sheet_name)
+    assert plain([schema.convert(row) for _, row in df.iterrows()]) == plain(normalize_frame(df, schema))
+
+
+def directors_frame(flags):
+    return pd.DataFrame({
+        'Applicant id': ['A1', 'A2', 'A3'],
+        'Director First Name': ['Asha', None, 'Ravi'],
+        'Director Last Name': ['Rao', 'Iyer', float('nan')],
+        'Director Email': ['a@x.in', 'b@x.in', 'c@x.in'],
+        'Director Phone': [9000000001, 9000000002, 9000000003],
+        'Director Designation': ['CEO', 'CFO', 'CTO'],
+        'Director PAN': ['P1', 'P2', 'P3'],
+        'Director Aadhaar': [111, 222, 333],
+        'Total Current No. of Loans': [1, 0, 2],
+        'Total Current No. of ODs': [0.0, 1.0, 0.0],
+        'Total Current Loan Outstanding': ['1500', 2500, 0],
+        'Current Total EMI': [100, 200, 300],
+        'Any Dues Missed in Last 6 Months': flags,
+        'Any Dues Missed in Last 12 Months': flags,
+        'Any Dues Missed in Last 18 Months': flags
+    })
+
+
+@pytest.mark.parametrize('flags', [['Yes', 'No', 'yes'], [True, False, False]], ids=['str', 'bool'])
+def test_yes_no_numeric_and_missing_cells(flags):
+    records = normalize_frame(directors_frame(flags), DIRECTORS_SCHEMA)
+    assert [record["Any Dues Missed in Last 6 Months"] for record in records] == [True, False, False]
+    assert all(type(record["Any Dues Missed in Last 12 Months"]) is bool for record in records)
+    # INT casts give Python ints from int, float and text columns
+    assert [record["Total Current No. of ODs"] for record in records] == [0, 1, 0]
+    assert [record["Total Current Loan Outstanding"] for record in records] == [1500, 2500, 0]
+    assert all(type(record["Total Current No. of Loans"]) is int for record in records)
+    # Missing cells pass through AS_IS fields as pandas holds them (None or NaN)
+    assert plain(records)[1]["Director First Name"] == (type(None), None)
+    assert plain(records)[2]["Director Last Name"] == (type(None), None)
+    rows = [DIRECTORS_SCHEMA.convert(row) for _, row in directors_frame(flags).iterrows()]
+    assert plain(rows) == plain(records)
+    if flags[0] == 'Yes':
+        assert plain(records) == plain([baseline_directors(row) for _, row in directors_frame(flags).iterrows()])
+
+
+def test_missing_cell_in_an_int_column_fails_like_the_baseline():
+    df = directors_frame(['Yes', 'No', 'No'])
+    df['Current Total EMI'] = [100, float('nan'), 300]
+    with pytest.raises(ValueError):
+        baseline_directors(df.iloc[1])
+    with pytest.raises(ValueError):
+        normalize_frame(df, DIRECTORS_SCHEMA)
@@ -0,0 +1,147 @@
+import importlib
+import os
+import shutil
+import socket
+import time
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, etag_for
+from serialization import encode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_entry_answers_only_its_workbook_version(clock):
+    cache = ResponseCache('test', ttl=60)
+    entry = cache.put('A1', 'v1', encode({'ApplicantId': 'A1'}))
+    assert entry.etag == etag_for(entry.payload.data)
+    assert cache.get('A1', 'v1') is entry
+    assert cache.get('A1', 'v2') is None
+    clock[0] += 60
+    assert cache.get('A1', 'v1') is None
+    assert cache.stats()['expired'] == 1
+
+
+def test_carry_over_keeps_unchanged_entries_and_drops_changed(clock):
+    cache = ResponseCache('test', ttl=60)
+    unchanged = cache.put('A1', 'v1', encode({'ApplicantId': 'A1', 'companyName': 'ABC Corp'}))
+    cache.put('A2', 'v1', encode({'ApplicantId': 'A2', 'companyName': 'DEF Ltd'}))
+
+    cache.carry_over('v1', 'v2', lambda applicant_id: applicant_id == 'A2')
+    assert cache.get('A1', 'v2').etag == unchanged.etag
+    assert cache.get('A2', 'v2') is None
+    assert cache.stats()['carriedOver'] == 1
+    assert cache.stats()['invalidated'] == 1
+
+    rebuilt = cache.put('A2', 'v2', encode({'ApplicantId': 'A2', 'companyName': 'DEF Holdings'}))
+    assert rebuilt.etag != etag_for(encode({'ApplicantId': 'A2', 'companyName': 'DEF Ltd'}).data)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache('test', maxsize=2, ttl=60)
+    for applicant_id in ('A1', 'A2'):
+        cache.put(applicant_id, 'v1', encode({'ApplicantId': applicant_id}))
+    cache.get('A1', 'v1')
+    cache.put('A3', 'v1', encode({'ApplicantId': 'A3'}))
+    assert cache.get('A2', 'v1') is None
+    assert cache.get('A1', 'v1') is not None
+    assert cache.stats()['evictions'] == 1
+
+
+# Through excel_to_api's /onboard-Applicant route, against a copy of the sample workbook
+
+UNCHANGED_ID = 'bbb40075e7e94f7581973152351606e1'
+CHANGED_ID = '388da1920fcd4f0fbd61123827089c12'
+
+
+@pytest.fixture(scope='module')
+def service(tmp_path_factory):
+    for module in ('flask', 'pandas', 'openpyxl'):
+        pytest.importorskip(module, exc_type=ImportError)
+    from benchmarks.stub_downstream import start_stub
+
+    workdir = tmp_path_factory.mktemp('response-cache')
+    shutil.copy(os.path.join(ROOT, 'sample_excel_api.xlsx'), workdir / 'sample_excel_api.xlsx')
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    stub = start_stub(port)
+    previous_cwd, previous_url = os.getcwd(), os.environ.get('ONBOARD_URL')
+    os.environ['ONBOARD_URL'] = f'http://127.0.0.1:{port}/onboard'
+    os.chdir(workdir)
+    try:
+        excel_to_api = importlib.import_module('excel_to_api')
+        cache = excel_to_api.get_workbook_cache('sample_excel_api.xlsx')
+        cache.check_interval = 0
+        yield excel_to_api.app.test_client(), cache
+    finally:
+        os.chdir(previous_cwd)
+        if previous_url is None:
+            os.environ.pop('ONBOARD_URL', None)
+        else:
+            os.environ['ONBOARD_URL'] = previous_url
+        stub.shutdown()
+
+
+def edit_company_name(applicant_id, name):
+    import openpyxl
+    workbook = openpyxl.load_workbook('sample_excel_api.xlsx')
+    for row in workbook['Company_Data'].iter_rows(min_row=2):
+        if row[0].value == applicant_id:
+            row[1].value = name
+    workbook.save('sample_excel_api.xlsx')
+
+
+def wait_for_reload(client, cache, sequence):
+    deadline = time.monotonic() + 30
+    while cache.changes.sequence == sequence:
+        assert time.monotonic() < deadline, "workbook was not reloaded"
+        # Requests are what notice the file changed
+        client.get('/readyz')
+        time.sleep(0.05)
+
+
+def onboard(client, applicant_id, etag=None):
+    headers = {'If-None-Match': etag} if etag else {}
+    return client.get(f'/onboard-Applicant/{applicant_id}', headers=headers)
+
+
+def test_if_none_match_gets_304(service):
+    client, _ = service
+    response = onboard(client, UNCHANGED_ID)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    cached = onboard(client, UNCHANGED_ID, etag)
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+    assert cached.get_data() == b''
+    assert onboard(client, UNCHANGED_ID, '"something-else"').status_code == 200
+
+
+def test_edit_keeps_unchanged_etags_and_invalidates_changed_ones(service):
+    client, cache = service
+    unchanged = onboard(client, UNCHANGED_ID)
+    changed = onboard(client, CHANGED_ID)
+    assert changed.get_json()['companyName'] == 'DEF Ltd'
+
+    sequence = cache.changes.sequence
+    edit_company_name(CHANGED_ID, 'DEF Holdings')
+    wait_for_reload(client, cache, sequence)
+
+    # The applicant whose rows didn't change keeps its ETag, so clients still get 304
+    assert onboard(client, UNCHANGED_ID, unchanged.headers['ETag']).status_code == 304
+    # The edited applicant's old ETag no longer matches
+    response = onboard(client, CHANGED_ID, changed.headers['ETag'])
+    assert response.status_code == 200
+    assert response.get_json()['companyName'] == 'DEF Holdings'
+    assert response.headers['ETag'] != changed.headers['ETag']
@@ -0,0 +1,50 @@
+import multiprocessing
+
+import pytest
+
+import session_store
+from session_store import SQLiteBackend, claim
+
+DAY = 24 * 3600.0
+
+
+def _claim_later(path, version, delay, results):
+    # A worker that reloads the workbook `delay` seconds after the first one did
+    real_time = session_store.time.time
+    session_store.time.time = lambda: real_time() + delay
+    claims = SQLiteBackend('reforward_claims', path=path, ttl=float('inf'))
+    results.put(claim(claims, version))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'sessions.sqlite3')
+
+
+def test_one_worker_claims_each_version(db_path):
+    claims = SQLiteBackend('reforward_claims', path=db_path, ttl=float('inf'))
+    assert claim(claims, 'v1', owner=1)
+    assert not claim(claims, 'v1', owner=2)
+    assert claim(claims, 'v2', owner=2)
+
+
+def test_worker_reloading_late_does_not_claim_again(db_path):
+    claims = SQLiteBackend('reforward_claims', path=db_path, ttl=float('inf'))
+    assert claim(claims, 'v1')
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    late = context.Process(target=_claim_later, args=(db_path, 'v1', 30 * DAY, results))
+    late.start()
+    late.join(10)
+    assert late.exitcode == 0
+    assert results.get(timeout=5) is False
+
+
+def test_expiring_claims_would_let_a_late_worker_claim_again(db_path, monkeypatch):
+    # Why the claims don't use SESSION_TTL
+    claims = SQLiteBackend('reforward_claims', path=db_path, ttl=1800)
+    assert claim(claims, 'v1', owner=1)
+    real_time = session_store.time.time
+    monkeypatch.setattr(session_store.time, 'time', lambda: real_time() + 1801)
+    assert claim(claims, 'v1', owner=2)
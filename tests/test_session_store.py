@@ -0,0 +1,54 @@
+import pytest
+
+import session_store
+from session_store import InMemoryBackend
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, 'time', lambda: now[0])
+    return now
+
+
+def test_idle_expired_entries_are_swept(clock):
+    store = InMemoryBackend(ttl=10, max_size=100, sweep_interval=5)
+    for number in range(20):
+        store.set(f'idle-{number}', number)
+    clock[0] += 11
+    # Nothing reads the idle sessions; the next write after the interval drops them
+    store.set('active', 1)
+    assert len(store) == 1
+    assert store.stats()['expired'] == 20
+    assert store.get('active') == 1
+
+
+def test_uneven_spread_does_not_evict_below_max_size(clock):
+    store = InMemoryBackend(ttl=60, max_size=64, stripes=16)
+    for number in range(64):
+        store.set(f'session-{number}', number)
+    assert len(store) == 64
+    assert store.stats()['evicted'] == 0
+    assert all(store.get(f'session-{number}') == number for number in range(64))
+
+
+def test_max_size_caps_the_whole_store(clock):
+    store = InMemoryBackend(ttl=60, max_size=8, stripes=1)
+    for number in range(12):
+        store.set(f'session-{number}', number)
+    assert len(store) == 8
+    assert store.stats()['evicted'] == 4
+    # Least recently used go first
+    assert store.get('session-3') is None
+    assert store.get('session-4') == 4
+
+
+def test_size_tracks_pops_and_overwrites(clock):
+    store = InMemoryBackend(ttl=60, max_size=8)
+    store.set('a', 1)
+    store.set('a', 2)
+    store.update('b', lambda value: (value or 0) + 1)
+    assert len(store) == 2
+    assert store.pop('a') == 2
+    assert store.pop('a') is None
+    assert len(store) == 1
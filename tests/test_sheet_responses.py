@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+pd = pytest.importorskip('pandas', exc_type=ImportError)
+flask = pytest.importorskip('flask', exc_type=ImportError)
+
+import sheet_responses
+from normalization import AS_IS, INT, SheetSchema
+from sheet_responses import NDJSON_MIMETYPE, sheet_response
+
+SCHEMA = SheetSchema('Test_Data', [
+    ('Applicant id', "Applicant id", AS_IS),
+    ('Name', "Name", AS_IS),
+    ('Phone', "Phone", INT)
+])
+
+ROWS = 5
+
+
+@pytest.fixture
+def client():
+    df = pd.DataFrame({
+        'Applicant id': [f'A{number}' for number in range(ROWS)],
+        'Name': [f'Name{number}' for number in range(ROWS)],
+        'Phone': [9000000000 + number for number in range(ROWS)]
+    })
+    app = flask.Flask(__name__)
+
+    @app.route('/rows')
+    def rows():
+        return sheet_response(df, SCHEMA, flask.request)
+    return app.test_client()
+
+
+def ids(response):
+    return [record["Applicant id"] for record in response.get_json()]
+
+
+def test_without_parameters_every_row_is_returned(client):
+    response = client.get('/rows')
+    assert response.status_code == 200
+    assert ids(response) == ['A0', 'A1', 'A2', 'A3', 'A4']
+    assert response.headers['X-Total-Count'] == str(ROWS)
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('offset=2&limit=2', ['A2', 'A3']),
+    ('offset=3', ['A3', 'A4']),
+    ('limit=0', []),
+    ('offset=4&limit=10', ['A4']),
+    ('offset=5', []),
+    ('offset=50&limit=1', [])
+])
+def test_paging_bounds(client, query, expected):
+    response = client.get(f'/rows?{query}')
+    assert response.status_code == 200
+    assert ids(response) == expected
+    # The total is the sheet's, whatever the page
+    assert response.headers['X-Total-Count'] == str(ROWS)
+
+
+@pytest.mark.parametrize('query', ['offset=-1', 'limit=-1', 'offset=x', 'limit=1.5'])
+def test_bad_paging_is_rejected(client, query):
+    response = client.get(f'/rows?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_fields_projects_the_records(client):
+    response = client.get('/rows?fields=Phone, Name&limit=1')
+    assert response.status_code == 200
+    # Schema order, not request order
+    assert response.get_json() == [{"Name": "Name0", "Phone": 9000000000}]
+
+
+@pytest.mark.parametrize('fields', ['', ',', ' , ,'])
+def test_fields_naming_no_field_returns_every_field(client, fields):
+    response = client.get(f'/rows?fields={fields}&limit=1')
+    assert response.status_code == 200
+    assert response.get_json() == [{"Applicant id": "A0", "Name": "Name0", "Phone": 9000000000}]
+
+
+def test_unknown_fields_are_rejected(client):
+    response = client.get('/rows?fields=Name,Nope,Other')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Unknown fields: Nope, Other'}
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.get_data().splitlines()]
+
+
+@pytest.mark.parametrize('query, headers', [
+    ('stream=ndjson', {}),
+    ('stream=1', {}),
+    ('', {'Accept': NDJSON_MIMETYPE})
+])
+def test_streamed_output_matches_the_json_output(client, query, headers):
+    response = client.get(f'/rows?{query}', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == NDJSON_MIMETYPE
+    assert response.headers['X-Total-Count'] == str(ROWS)
+    assert ndjson(response) == client.get('/rows').get_json()
+
+
+def test_streamed_pages_span_chunks(client, monkeypatch):
+    monkeypatch.setattr(sheet_responses, 'STREAM_CHUNK_ROWS', 2)
+    response = client.get('/rows?stream=ndjson&offset=1&limit=3&fields=Applicant id')
+    assert ndjson(response) == [{"Applicant id": "A1"}, {"Applicant id": "A2"}, {"Applicant id": "A3"}]
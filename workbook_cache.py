@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from columnar_cache import load_sheets
+from change_detection import Changefeed, diff_snapshots
+from instrumentation import WORKBOOK_CACHE
+
+
+# How often (in seconds) readers are allowed to stat the workbook for changes
+DEFAULT_CHECK_INTERVAL = 1.0
+
+# Column every sheet uses to link rows back to an applicant
+APPLICANT_ID_COLUMN = 'Applicant id'
+
+_NO_ROWS = np.empty(0, dtype=np.intp)
+
+
+class ApplicantIndex:
+    """
+    Maps each applicant id to its row positions in every sheet that has an
+    'Applicant id' column, so lookups don't scan the whole sheet
+    """
+
+    def __init__(self, sheets):
+        self._positions = {}
+        for sheet_name, df in sheets.items():
+            if APPLICANT_ID_COLUMN in df.columns:
+                # groupby().indices keeps every position, so applicants with
+                # several directors or bank accounts map to all of their rows
+                self._positions[sheet_name] = df.groupby(APPLICANT_ID_COLUMN, sort=False).indices
+
+    def positions(self, sheet_name, applicant_id):
+        return self._positions.get(sheet_name, {}).get(applicant_id, _NO_ROWS)
+
+    def applicant_ids(self, sheet_name):
+        return self._positions.get(sheet_name, {}).keys()
+
+    def groups(self, sheet_name):
+        return self._positions.get(sheet_name, {})
+
+    def sheet_names(self):
+        return self._positions.keys()
+
+    def __contains__(self, applicant_id):
+        return any(applicant_id in positions for positions in self._positions.values())
+
+
+class WorkbookSnapshot:
+    """
+    Immutable view of every sheet in a workbook at one point in time
+    """
+
+    def __init__(self, file_path, sheets, mtime_ns, size):
+        self.file_path = file_path
+        self.sheets = sheets
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.index = ApplicantIndex(sheets)
+        self.loaded_at = time.time()
+        # sheet name -> {applicant id: content hash}, filled by change_detection
+        self.content_hashes = {}
+
+    @property
+    def signature(self):
+        return (self.mtime_ns, self.size)
+
+    def sheet(self, sheet_name):
+        if sheet_name not in self.sheets:
+            raise KeyError(f"Worksheet named '{sheet_name}' not found")
+        return self.sheets[sheet_name]
+
+    def rows_for(self, sheet_name, applicant_id):
+        """
+        Return the rows of a sheet belonging to one applicant (possibly empty)
+        """
+        df = self.sheet(sheet_name)
+        return df.iloc[self.index.positions(sheet_name, applicant_id)]
+
+    def age(self):
+        return time.time() - self.loaded_at
+
+
+class WorkbookCache:
+    """
+    Keeps the parsed workbook in memory and swaps in a fresh snapshot when the
+    file's mtime or size changes. Readers always get the current snapshot
+    straight away; reloads run on a background thread.
+    """
+
+    def __init__(self, file_path, check_interval=DEFAULT_CHECK_INTERVAL):
+        self.file_path = file_path
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._last_check = 0.0
+        self._load_lock = threading.Lock()
+        self.reload_count = 0
+        self.reload_errors = 0
+        self.last_error = None
+        # Where the last load read the sheets from, and per-sheet parse times
+        self.last_load = None
+        self.changes = Changefeed()
+
+    def _load(self):
+        stat = os.stat(self.file_path)
+        # Reads the columnar cache when it matches the file, the xlsx otherwise
+        sheets, self.last_load = load_sheets(self.file_path)
+        return WorkbookSnapshot(self.file_path, sheets, stat.st_mtime_ns, stat.st_size)
+
+    def _reload_in_background(self):
+        try:
+            previous = self._snapshot
+            snapshot = self._load()
+            # Attribute assignment is atomic, readers see either the old or the new snapshot
+            self._snapshot = snapshot
+            self.reload_count += 1
+            self.last_error = None
+            WORKBOOK_CACHE.inc(result='reload')
+            self._publish_changes(previous, snapshot)
+        except Exception as e:
+            # Keep serving the previous snapshot if the new file can't be parsed
+            self.reload_errors += 1
+            self.last_error = str(e)
+        finally:
+            self._load_lock.release()
+
+    def _publish_changes(self, previous, snapshot):
+        # Publish which applicants changed so consumers only touch those
+        try:
+            changeset = diff_snapshots(previous, snapshot)
+        except Exception as e:
+            self.last_error = f"Change detection failed: {e}"
+            return
+        self.changes.publish(snapshot, changeset)
+
+    def _is_stale(self, snapshot):
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) != snapshot.signature
+
+    def snapshot(self):
+        """
+        Return the current snapshot, loading the workbook on first use
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Nothing to serve yet, so the very first load has to block
+            with self._load_lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load()
+                    self.reload_count += 1
+                    WORKBOOK_CACHE.inc(result='load')
+            return self._snapshot
+
+        WORKBOOK_CACHE.inc(result='hit')
+
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            if self._is_stale(snapshot) and self._load_lock.acquire(blocking=False):
+                threading.Thread(target=self._reload_in_background, daemon=True).start()
+        return snapshot
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "file": self.file_path,
+            "loaded": snapshot is not None,
+            "reloadCount": self.reload_count,
+            "reloadErrors": self.reload_errors,
+            "lastError": self.last_error,
+            "snapshotAgeSeconds": round(snapshot.age(), 3) if snapshot else None,
+            "changeSequence": self.changes.sequence,
+            "lastLoad": self.last_load,
+            "sheets": sorted(snapshot.sheets) if snapshot else []
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_workbook_cache(file_path):
+    """
+    Return the shared cache for a workbook path, creating it on first use
+    """
+    cache = _caches.get(file_path)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.setdefault(file_path, WorkbookCache(file_path))
+    return cache
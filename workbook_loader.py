@@ -0,0 +1,237 @@
+"""
+Load the sheets the services use from an xlsx workbook.
+
+The file is opened once and only the requested sheets are parsed, each with
+only the columns the payload schemas read (payload_schemas.SHEET_COLUMNS).
+Large workbooks are parsed one sheet per process, in parallel. Parsed
+columns are then stored with compact dtypes (SHEET_DTYPES) instead of
+generic object and int64 columns.
+
+    python workbook_loader.py sample_excel_api.xlsx [--processes 4] [--all-columns] [--memory]
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from instrumentation import STAGE_DURATION
+from payload_schemas import SHEET_COLUMNS
+
+
+# Parse only the columns in SHEET_COLUMNS (WORKBOOK_PRUNE_COLUMNS=0 keeps every column)
+PRUNE_COLUMNS = os.environ.get('WORKBOOK_PRUNE_COLUMNS', '1') == '1'
+# Workbooks at least this large are parsed in parallel
+PARALLEL_MIN_BYTES = int(os.environ.get('WORKBOOK_PARALLEL_MIN_BYTES', 20 * 1024 * 1024))
+# Parser processes for large workbooks (0: one per sheet, up to the CPU count)
+LOAD_PROCESSES = int(os.environ.get('WORKBOOK_LOAD_PROCESSES', 0))
+# Store loaded columns with SHEET_DTYPES (WORKBOOK_COMPACT_DTYPES=0 keeps pandas' defaults)
+COMPACT_DTYPES = os.environ.get('WORKBOOK_COMPACT_DTYPES', '1') == '1'
+# A text column becomes categorical only if it has at most this many distinct values per row
+CATEGORY_MAX_RATIO = float(os.environ.get('WORKBOOK_CATEGORY_MAX_RATIO', 0.5))
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+ARROW_STRINGS = pyarrow is not None
+
+# How a loaded column is stored
+CATEGORY = 'category'      # repeated text: bank, branch, designation, MSME class
+FLAG = 'flag'              # Yes/No, stored as bool; every schema reads these with the YES_NO cast
+INTEGER = 'integer'        # whole numbers, narrowed to the smallest integer width that fits
+IDENTIFIER = 'identifier'  # unique text, stored as Arrow strings when pyarrow is installed
+
+SHEET_DTYPES = {
+    'Company_Data': {
+        'Applicant id': IDENTIFIER,
+        'CIN': IDENTIFIER,
+        'GSTIN': IDENTIFIER,
+        'Company PAN': IDENTIFIER,
+        'Company Phone': INTEGER,
+        'Company MSME': CATEGORY
+    },
+    'Applicant_Data': {
+        'Applicant id': IDENTIFIER,
+        'Phone': INTEGER,
+        'Designation': CATEGORY,
+        'Aadhar': INTEGER
+    },
+    'Directors_Data': {
+        'Applicant id': IDENTIFIER,
+        'Director Phone': INTEGER,
+        'Director Designation': CATEGORY,
+        'Director PAN': IDENTIFIER,
+        'Director Aadhaar': INTEGER,
+        'Total Current No. of Loans': INTEGER,
+        'Total Current No. of ODs': INTEGER,
+        'Total Current Loan Outstanding': INTEGER,
+        'Current Total EMI': INTEGER,
+        'Any Dues Missed in Last 6 Months': FLAG,
+        'Any Dues Missed in Last 12 Months': FLAG,
+        'Any Dues Missed in Last 18 Months': FLAG
+    },
+    'Bank_Data': {
+        'Applicant id': IDENTIFIER,
+        'Account No.': INTEGER,
+        'Bank Name': CATEGORY,
+        'IFSC Code': CATEGORY,
+        'Branch Name': CATEGORY
+    }
+}
+
+DEFAULT_COLUMNS = SHEET_COLUMNS if PRUNE_COLUMNS else None
+DEFAULT_DTYPES = SHEET_DTYPES if COMPACT_DTYPES else None
+
+
+def profile_digest(columns, dtypes=None):
+    """
+    Short hash of a column selection and dtype profile, so caches of
+    pruned or compacted sheets are keyed by them
+    """
+    if columns is None and dtypes is None:
+        return 'all'
+    profile = {"columns": columns, "dtypes": dtypes, "arrowStrings": ARROW_STRINGS and dtypes is not None}
+    return hashlib.sha256(json.dumps(profile, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def compact_frame(df, dtypes):
+    """
+    Convert a sheet's columns to the dtypes of its profile, where that keeps
+    every value the services read the same: integer columns with blanks
+    (loaded as float) and text identifiers with blanks are left alone.
+    Idempotent, so frames read back from the columnar cache can go through it
+    again.
+    """
+    for column, kind in (dtypes or {}).items():
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if kind == FLAG and values.dtype != bool:
+            df[column] = values == 'Yes'
+        elif kind == INTEGER and values.dtype.kind in 'iu':
+            df[column] = pd.to_numeric(values, downcast='integer')
+        elif kind == CATEGORY and values.dtype == object:
+            if values.nunique() <= CATEGORY_MAX_RATIO * len(values):
+                df[column] = values.astype('category')
+        elif kind == IDENTIFIER and ARROW_STRINGS and values.dtype == object:
+            if pd.api.types.infer_dtype(values, skipna=False) == 'string':
+                df[column] = values.astype('string[pyarrow]')
+    return df
+
+
+def memory_report(sheets):
+    """
+    Bytes held by each sheet, counting the Python objects in object columns
+    """
+    return {name: int(df.memory_usage(index=True, deep=True).sum()) for name, df in sheets.items()}
+
+
+def _parse_sheet(source, sheet_name, columns, dtypes):
+    # source is an open pd.ExcelFile, or the file path inside a parser process
+    start = time.perf_counter()
+    # A callable usecols skips columns a sheet doesn't have instead of failing
+    usecols = frozenset(columns).__contains__ if columns is not None else None
+    df = pd.read_excel(source, sheet_name=sheet_name, usecols=usecols)
+    # Compacted before it leaves a parser process, so less is pickled back
+    df = compact_frame(df, dtypes)
+    return df, time.perf_counter() - start
+
+
+def _columns_for(columns, sheet_name):
+    return columns.get(sheet_name) if columns is not None else None
+
+
+def _process_count(file_path, sheet_count):
+    if os.path.getsize(file_path) < PARALLEL_MIN_BYTES:
+        return 1
+    return min(sheet_count, LOAD_PROCESSES or os.cpu_count() or 1)
+
+
+def load_workbook(file_path, sheet_names=None, columns=DEFAULT_COLUMNS, processes=None, dtypes=DEFAULT_DTYPES):
+    """
+    Parse a workbook and return ({sheet name: DataFrame}, {sheet name: parse
+    seconds}). sheet_names=None parses the sheets listed in `columns` that
+    the workbook has (every sheet when columns is None); sheets without an
+    entry in `columns` keep all their columns. Columns are compacted with
+    `dtypes` (see compact_frame). processes=None parses in
+    parallel only when the file is at least PARALLEL_MIN_BYTES, which needs
+    the sheet names up front. Sheets come in workbook order, or in the
+    requested order when parsed in parallel.
+    """
+    # Sheets named explicitly must exist; sheets only listed in `columns` are skipped when absent
+    required = sheet_names is not None
+    if sheet_names is None and columns is not None:
+        sheet_names = list(columns)
+    if processes is None:
+        processes = _process_count(file_path, len(sheet_names) if sheet_names is not None else 1)
+
+    if processes <= 1 or sheet_names is None or len(sheet_names) <= 1:
+        with pd.ExcelFile(file_path) as workbook:
+            names = [name for name in workbook.sheet_names if sheet_names is None or name in sheet_names]
+            absent = [name for name in sheet_names or () if name not in names]
+            if absent and required:
+                raise ValueError(f"Worksheet named '{absent[0]}' not found")
+            results = {name: _parse_sheet(workbook, name, _columns_for(columns, name), _columns_for(dtypes, name))
+                       for name in names}
+    else:
+        # The parent only reads the sheet list, as the serial branch does, so
+        # absent sheets are never submitted
+        with pd.ExcelFile(file_path) as workbook:
+            present = set(workbook.sheet_names)
+        absent = [name for name in sheet_names if name not in present]
+        if absent and required:
+            raise ValueError(f"Worksheet named '{absent[0]}' not found")
+
+        # Each parser process opens the file itself; the parent never parses it.
+        # spawn, because the services load from threads, where forking is unsafe
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+            futures = {name: pool.submit(_parse_sheet, file_path, name, _columns_for(columns, name),
+                                         _columns_for(dtypes, name))
+                       for name in sheet_names if name in present}
+            results = {name: future.result() for name, future in futures.items()}
+
+    sheets = {name: df for name, (df, _) in results.items()}
+    timings = {name: seconds for name, (_, seconds) in results.items()}
+    for name, seconds in timings.items():
+        STAGE_DURATION.observe(seconds, stage='parse_sheet', sheet=name)
+    return sheets, timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Parse a workbook and report per-sheet parse times")
+    parser.add_argument('file_path')
+    parser.add_argument('--sheets', nargs='+')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--all-columns', action='store_true', help="don't prune to SHEET_COLUMNS")
+    parser.add_argument('--memory', action='store_true',
+                        help="also load with pandas' default dtypes and compare memory use")
+    args = parser.parse_args()
+    columns = None if args.all_columns else SHEET_COLUMNS
+
+    start = time.perf_counter()
+    sheets, timings = load_workbook(args.file_path, args.sheets, columns, args.processes, SHEET_DTYPES)
+    report = {
+        "file": args.file_path,
+        "seconds": round(time.perf_counter() - start, 3),
+        "sheets": {
+            name: {"rows": len(df), "columns": len(df.columns), "parseSeconds": round(timings[name], 3)}
+            for name, df in sheets.items()
+        }
+    }
+    if args.memory:
+        compact = memory_report(sheets)
+        default_sheets, _ = load_workbook(args.file_path, args.sheets, columns, args.processes, dtypes=None)
+        default = memory_report(default_sheets)
+        for name, size in default.items():
+            report["sheets"][name].update(defaultBytes=size, compactBytes=compact[name],
+                                          saved=round(1 - compact[name] / size, 3) if size else None)
+        report["defaultBytes"] = sum(default.values())
+        report["compactBytes"] = sum(compact.values())
+    print(json.dumps(report, indent=2))